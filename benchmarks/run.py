@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+"""
+Times each stage of the run pipeline and compares results against a saved baseline.
+
+  python benchmarks/run.py run -o results.json
+  python benchmarks/run.py compare baseline.json results.json --threshold 0.1
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT)
+
+from smrunner import fn, response, serializer
+from smrunner.fast import FastCode, FastFunction
+from smrunner.helpers import encoders
+
+
+def sample(o, greeting='Hello'):
+  return '%s %s!' % (greeting, o)
+
+
+def stages():
+  """
+  Builds the benchmarked stages.
+
+  Returns:
+    A list of tuples with the stage name and a callable without arguments.
+  """
+  code = fn.Code.from_function(sample)
+  data = code.as_json(only_code=False)
+  func = fn.Function.from_code(code)
+  fast_func = FastFunction.from_code(FastCode.from_json(data))
+  payload = 'x' * (1024 * 1024)
+  encoded = encoders.encode(payload)
+  result = ['item %s' % i for i in range(1000)]
+  return [
+    ('code.from_function', lambda: fn.Code.from_function(sample)),
+    ('code.as_json', lambda: code.as_json(only_code=False)),
+    ('code.from_json', lambda: fn.Code.from_json(data)),
+    ('code.as_bytes', lambda: code.as_bytes()),
+    ('fast_code.from_json', lambda: FastCode.from_json(data)),
+    ('encoders.encode.1mb', lambda: encoders.encode(payload)),
+    ('encoders.decode.1mb', lambda: encoders.decode(encoded)),
+    ('code.as_code', lambda: code.as_code()),
+    ('function.build_fn', lambda: func.build_fn(name='sample', argdefs=('Hello',))),
+    ('function.run', lambda: func.run('bob')),
+    ('fast_function.run', lambda: fast_func.run('bob')),
+    ('response.as_result.as_json', lambda: response.Response.as_result(_id=1, data=result).as_json()),
+    ('serializer.result_as_json', lambda: serializer.result_as_json(1, result))
+  ]
+
+
+def measure(func, repeat=5, min_time=0.2):
+  """
+  Times a callable, the number of loops is calibrated to run for at least "min_time" seconds.
+
+  Returns:
+    A dict with the best and mean time per call, in seconds, and the number of loops.
+  """
+  timer = timeit.Timer(func)
+  number = 1
+  while timer.timeit(number) < min_time:
+    number *= 10
+  times = [t / number for t in timer.repeat(repeat, number)]
+  return {
+    'best': min(times),
+    'mean': sum(times) / len(times),
+    'number': number
+  }
+
+
+def measure_cold_start(repeat=10):
+  """
+  Times end to end one shot runs of bin/pyrunner, interpreter startup included.
+
+  Returns:
+    A dict with the best and mean time per run, in seconds, and the number of runs.
+  """
+  data = fn.Code.from_function(sample).as_json(only_code=False)
+  cmd = [sys.executable, os.path.join(ROOT, 'bin', 'pyrunner'), '--data', data, '--params', '["bob"]']
+  env = dict(os.environ, PYTHONPATH=ROOT)
+  times = []
+  for i in range(repeat):
+    start = timeit.default_timer()
+    subprocess.check_call(cmd, stdout=subprocess.PIPE, env=env)
+    times.append(timeit.default_timer() - start)
+  return {
+    'best': min(times),
+    'mean': sum(times) / len(times),
+    'number': 1
+  }
+
+
+def run(args):
+  results = {}
+  for (name, func) in stages():
+    if args.filter and args.filter not in name:
+      continue
+    results[name] = measure(func, args.repeat)
+    sys.stderr.write('%-32s %12.3f us\n' % (name, results[name]['best'] * 1e6))
+  if not args.filter or args.filter in 'pyrunner.cold_start':
+    results['pyrunner.cold_start'] = measure_cold_start()
+    sys.stderr.write('%-32s %12.3f us\n' % ('pyrunner.cold_start', results['pyrunner.cold_start']['best'] * 1e6))
+  data = {
+    'python': platform.python_version(),
+    'implementation': platform.python_implementation(),
+    'results': results
+  }
+  out = json.dumps(data, indent=2, sort_keys=True)
+  if args.output is None:
+    sys.stdout.write('%s\n' % out)
+  else:
+    with open(args.output, 'w') as f:
+      f.write('%s\n' % out)
+
+
+def compare(args):
+  with open(args.baseline) as f:
+    baseline = json.load(f)['results']
+  with open(args.current) as f:
+    current = json.load(f)['results']
+  regressions = []
+  for name in sorted(current):
+    if name not in baseline:
+      continue
+    ratio = current[name]['best'] / baseline[name]['best']
+    flag = ''
+    if ratio > 1 + args.threshold:
+      flag = 'REGRESSION'
+      regressions.append(name)
+    sys.stdout.write('%-32s %12.3f us %12.3f us %8.2fx %s\n' % (
+      name, baseline[name]['best'] * 1e6, current[name]['best'] * 1e6, ratio, flag))
+  return 1 if regressions else 0
+
+
+parser = argparse.ArgumentParser(description='benchmarks the function run pipeline')
+subparsers = parser.add_subparsers(dest='command')
+run_parser = subparsers.add_parser('run', help='runs the benchmarks and writes the results as json')
+run_parser.add_argument('-o', '--output', help='results file, defaults to stdout')
+run_parser.add_argument('-r', '--repeat', type=int, default=5, help='number of timing repetitions per stage')
+run_parser.add_argument('-k', '--filter', help='only run stages containing this string')
+compare_parser = subparsers.add_parser('compare', help='compares results against a baseline')
+compare_parser.add_argument('baseline', help='baseline results file')
+compare_parser.add_argument('current', help='current results file')
+compare_parser.add_argument('-t', '--threshold', type=float, default=0.1, help='allowed slowdown ratio before flagging a regression')
+
+
+if __name__ == '__main__':
+  args = parser.parse_args()
+  if args.command == 'compare':
+    sys.exit(compare(args))
+  if args.command == 'run':
+    run(args)
+  else:
+    parser.print_help()
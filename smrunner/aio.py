@@ -0,0 +1,97 @@
+import asyncio
+import functools
+import inspect
+
+from smrunner import errors
+
+
+ASYNC_FLAGS = inspect.CO_COROUTINE | inspect.CO_ITERABLE_COROUTINE | inspect.CO_ASYNC_GENERATOR
+
+
+def is_async(func):
+  """
+  Checks if a Function code object is a coroutine or an async generator.
+
+  param: func(Function) - Function object to be checked.
+
+  Returns:
+    A boolean.
+  """
+  return bool(func.code.flags & ASYNC_FLAGS)
+
+
+async def arun(func, *args, **kwargs):
+  """
+  Runs a Function object, awaiting coroutines and collecting async generators in a list.
+
+  param: func(Function) - Function object to be used.
+
+  Returns:
+    The function response.
+  """
+  fn = func.get_fn()
+  try:
+    result = fn(*args, **kwargs)
+    if inspect.isasyncgen(result):
+      result = [item async for item in result]
+    elif inspect.isawaitable(result):
+      result = await result
+  except TypeError as e:
+    params = {
+      'args': args,
+      'kwargs': kwargs
+    }
+    raise errors.RuntimeError(func.code.name, params, str(e))
+  return result
+
+
+class AsyncRunner(object):
+  """
+  Runs many Function calls in a single event loop, with at most "limit" calls in flight.
+
+  Coroutine functions are awaited in the loop, regular functions are sent to an executor so they don't block it.
+  """
+  def __init__(self, limit=100, executor=None):
+    self.limit = limit
+    self.executor = executor
+    self._semaphore = None
+
+  @property
+  def semaphore(self):
+    if self._semaphore is None:
+      self._semaphore = asyncio.Semaphore(self.limit)
+    return self._semaphore
+
+  async def run(self, func, *args, **kwargs):
+    """
+    Runs a single Function call once a concurrency slot is available.
+
+    param: func(Function) - Function object to be used.
+
+    Returns:
+      The function response.
+    """
+    async with self.semaphore:
+      if is_async(func) is True:
+        return await arun(func, *args, **kwargs)
+      loop = asyncio.get_event_loop()
+      return await loop.run_in_executor(self.executor, functools.partial(func.run, *args, **kwargs))
+
+  async def run_many(self, func, params, return_exceptions=False):
+    """
+    Runs a Function for each params item concurrently.
+
+    param: func(Function) - Function object to be used.
+    param: params(iterable) - call params, a list is used as args and a dict as kwargs.
+    param: return_exceptions(bool) - flag to return errors in the results list instead of raising the first one.
+
+    Returns:
+      A list with the function responses, in the params order.
+    """
+    calls = []
+    for p in params:
+      if type(p) is list:
+        calls.append(self.run(func, *p))
+      else:
+        calls.append(self.run(func, **p))
+    return await asyncio.gather(*calls, return_exceptions=return_exceptions)
@@ -0,0 +1,167 @@
+import collections
+import json
+import traceback
+
+from smrunner import errors, memo, rpc, serializer
+
+
+DEFAULT_CHUNKSIZE = 64
+
+
+def read_items(lines):
+  """
+  Parses a JSONL stream of params, blank lines are skipped but still counted.
+
+  param: lines(iterable) - json lines, each one a list (args) or a dict (kwargs).
+
+  Returns:
+    A generator of tuples with the line index, the params and the parse error (or None).
+  """
+  for (index, line) in enumerate(lines):
+    line = line.strip()
+    if not line:
+      continue
+    try:
+      params = json.loads(line)
+    except ValueError as e:
+      yield (index, None, errors.ParseError())
+      continue
+    if type(params) not in (list, dict):
+      yield (index, None, errors.InvalidParamsError(None, params))
+      continue
+    yield (index, params, None)
+
+
+def run_item(func, params, timeout=None, cpu_limit=None, memory_limit=None, pure=False):
+  """
+  Runs a single item, any error is captured so the remaining items still run. Results of pure functions are
+  memoized.
+
+  Returns:
+    A tuple with a success flag and the function response (streams are collected in a list) or the error.
+  """
+  try:
+    def run():
+      result = rpc.run(func, params, timeout, cpu_limit, memory_limit)
+      if rpc.is_stream(result):
+        result = list(result)
+      return result
+    if pure is True:
+      result = memo.default_results.call(func.code.digest(), params, run)
+    else:
+      result = run()
+    return (True, result)
+  except errors.BaseError as e:
+    return (False, e)
+  except Exception as e:
+    fn_params = {
+      'args': params if type(params) is list else [],
+      'kwargs': params if type(params) is dict else {}
+    }
+    return (False, errors.RuntimeError(func.code.name, fn_params, traceback.format_exc()))
+
+
+def write_item(out, index, ok, value):
+  """
+  Writes the response of an item as a JSONRPC json line, its id is the input line index. The line is encoded
+  before it is written, a result that can't be encoded is written as an internal error.
+
+  Returns:
+    False if an error was written, True otherwise.
+  """
+  line = None
+  if ok is True:
+    try:
+      line = serializer.result_as_json(index, value)
+    except (TypeError, ValueError) as e:
+      (ok, value) = (False, errors.InternalError())
+  if line is None:
+    line = serializer.error_as_json(value.code, value.message, value.data, index)
+  out.write(line)
+  out.write('\n')
+  return ok
+
+
+def _result(future):
+  try:
+    return (True, future.result())
+  except errors.BaseError as e:
+    return (False, e)
+  except Exception as e:
+    return (False, errors.InternalError())
+
+
+def map_lines(out, func, lines, workers=None, chunksize=DEFAULT_CHUNKSIZE, timeout=None, cpu_limit=None,
+              memory_limit=None, preload=None, pure=False):
+  """
+  Runs a function over each line of a JSONL stream of params and writes the responses as JSONL, in input order.
+
+  The function is loaded and built once. With "workers" the items are sharded in chunks across a RunnerPool,
+  reading a bounded window of lines ahead so the input is never held in memory.
+
+  param: out(file) - file object to write to.
+  param: func(FastFunction) - function to be run.
+  param: lines(iterable) - json lines, each one a list (args) or a dict (kwargs).
+  param: workers(int) - number of worker processes, None runs the items in the current process.
+  param: chunksize(int) - number of items sent to a worker at once.
+  param: timeout(float) - wall clock limit of each item, in seconds.
+  param: cpu_limit(float) - cpu time limit of each item, in seconds.
+  param: memory_limit(int) - address space growth limit of each item (of each worker with "workers"), in bytes.
+  param: preload(list) - module names preloaded by the workers.
+  param: pure(bool) - flag to memoize the function results, cached items are not sent to the workers.
+
+  Returns:
+    A tuple with the number of items and the number of failed ones.
+  """
+  count = 0
+  failed = 0
+  items = read_items(lines)
+  if not workers:
+    for (index, params, error) in items:
+      if error is None:
+        (ok, value) = run_item(func, params, timeout, cpu_limit, memory_limit, pure)
+      else:
+        (ok, value) = (False, error)
+      count += 1
+      failed += write_item(out, index, ok, value) is False
+    out.flush()
+    return (count, failed)
+  from smrunner.pool import RunnerPool
+  window = chunksize * workers * 2
+  pending = collections.deque()
+  with RunnerPool(processes=workers, timeout=timeout, cpu_limit=cpu_limit, preload=preload,
+                  memory_limit=memory_limit) as pool:
+    while True:
+      batch = [item for (i, item) in zip(range(window), items)]
+      if batch:
+        entries = []
+        submitted = []
+        for (index, params, error) in batch:
+          if error is not None:
+            entries.append((index, None, (False, error)))
+            continue
+          (k, cached) = (None, memo.MISSING)
+          if pure is True:
+            (k, cached) = memo.default_results.lookup(func.code.digest(), params)
+          if cached is not memo.MISSING:
+            entries.append((index, None, (True, cached)))
+            continue
+          entries.append((index, k, None))
+          submitted.append(params)
+        pending.append((entries, pool.submit_many(func.code, submitted, chunksize)))
+      if not pending or (batch and len(pending) < 2):
+        if not batch:
+          break
+        continue
+      (entries, futures) = pending.popleft()
+      futures = iter(futures)
+      for (index, k, outcome) in entries:
+        if outcome is None:
+          outcome = _result(next(futures))
+          if k is not None and outcome[0] is True:
+            memo.default_results.store(k, outcome[1])
+        (ok, value) = outcome
+        count += 1
+        failed += write_item(out, index, ok, value) is False
+      out.flush()
+  return (count, failed)
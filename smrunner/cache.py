@@ -0,0 +1,207 @@
+import collections
+import hashlib
+import struct
+import time
+import types
+
+from six.moves import _thread
+
+from smrunner.helpers import binary
+
+
+if hasattr(time, 'monotonic'):
+  clock = time.monotonic
+else:
+  clock = time.time
+
+
+class LRUCache(object):
+  """
+  Size bounded least recently used cache with hit, miss and eviction counters.
+
+  Besides the number of entries it can also be bounded by the sum of the entries sizes, given to "put".
+  When "ttl" is set entries expire that many seconds after being stored, expired entries count as misses.
+  """
+  def __init__(self, maxsize=128, maxbytes=None, ttl=None):
+    self.maxsize = maxsize
+    self.maxbytes = maxbytes
+    self.ttl = ttl
+    self.bytes = 0
+    self.hits = 0
+    self.misses = 0
+    self.evictions = 0
+    self.expirations = 0
+    self._data = collections.OrderedDict()
+    self._sizes = {}
+    self._expires = {}
+    self._lock = _thread.allocate_lock()
+
+  def __len__(self):
+    return len(self._data)
+
+  def __contains__(self, key):
+    return key in self._data
+
+  def get(self, key, default=None):
+    """
+    Retrieves a cached value and marks it as the most recently used one.
+
+    param: key(hashable) - cache key.
+    param: default(any) - value to be returned when the key is not cached.
+
+    Returns:
+      The cached value or the default one.
+    """
+    with self._lock:
+      try:
+        value = self._data.pop(key)
+      except KeyError:
+        self.misses += 1
+        return default
+      if self.ttl is not None and self._expires[key] <= clock():
+        self._data[key] = value
+        self._remove(key)
+        self.misses += 1
+        self.expirations += 1
+        return default
+      self._data[key] = value
+      self.hits += 1
+      return value
+
+  def put(self, key, value, size=0):
+    """
+    Stores a value in the cache, evicting the least recently used entries if needed.
+
+    param: key(hashable) - cache key.
+    param: value(any) - value to be cached.
+    param: size(int) - entry size, in bytes, accounted against "maxbytes".
+    """
+    with self._lock:
+      self._remove(key)
+      self._data[key] = value
+      self._sizes[key] = size
+      self.bytes += size
+      if self.ttl is not None:
+        self._expires[key] = clock() + self.ttl
+      while len(self._data) > self.maxsize or (self.maxbytes is not None and self.bytes > self.maxbytes):
+        (old_key, old_value) = self._data.popitem(last=False)
+        self.bytes -= self._sizes.pop(old_key, 0)
+        self._expires.pop(old_key, None)
+        self.evictions += 1
+
+  def _remove(self, key):
+    """
+    Removes an entry, the lock must be held by the caller.
+
+    Returns:
+      True if the key was cached, False otherwise.
+    """
+    if key not in self._data:
+      return False
+    del self._data[key]
+    self.bytes -= self._sizes.pop(key, 0)
+    self._expires.pop(key, None)
+    return True
+
+  def items(self):
+    """
+    Retrieves the cached entries without marking them as used.
+
+    Returns:
+      A list of (key, value) tuples, least recently used first.
+    """
+    with self._lock:
+      return list(self._data.items())
+
+  def invalidate(self, key):
+    """
+    Removes a single entry from the cache.
+
+    param: key(hashable) - cache key.
+
+    Returns:
+      True if the key was cached, False otherwise.
+    """
+    with self._lock:
+      return self._remove(key)
+
+  def clear(self):
+    """
+    Removes all entries and resets the counters.
+    """
+    with self._lock:
+      self._data.clear()
+      self._sizes.clear()
+      self._expires.clear()
+      self.bytes = 0
+      self.hits = 0
+      self.misses = 0
+      self.evictions = 0
+      self.expirations = 0
+
+  def stats(self):
+    """
+    Retrieves the cache counters.
+
+    Returns:
+      A dict with the cache size, max size, bytes, ttl, hits, misses, evictions and expirations.
+    """
+    return {
+      'size': len(self._data),
+      'maxsize': self.maxsize,
+      'bytes': self.bytes,
+      'maxbytes': self.maxbytes,
+      'ttl': self.ttl,
+      'hits': self.hits,
+      'misses': self.misses,
+      'evictions': self.evictions,
+      'expirations': self.expirations
+    }
+
+
+_LEN = struct.Struct('>I')
+
+
+def _canonical(value):
+  """
+  Encodes a value the binary format can't handle in a canonical form, containers are walked (dicts and sets are
+  sorted by their encoded items) and code objects are encoded by their co_* fields, so the result does not depend
+  on memory addresses or on the process. Other objects fall back to their type name and repr.
+
+  param: value(any) - value to be encoded.
+
+  Returns:
+    A bytes object.
+  """
+  try:
+    return binary.dumps_value(value)
+  except binary.EncodingError:
+    pass
+  if isinstance(value, types.CodeType):
+    return b'C' + _canonical(tuple([getattr(value, 'co_%s' % f) for f in binary.CODE_FIELDS]))
+  if isinstance(value, (tuple, list)):
+    items = [_canonical(v) for v in value]
+    return b''.join([b't', _LEN.pack(len(items))] + items)
+  if isinstance(value, (set, frozenset)):
+    items = sorted([_canonical(v) for v in value])
+    return b''.join([b'z', _LEN.pack(len(items))] + items)
+  if isinstance(value, dict):
+    items = sorted([_canonical(k) + _canonical(v) for (k, v) in value.items()])
+    return b''.join([b'd', _LEN.pack(len(items))] + items)
+  raw = ('%s.%s:%r' % (type(value).__module__, type(value).__name__, value)).encode('utf8')
+  return b''.join((b'r', _LEN.pack(len(raw)), raw))
+
+
+def digest(fields):
+  """
+  Computes a stable content digest of a dict, used as cache key.
+
+  param: fields(dict) - dict to be used, values not supported by the binary format are encoded in a canonical form.
+
+  Returns:
+    A hex string with the sha1 digest.
+  """
+  return hashlib.sha1(_canonical(sorted(fields.items()))).hexdigest()
+
+
+build_cache = LRUCache(maxsize=256)
@@ -0,0 +1,234 @@
+import errno
+import itertools
+import json
+import socket
+import struct
+import threading
+
+from smrunner import errors
+
+
+FRAME_HEADER = struct.Struct('!I')
+DEFAULT_MAX_CONNECTIONS = 4
+# Matches the server DEFAULT_PIPELINE, the number of requests it queues per connection before it stops reading.
+DEFAULT_PIPELINE = 64
+
+
+class _ConnectionClosed(Exception):
+  """
+  Raised when the server closes a connection before a response frame starts.
+  """
+
+
+def _recv_exactly(sock, size):
+  chunks = []
+  while size > 0:
+    chunk = sock.recv(size)
+    if not chunk:
+      raise _ConnectionClosed()
+    chunks.append(chunk)
+    size -= len(chunk)
+  return b''.join(chunks)
+
+
+class Connection(object):
+  """
+  Single unix domain socket connection to a "pyrunner --socket" server, it sends and receives length prefixed frames.
+  """
+  def __init__(self, path, timeout=None):
+    self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    self.sock.settimeout(timeout)
+    try:
+      self.sock.connect(path)
+    except socket.error:
+      self.sock.close()
+      raise
+
+  def send(self, payloads):
+    """
+    Sends many frames at once, the server answers them in order.
+
+    param: payloads(list) - json encoded requests.
+    """
+    data = []
+    for payload in payloads:
+      payload = payload.encode('utf8')
+      data.append(FRAME_HEADER.pack(len(payload)))
+      data.append(payload)
+    self.sock.sendall(b''.join(data))
+
+  def recv(self):
+    """
+    Receives a single frame.
+
+    Returns:
+      The decoded json response.
+    """
+    (length, ) = FRAME_HEADER.unpack(_recv_exactly(self.sock, FRAME_HEADER.size))
+    return json.loads(_recv_exactly(self.sock, length).decode('utf8'))
+
+  def usable(self):
+    """
+    Checks, without blocking, that an idle connection is still open and has no pending data.
+
+    Returns:
+      A boolean.
+    """
+    try:
+      self.sock.recv(1, socket.MSG_PEEK | socket.MSG_DONTWAIT)
+    except socket.error as e:
+      return e.errno in (errno.EAGAIN, errno.EWOULDBLOCK)
+    return False
+
+  def close(self):
+    self.sock.close()
+
+
+class Client(object):
+  """
+  Pooled client of a "pyrunner --socket" server.
+
+  Idle connections are kept for reuse, up to "max_connections". Idle connections closed by the server are detected
+  and replaced before sending, requests are never sent twice. Pipelined requests are sent in a window of at most
+  "pipeline" requests awaiting a response, so neither side blocks on a full socket buffer.
+
+  param: path(str) - server socket file path.
+  param: max_connections(int) - number of idle connections kept open.
+  param: timeout(float) - socket timeout, in seconds.
+  param: pipeline(int) - max number of requests awaiting a response on a connection.
+  """
+  def __init__(self, path, max_connections=DEFAULT_MAX_CONNECTIONS, timeout=None, pipeline=DEFAULT_PIPELINE):
+    self.path = path
+    self.max_connections = max_connections
+    self.timeout = timeout
+    self.pipeline = max(pipeline, 1)
+    self._idle = []
+    self._lock = threading.Lock()
+    self._ids = itertools.count(1)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.close()
+
+  def _acquire(self):
+    while True:
+      with self._lock:
+        if not self._idle:
+          break
+        conn = self._idle.pop()
+      if conn.usable() is True:
+        return conn
+      conn.close()
+    return Connection(self.path, self.timeout)
+
+  def _release(self, conn):
+    with self._lock:
+      if len(self._idle) < self.max_connections:
+        self._idle.append(conn)
+        return
+    conn.close()
+
+  def _next_id(self):
+    with self._lock:
+      return next(self._ids)
+
+  def _exchange(self, payloads):
+    conn = self._acquire()
+    try:
+      conn.send(payloads[:self.pipeline])
+      sent = min(len(payloads), self.pipeline)
+      responses = []
+      while len(responses) < len(payloads):
+        responses.append(conn.recv())
+        if sent < len(payloads):
+          conn.send(payloads[sent:sent + 1])
+          sent += 1
+    except Exception as e:
+      conn.close()
+      if isinstance(e, _ConnectionClosed):
+        raise socket.error('connection closed by the server')
+      raise
+    self._release(conn)
+    return responses
+
+  def request_many(self, requests):
+    """
+    Sends many requests pipelined on a single connection.
+
+    param: requests(list) - list of tuples with the method name and its params dict.
+
+    Returns:
+      A list with the decoded JSONRPC response objects, in request order.
+    """
+    payloads = []
+    for (method, params) in requests:
+      payloads.append(json.dumps({'jsonrpc': '2.0', 'id': self._next_id(), 'method': method, 'params': params}))
+    return self._exchange(payloads)
+
+  def request(self, method, params=None):
+    """
+    Sends a single request and returns its result.
+
+    param: method(str) - JSONRPC method name.
+    param: params(dict) - method params.
+
+    Returns:
+      The response result.
+    """
+    (res, ) = self.request_many([(method, params or {})])
+    return result(res)
+
+  def call(self, **kwargs):
+    """
+    Calls a function, it takes the same params as "smrunner.rpc.call".
+
+    Returns:
+      The function response.
+    """
+    return self.request('call', kwargs)
+
+  def call_many(self, calls):
+    """
+    Calls many functions pipelined on a single connection.
+
+    param: calls(list) - list of dicts with "smrunner.rpc.call" params.
+
+    Returns:
+      A list with the function responses, a failed call raises its error.
+    """
+    return [result(res) for res in self.request_many([('call', c) for c in calls])]
+
+  def register(self, **kwargs):
+    """
+    Registers a function, it takes the same params as "smrunner.rpc.register".
+
+    Returns:
+      A string with the function id.
+    """
+    return self.request('register', kwargs)
+
+  def close(self):
+    """
+    Closes the idle connections.
+    """
+    with self._lock:
+      idle = self._idle
+      self._idle = []
+    [conn.close() for conn in idle]
+
+
+def result(res):
+  """
+  Retrieves the result of a decoded JSONRPC response.
+
+  param: res(dict) - decoded response object.
+
+  Returns:
+    The response result, error responses are raised as the errors.BaseError subclass of their code.
+  """
+  error = res.get('error')
+  if error is not None:
+    raise errors.from_response(error.get('code'), error.get('message'), error.get('data'))
+  return res.get('result')
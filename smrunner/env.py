@@ -0,0 +1,95 @@
+import itertools
+import sys
+
+from six.moves import builtins
+
+
+# Generations are unique across Environment instances, so a function built in another environment is rebound too.
+_generations = itertools.count(1)
+
+
+class Environment(object):
+  """
+  Globals template of the functions run by a process, modules are imported once when preloaded and then bound
+  in every function globals by their top level name.
+
+  Each built function gets a shallow copy of the template once, it is kept along with the function in the build
+  cache so global assignments of a call are visible to the next calls of the same function. The "generation" changes
+  whenever the template does, built functions of an older generation are rebound with "bind".
+
+  param: modules(list) - module names to be preloaded.
+  param: base(dict) - extra globals.
+  """
+  def __init__(self, modules=None, base=None):
+    self.template = {
+      '__builtins__': builtins
+    }
+    self.modules = []
+    self.generation = next(_generations)
+    self.preload(modules or [])
+    self.update(base or {})
+
+  def preload(self, modules):
+    """
+    Imports modules and binds them in the template, "os.path" is imported and bound as "os" like an import statement.
+
+    param: modules(list) - module names.
+    """
+    for name in modules:
+      __import__(name)
+      top = name.partition('.')[0]
+      self.template[top] = sys.modules[top]
+      self.modules.append(name)
+    self.generation = next(_generations)
+
+  def update(self, base):
+    """
+    Adds extra globals to the template.
+
+    param: base(dict) - globals to be added, "__builtins__" can't be overridden.
+    """
+    self.template.update(base)
+    self.template['__builtins__'] = builtins
+    self.generation = next(_generations)
+
+  def new_globals(self, extra=None):
+    """
+    Creates the globals of a single call.
+
+    param: extra(dict) - globals added on top of the template.
+
+    Returns:
+      A new dict.
+    """
+    _globals = self.template.copy()
+    if extra:
+      _globals.update(extra)
+      _globals['__builtins__'] = builtins
+    return _globals
+
+  def bind(self, fn):
+    """
+    Copies the template into the globals of a built function, in place, so the modules preloaded and the globals
+    added since it was built are visible to it.
+
+    param: fn(types.FunctionType) - function to be rebound.
+
+    Returns:
+      The same function object.
+    """
+    fn.__globals__.update(self.template)
+    return fn
+
+
+default_env = Environment()
+
+
+def configure(modules=None, base=None):
+  """
+  Preloads modules and adds extra globals to the default environment, used by runner processes at startup.
+
+  param: modules(list) - module names to be preloaded.
+  param: base(dict) - extra globals.
+  """
+  default_env.preload(modules or [])
+  default_env.update(base or {})
@@ -1,6 +1,22 @@
 import json
 
 
+def _rebuild_error(cls, state):
+  """
+  Rebuilds a pickled error instance without calling its constructor.
+
+  param: cls(type) - error class.
+  param: state(dict) - error instance fields.
+
+  Returns:
+    A new error instance.
+  """
+  err = cls.__new__(cls)
+  Exception.__init__(err, state.get('message'))
+  err.__dict__.update(state)
+  return err
+
+
 class BaseError(Exception):
   """
   Base error class to be used by other error classes.
@@ -30,6 +46,15 @@ class BaseError(Exception):
     values = (self.__class__.__name__, self.code, self.message, self.data)
     return '<%s(code=%s, message=%s, data=%s)>' % values
 
+  def __reduce__(self):
+    """
+    Pickle support, error subclasses have their own constructor signatures so the fields are restored directly.
+
+    Returns:
+      A tuple with the rebuild function and its arguments.
+    """
+    return (_rebuild_error, (self.__class__, self.__dict__.copy()))
+
   def as_python(self):
     """
     Retreieves the error fields in a dict.
@@ -64,6 +89,17 @@ class ParseError(BaseError):
     self.data = None
 
 
+class InvalidRequestError(BaseError):
+  """
+  Raised when a JSONRPC request is not a valid request object.
+  """
+  def __init__(self):
+    super(InvalidRequestError, self).__init__()
+    self.code = -32600
+    self.message = 'Invalid request error.'
+    self.data = None
+
+
 class FunctionNotFoundError(BaseError):
   """
   Raised when function object or code data is not found.
@@ -121,3 +157,79 @@ class RuntimeError(BaseError):
       'params':self.fn_params,
       'trace': self.fn_trace
     }
+
+
+class TimeoutError(BaseError):
+  """
+  Raised when a function call exceeds its wall clock or cpu time limit.
+  """
+  def __init__(self, fn_name, limit, kind):
+    super(TimeoutError, self).__init__()
+    self.fn_name = fn_name
+    self.limit = limit
+    self.kind = kind
+    self.code = -32001
+    self.message = 'Timeout error.'
+    self.data = {
+      'function': self.fn_name,
+      'limit': self.limit,
+      'kind': self.kind
+    }
+
+
+class MemoryLimitError(BaseError):
+  """
+  Raised when a function call exceeds its memory limit.
+  """
+  def __init__(self, fn_name, limit):
+    super(MemoryLimitError, self).__init__()
+    self.fn_name = fn_name
+    self.limit = limit
+    self.code = -32002
+    self.message = 'Memory limit error.'
+    self.data = {
+      'function': self.fn_name,
+      'limit': self.limit
+    }
+
+
+ERROR_CLASSES = {
+  -32700: ParseError,
+  -32600: InvalidRequestError,
+  -32601: FunctionNotFoundError,
+  -32602: InvalidParamsError,
+  -32603: InternalError,
+  -32000: RuntimeError,
+  -32001: TimeoutError,
+  -32002: MemoryLimitError
+}
+
+# Error data members and the error instance fields they are restored to.
+DATA_FIELDS = {
+  'function': 'fn_name',
+  'params': 'fn_params',
+  'trace': 'fn_trace',
+  'limit': 'limit',
+  'kind': 'kind'
+}
+
+
+def from_response(code, message=None, data=None):
+  """
+  Rebuilds the error of a JSONRPC error response as the error class of its code, the class fields are restored
+  from the error data.
+
+  param: code(int) - error code.
+  param: message(str) - error message.
+  param: data(any) - error data.
+
+  Returns:
+    An error instance, a BaseError one when the code is unknown.
+  """
+  cls = ERROR_CLASSES.get(code)
+  if cls is None:
+    return BaseError(code=code, message=message, data=data)
+  state = {'code': code, 'message': message, 'data': data}
+  if type(data) is dict:
+    state.update([(DATA_FIELDS[k], v) for (k, v) in data.items() if k in DATA_FIELDS])
+  return _rebuild_error(cls, state)
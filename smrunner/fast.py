@@ -0,0 +1,269 @@
+import json
+import types
+
+import six
+
+from smrunner.helpers import binary, encoders
+from smrunner import cache, errors
+from smrunner.runnable import RunnableMixin
+
+
+CODE_FIELDS = binary.CODE_FIELDS
+CODE_HELPER_PROPS = ('defaults',)
+CODE_DEFAULTS = {
+  'argcount': 0,
+  'kwonlyargcount': 0,
+  'name': '<string>',
+  'defaults': None
+}
+
+
+class FastCode(object):
+  """
+  Lightweight code object representation, it has the same interface as fn.Code without the schematics model machinery.
+
+  Fields are not validated unless "validate" is called, instances are meant to be treated as immutable.
+  """
+  __slots__ = CODE_FIELDS + CODE_HELPER_PROPS + ('_digest',)
+
+  def __init__(self, **kwargs):
+    for field in CODE_FIELDS + CODE_HELPER_PROPS:
+      try:
+        value = kwargs[field]
+      except KeyError:
+        if field not in CODE_DEFAULTS:
+          raise errors.ParseError()
+        value = CODE_DEFAULTS[field]
+      object.__setattr__(self, field, value)
+    object.__setattr__(self, '_digest', None)
+    self.fix_props()
+
+  def __setattr__(self, key, value):
+    object.__setattr__(self, key, value)
+    object.__setattr__(self, '_digest', None)
+
+  def fix_props(self):
+    """
+    Fix properties for usage in both python2 and python3.
+    """
+    if six.PY3 is True and type(self.code) is str:
+      self.code = self.code.encode('utf8')
+    if six.PY3 is True and type(self.lnotab) is str:
+      self.lnotab = self.lnotab.encode('utf8')
+    if six.PY2 is True and type(self.name) is unicode:
+      self.name = self.name.encode('utf8')
+    if six.PY2 is True and type(self.filename) is unicode:
+      self.filename = self.filename.encode('utf8')
+
+  @classmethod
+  def from_dict(cls, data, validate=False):
+    """
+    Creates a new FastCode instance from a dict with the code fields.
+
+    param: data(dict) - code fields.
+    param: validate(bool) - flag to validate the fields with the fn.Code schematics model.
+
+    Returns:
+      A new FastCode object.
+    """
+    if type(data) is not dict:
+      raise errors.ParseError()
+    self = cls(**data)
+    if validate is True:
+      self.validate()
+    return self
+
+  @classmethod
+  def from_code_object(cls, code, defaults=None):
+    """
+    Creates a new FastCode instance from a types.CodeType object.
+
+    param: code(types.CodeType) - code object to be used.
+    param: defaults(tuple) - function default args.
+
+    Returns:
+      A new FastCode object.
+    """
+    data = {f: getattr(code, 'co_%s' % f) for f in CODE_FIELDS}
+    data['defaults'] = defaults
+    return cls(**data)
+
+  @classmethod
+  def from_function(cls, fn):
+    """
+    Creates a new FastCode instance based on a function.
+
+    param: fn(Function) - fucntion to be used.
+
+    Returns:
+      A new FastCode object.
+    """
+    return cls.from_code_object(fn.__code__, fn.__defaults__)
+
+  @classmethod
+  def from_json(cls, data, validate=False):
+    """
+    Creates a new FastCode object from a given json string.
+
+    param: data(str) - Json string to be used
+    param: validate(bool) - flag to validate the fields with the fn.Code schematics model.
+
+    Returns:
+      A new FastCode object.
+    """
+    try:
+      parsed_data = json.loads(data, object_hook=encoders.json_code_hook)
+    except ValueError as e:
+      raise errors.ParseError()
+    return cls.from_dict(parsed_data, validate)
+
+  @classmethod
+  def from_bytes(cls, data, validate=False):
+    """
+    Creates a new FastCode object from the binary format returned by "as_bytes".
+
+    param: data(bytes) - Binary payload to be used.
+    param: validate(bool) - flag to validate the fields with the fn.Code schematics model.
+
+    Returns:
+      A new FastCode object.
+    """
+    try:
+      parsed_data = binary.loads(data)
+    except binary.EncodingError as e:
+      raise errors.ParseError()
+    return cls.from_dict(parsed_data, validate)
+
+  @classmethod
+  def from_payload(cls, data, validate=False):
+    """
+    Creates a new FastCode object from raw bytes holding either a binary payload or utf8 json.
+
+    param: data(bytes) - payload to be used.
+    param: validate(bool) - flag to validate the fields with the fn.Code schematics model.
+
+    Returns:
+      A new FastCode object.
+    """
+    if binary.is_binary(data):
+      return cls.from_bytes(data, validate)
+    try:
+      data = data.decode('utf8')
+    except UnicodeDecodeError as e:
+      raise errors.ParseError()
+    return cls.from_json(data, validate)
+
+  @classmethod
+  def from_file(cls, path, validate=False):
+    """
+    Creates a new FastCode object based from a json string or a binary payload written a file.
+
+    param: path(srt) - file path to be loaded.
+    param: validate(bool) - flag to validate the fields with the fn.Code schematics model.
+
+    Returns:
+      A new FastCode instance.
+    """
+    try:
+      with open(path, 'rb') as f:
+        data = f.read()
+    except IOError as e:
+      raise errors.FunctionNotFoundError(path)
+    return cls.from_payload(data, validate)
+
+  def validate(self):
+    """
+    Validates the fields using the fn.Code schematics model, meant to be called once when the code is registered.
+    """
+    from schematics.exceptions import BaseError as SchematicsError
+    from smrunner import fn
+    try:
+      fn.Code(raw_data=self.as_dict(only_code=False)).validate()
+    except SchematicsError as e:
+      raise errors.ParseError()
+
+  def digest(self):
+    """
+    Computes a stable content digest of the code fields, it matches fn.Code.digest for the same code.
+
+    Returns:
+      A hex string with the sha1 digest.
+    """
+    if self._digest is None:
+      object.__setattr__(self, '_digest', cache.digest(self.as_dict(only_code=False)))
+    return self._digest
+
+  def as_dict(self, only_code=True):
+    """
+    Parses code object as dict.
+
+    param: only_code(bool) - Flag to indicate if it should retrieve all fields or only those that belong to __code__.
+
+    Returns:
+      A dict with the instance code fields.
+    """
+    fields = CODE_FIELDS
+    if only_code is False:
+      fields = fields + CODE_HELPER_PROPS
+    return {f: getattr(self, f) for f in fields}
+
+  def as_json(self, only_code=True):
+    """
+    Parses the FastCode object as a json string.
+
+    param: only_code(bool) - Flag to indicate if it should retrieve all fields or only those that belong to __code__
+
+    Returns:
+      A json string with the code object fields.
+    """
+    data = self.as_dict(only_code)
+    if six.PY3 is True:
+      data['code'] = data['code'].decode('utf8')
+      data['lnotab'] = data['lnotab'].decode('utf8')
+    return json.dumps(data)
+
+  def as_bytes(self):
+    """
+    Parses the FastCode object in the versioned binary format.
+
+    Returns:
+      A bytes object with the code object fields and defaults.
+    """
+    try:
+      return binary.dumps(self.as_dict(), self.defaults)
+    except binary.EncodingError as e:
+      raise errors.ParseError()
+
+  def as_code(self):
+    """
+    Parses the FastCode object as a new CodeType object.
+
+    Returns:
+      A new types.CodeType object.
+    """
+    try:
+      return types.CodeType(*[getattr(self, f) for f in CODE_FIELDS])
+    except TypeError as e:
+      raise errors.ParseError()
+
+
+class FastFunction(RunnableMixin):
+  """
+  Lightweight counterpart of fn.Function, without the schematics model machinery.
+  """
+  __slots__ = ('code',)
+
+  def __init__(self, code):
+    self.code = code
+
+  @classmethod
+  def from_code(cls, code):
+    """
+    creates a new FastFunction object from a code object.
+
+    param: code(FastCode) - FastCode object to be used.
+
+    Returns:
+      A new FastFunction object.
+    """
+    return cls(code)
@@ -8,12 +8,15 @@ from schematics.types.compound import ModelType
 import six
 
 from smrunner.helpers.schema import BytesType, TupleType, LazyDictType
-from smrunner.helpers import encoders
-from smrunner import errors
+from smrunner.helpers import binary, encoders
+from smrunner import cache, errors
+from smrunner.runnable import RunnableMixin
 
 
 CODE_HELPER_PROPS = ('defaults',)
 
+build_cache = cache.build_cache
+
 class Code(Model):
   """
   Class to store code object properties (schematics model) and merthods.
@@ -39,6 +42,11 @@ class Code(Model):
     super(Code, self).__init__(*args, **kwargs)
     self.fix_props()
 
+  def __setattr__(self, key, value):
+    super(Code, self).__setattr__(key, value)
+    if key != '_digest':
+      object.__setattr__(self, '_digest', None)
+
   def fix_props(self):
     """
     Fix properties for usage in both python2 and python3.
@@ -85,20 +93,40 @@ class Code(Model):
     self = cls(raw_data=parsed_data)
     return self
 
+  @classmethod
+  def from_bytes(cls, data):
+    """
+    Creates a new Code object from the binary format returned by "as_bytes".
+
+    param: data(bytes) - Binary payload to be used.
+
+    Returns:
+      A new Code object.
+    """
+    try:
+      parsed_data = binary.loads(data)
+    except binary.EncodingError as e:
+      raise errors.ParseError()
+    return cls(raw_data=parsed_data)
+
   @classmethod
   def from_file(cls, path):
     """
-    Creates a new Code object based from a json string written a file.
+    Creates a new Code object based from a json string or a binary payload written a file.
 
-    param: path(srt) - json file path to be loaded.
+    param: path(srt) - file path to be loaded.
 
     Returns:
       A new Code instance.
     """
     try:
-      return cls.from_json(open(path).read())
+      with open(path, 'rb') as f:
+        data = f.read()
     except IOError as e:
       raise errors.FunctionNotFoundError(path)
+    if binary.is_binary(data):
+      return cls.from_bytes(data)
+    return cls.from_json(data.decode('utf8'))
 
   def parse_args(self, spec):
     """
@@ -140,6 +168,19 @@ class Code(Model):
       [data.update({key:getattr(self, key)}) for key in CODE_HELPER_PROPS]
     return data
 
+  def digest(self):
+    """
+    Computes a stable content digest of the code fields, used as the build cache key. It is cached in the instance
+    until a field is set.
+
+    Returns:
+      A hex string with the sha1 digest.
+    """
+    if getattr(self, '_digest', None) is None:
+      self.fix_props()
+      object.__setattr__(self, '_digest', cache.digest(self.as_dict(only_code=False)))
+    return self._digest
+
   def as_json(self, only_code=True):
     """
     Parses the Code object as a json string.
@@ -150,11 +191,24 @@ class Code(Model):
       A json string with the code object fields.
     """
     BYTES_PROPS = ('code', 'lnotab')
-    data = self.as_dict()
+    data = self.as_dict(only_code)
     if six.PY3 is True:
       for bp in BYTES_PROPS:
         data[bp] = data[bp].decode('utf8')
-    return json.dumps(data, only_code)
+    return json.dumps(data)
+
+  def as_bytes(self):
+    """
+    Parses the Code object in the versioned binary format, with raw bytes fields and typed consts.
+
+    Returns:
+      A bytes object with the code object fields and defaults.
+    """
+    self.fix_props()
+    try:
+      return binary.dumps(self.as_dict(), self.defaults)
+    except binary.EncodingError as e:
+      raise errors.ParseError()
 
   def as_code(self):
     """
@@ -188,7 +242,7 @@ class Code(Model):
       raise errors.ParseError()
 
 
-class Function(Model):
+class Function(RunnableMixin, Model):
   """
   Class to store fucntion and its related code. It also runs the functon call.
   """
@@ -205,63 +259,3 @@ class Function(Model):
       A new Function object.
     """
     return cls(raw_data={'code': code})
-
-  def __call__(self, *args, **kwargs):
-    """
-    Callable python interface, executes the object "run" method.
-    """
-    return self.run(*args, **kwargs)
-
-  def get_default_env(self):
-    """
-    Define default globals and insert python builtins into the function.
-
-    Returns:
-      A dict with the function globals.
-    """
-    _globals = globals()
-    env = {
-      '__builtins__': _globals['__builtins__']
-    }
-    return env
-
-  def build_fn(self, **kwargs):
-    """
-    Builds the function object (types.FunctionType) based on the instance code property.
-
-    Returns:
-      A new types.FunctionType object.
-    """
-    _globals = kwargs.get('globals', {})
-    _globals.update(self.get_default_env())
-    name = kwargs.get('name', 'fn')
-    if six.PY2 is True:
-      name = name.encode('utf8')
-    argdefs = kwargs.get('argdefs', tuple())
-    closure = kwargs.get('closure', tuple())
-    code = self.code.as_code()
-    return types.FunctionType(code, _globals, name, argdefs, closure)
-
-  def run(self, *args, **kwargs):
-    """
-    Runs the function object and returns the response.
-
-    Also, it passes and args and kwargs to the function call.
-
-    Returns:
-      The function response.
-    """
-    kw = {
-      'name': self.code.name
-    }
-    if self.code.defaults is not None:
-      kw['argdefs'] = self.code.defaults
-    fn = self.build_fn(**kw)
-    try:
-      return fn(*args, **kwargs)
-    except TypeError as e:
-      params = {
-        'args': args,
-        'kwargs': kwargs
-      }
-      raise errors.RuntimeError(kw['name'], params, str(e))
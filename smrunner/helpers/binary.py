@@ -0,0 +1,195 @@
+import struct
+import types
+
+import six
+
+
+MAGIC = b'SMC'
+VERSION = 1
+HEADER = MAGIC + struct.pack('>B', VERSION)
+
+CODE_FIELDS = ('argcount', 'kwonlyargcount', 'nlocals', 'stacksize', 'flags', 'code', 'consts', 'names',
+               'varnames', 'filename', 'name', 'firstlineno', 'lnotab', 'freevars', 'cellvars')
+if six.PY2 is True:
+  CODE_FIELDS = tuple([f for f in CODE_FIELDS if f != 'kwonlyargcount'])
+
+_INT = struct.Struct('>q')
+_LEN = struct.Struct('>I')
+_FLOAT = struct.Struct('>d')
+_COMPLEX = struct.Struct('>dd')
+_INT_MIN = -(1 << 63)
+_INT_MAX = (1 << 63) - 1
+
+
+class EncodingError(ValueError):
+  """
+  Raised when a value or a payload can't be handled by the binary format.
+  """
+  pass
+
+
+def is_binary(data):
+  """
+  Checks if some bytes are a binary encoded payload.
+
+  param: data(bytes) - data to be checked.
+
+  Returns:
+    A boolean.
+  """
+  return isinstance(data, (bytes, bytearray, memoryview)) and bytes(data[:len(MAGIC)]) == MAGIC
+
+
+def _encode_value(value, out):
+  """
+  Appends the typed and length prefixed representation of a value to a list of bytes chunks.
+
+  param: value(any) - value to be encoded.
+  param: out(list) - list of bytes chunks.
+  """
+  if value is None:
+    out.append(b'N')
+  elif value is True:
+    out.append(b'T')
+  elif value is False:
+    out.append(b'F')
+  elif value is Ellipsis:
+    out.append(b'E')
+  elif isinstance(value, six.integer_types):
+    if _INT_MIN <= value <= _INT_MAX:
+      out.extend((b'i', _INT.pack(value)))
+    else:
+      raw = str(value).encode('ascii')
+      out.extend((b'l', _LEN.pack(len(raw)), raw))
+  elif isinstance(value, float):
+    out.extend((b'f', _FLOAT.pack(value)))
+  elif isinstance(value, complex):
+    out.extend((b'c', _COMPLEX.pack(value.real, value.imag)))
+  elif isinstance(value, bytes):
+    out.extend((b'b', _LEN.pack(len(value)), value))
+  elif isinstance(value, six.text_type):
+    raw = value.encode('utf8')
+    out.extend((b's', _LEN.pack(len(raw)), raw))
+  elif isinstance(value, (tuple, list)):
+    out.extend((b't', _LEN.pack(len(value))))
+    [_encode_value(v, out) for v in value]
+  elif isinstance(value, frozenset):
+    out.extend((b'z', _LEN.pack(len(value))))
+    out.extend(sorted([dumps_value(v) for v in value]))
+  elif isinstance(value, types.CodeType):
+    out.append(b'C')
+    _encode_value(tuple([getattr(value, 'co_%s' % f) for f in CODE_FIELDS]), out)
+  else:
+    raise EncodingError('Unsupported type %s' % type(value).__name__)
+
+
+def _decode_value(buf, offset):
+  """
+  Decodes a single value from a buffer.
+
+  param: buf(memoryview) - buffer to be read.
+  param: offset(int) - value position in the buffer.
+
+  Returns:
+    A tuple with the decoded value and the next value offset.
+  """
+  tag = buf[offset:offset + 1].tobytes()
+  offset += 1
+  if tag == b'N':
+    return (None, offset)
+  if tag == b'T':
+    return (True, offset)
+  if tag == b'F':
+    return (False, offset)
+  if tag == b'E':
+    return (Ellipsis, offset)
+  if tag == b'i':
+    return (_INT.unpack_from(buf, offset)[0], offset + _INT.size)
+  if tag == b'f':
+    return (_FLOAT.unpack_from(buf, offset)[0], offset + _FLOAT.size)
+  if tag == b'c':
+    (real, imag) = _COMPLEX.unpack_from(buf, offset)
+    return (complex(real, imag), offset + _COMPLEX.size)
+  if tag in (b'l', b'b', b's'):
+    size = _LEN.unpack_from(buf, offset)[0]
+    offset += _LEN.size
+    raw = buf[offset:offset + size].tobytes()
+    if len(raw) != size:
+      raise EncodingError('Truncated payload')
+    if tag == b'l':
+      return (int(raw.decode('ascii')), offset + size)
+    if tag == b's':
+      return (raw.decode('utf8'), offset + size)
+    return (raw, offset + size)
+  if tag in (b't', b'z'):
+    count = _LEN.unpack_from(buf, offset)[0]
+    offset += _LEN.size
+    items = []
+    for i in range(count):
+      (item, offset) = _decode_value(buf, offset)
+      items.append(item)
+    if tag == b'z':
+      return (frozenset(items), offset)
+    return (tuple(items), offset)
+  if tag == b'C':
+    (fields, offset) = _decode_value(buf, offset)
+    return (types.CodeType(*fields), offset)
+  raise EncodingError('Unknown type tag %r' % tag)
+
+
+def dumps_value(value):
+  """
+  Encodes a single value in the binary format, without the payload header.
+
+  param: value(any) - value to be encoded.
+
+  Returns:
+    A bytes object.
+  """
+  out = []
+  _encode_value(value, out)
+  return b''.join(out)
+
+
+def dumps(fields, defaults=None):
+  """
+  Encodes code fields in the versioned binary format.
+
+  param: fields(dict) - code fields, as returned by Code.as_dict.
+  param: defaults(tuple) - function default args.
+
+  Returns:
+    A bytes object.
+  """
+  out = [HEADER]
+  _encode_value(tuple([fields[f] for f in CODE_FIELDS]) + (defaults,), out)
+  return b''.join(out)
+
+
+def loads(data):
+  """
+  Decodes a binary encoded payload.
+
+  param: data(bytes) - payload to be decoded.
+
+  Returns:
+    A dict with the code fields and the defaults.
+  """
+  buf = memoryview(data)
+  if bytes(buf[:len(MAGIC)]) != MAGIC:
+    raise EncodingError('Invalid magic number')
+  try:
+    version = struct.unpack_from('>B', buf, len(MAGIC))[0]
+  except struct.error as e:
+    raise EncodingError('Invalid header')
+  if version != VERSION:
+    raise EncodingError('Unsupported version %s' % version)
+  try:
+    (values, offset) = _decode_value(buf, len(HEADER))
+  except (struct.error, UnicodeDecodeError, TypeError) as e:
+    raise EncodingError(str(e))
+  if offset != len(buf) or type(values) is not tuple or len(values) != len(CODE_FIELDS) + 1:
+    raise EncodingError('Invalid payload')
+  data = dict(zip(CODE_FIELDS, values))
+  data['defaults'] = values[-1]
+  return data
@@ -1,6 +1,7 @@
 import json
 import six
 import base64
+import binascii
 
 
 def fix_tuple_item(s):
@@ -63,3 +64,37 @@ def decode(data):
   if six.PY2 is True:
     return base64.b64decode(data)
   return base64.b64decode(data.encode('utf8')).decode('utf8')
+
+
+def decode_bytes(data):
+  """
+  Decodes a base64 string without decoding the result as text, used by binary payloads.
+
+  param: data(string) - A base64 string to be decoded.
+
+  Returns:
+    A string (python 2) or bytes (python 3) with the decoded value
+  """
+  if six.PY2 is True:
+    return base64.b64decode(data)
+  return base64.b64decode(data.encode('utf8'))
+
+
+def decode_chunks(chunks):
+  """
+  Decodes base64 data incrementally, whitespace (wrapped lines) is ignored and chunks may have any size.
+
+  param: chunks(iterable) - string (python 2) or bytes (python 3) chunks of base64 data.
+
+  Returns:
+    A generator of decoded byte chunks, it raises ValueError on invalid data.
+  """
+  rest = b''
+  for chunk in chunks:
+    chunk = rest + b''.join(chunk.split())
+    size = len(chunk) - len(chunk) % 4
+    rest = chunk[size:]
+    if size > 0:
+      yield binascii.a2b_base64(chunk[:size])
+  if rest:
+    yield binascii.a2b_base64(rest)
@@ -0,0 +1,64 @@
+import mmap
+import os
+import stat
+import sys
+
+from smrunner.helpers import encoders
+
+
+MMAP_THRESHOLD = 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+
+
+def _open(path):
+  if path == '-':
+    return getattr(sys.stdin, 'buffer', sys.stdin)
+  return open(path, 'rb')
+
+
+def _chunks(source, size=None):
+  size = size or CHUNK_SIZE
+  for offset in range(0, len(source), size):
+    yield source[offset:offset + size]
+
+
+def _mappable(f):
+  try:
+    st = os.fstat(f.fileno())
+    return stat.S_ISREG(st.st_mode) and st.st_size >= max(MMAP_THRESHOLD, 1) and f.tell() == 0
+  except (AttributeError, IOError, OSError, ValueError) as e:
+    return False
+
+
+def read(path, encode=False):
+  """
+  Reads a whole input file, "-" reads stdin.
+
+  Base64 encoded regular files larger than MMAP_THRESHOLD are memory mapped instead of read, so the raw content
+  isn't copied in memory when it is decoded, which happens incrementally in CHUNK_SIZE chunks. Other content is
+  read once, mapping it would only add a copy.
+
+  param: path(str) - file path or "-".
+  param: encode(bool) - flag to indicate if the content is base64 encoded.
+
+  Returns:
+    A string (python 2) or bytes (python 3) with the content, base64 decoded when "encode" is set.
+  """
+  f = _open(path)
+  try:
+    if encode is not True:
+      return f.read()
+    mm = None
+    if _mappable(f):
+      mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+      source = mm
+    else:
+      source = f.read()
+    try:
+      return b''.join(encoders.decode_chunks(_chunks(source)))
+    finally:
+      if mm is not None:
+        mm.close()
+  finally:
+    if path != '-':
+      f.close()
@@ -0,0 +1,148 @@
+import time
+
+from six.moves import _thread
+
+
+if hasattr(time, 'perf_counter'):
+  clock = time.perf_counter
+else:
+  clock = time.time
+
+_local = _thread._local()
+
+
+class _Phase(object):
+  """
+  Context manager that adds its elapsed time to a Timings phase.
+  """
+  __slots__ = ('timings', 'name', 'start')
+
+  def __init__(self, timings, name):
+    self.timings = timings
+    self.name = name
+    self.start = None
+
+  def __enter__(self):
+    self.start = clock()
+    return self
+
+  def __exit__(self, *args):
+    self.timings.add(self.name, clock() - self.start)
+
+
+class _NullPhase(object):
+  """
+  No-op phase context manager.
+  """
+  __slots__ = ()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    pass
+
+
+NULL_PHASE = _NullPhase()
+
+
+class Timings(object):
+  """
+  Per call instrumentation context, it records monotonic timings for each phase and extra metadata.
+  """
+  enabled = True
+
+  def __init__(self):
+    self.phases = {}
+    self.meta = {}
+
+  def phase(self, name):
+    """
+    Creates a context manager that times a phase, a phase entered many times accumulates its timings.
+
+    param: name(str) - phase name.
+
+    Returns:
+      A context manager.
+    """
+    return _Phase(self, name)
+
+  def add(self, name, seconds):
+    """
+    Adds an elapsed time to a phase.
+
+    param: name(str) - phase name.
+    param: seconds(float) - elapsed time.
+    """
+    self.phases[name] = self.phases.get(name, 0) + seconds
+
+  def annotate(self, key, value):
+    """
+    Attaches extra metadata to the call.
+
+    param: key(str) - metadata key.
+    param: value(any) - json serializable value.
+    """
+    self.meta[key] = value
+
+  def as_dict(self):
+    """
+    Retrieves the recorded timings and metadata, to be used as a response "meta" member.
+
+    Returns:
+      A dict with the phase timings (in seconds) under "timings" and the metadata keys.
+    """
+    data = dict(self.meta)
+    data['timings'] = dict(self.phases)
+    return data
+
+
+class _NullTimings(object):
+  """
+  Default context used when instrumentation is disabled, all methods are no-ops.
+  """
+  enabled = False
+
+  def phase(self, name):
+    return NULL_PHASE
+
+  def add(self, name, seconds):
+    pass
+
+  def annotate(self, key, value):
+    pass
+
+  def as_dict(self):
+    return None
+
+
+NULL_TIMINGS = _NullTimings()
+
+
+def current():
+  """
+  Retrieves the instrumentation context active in the current thread.
+
+  Returns:
+    A Timings object or the no-op NULL_TIMINGS.
+  """
+  return getattr(_local, 'timings', NULL_TIMINGS)
+
+
+class activate(object):
+  """
+  Context manager that makes a Timings object the active one in the current thread.
+
+  param: timings(Timings) - context to be activated, None keeps instrumentation disabled.
+  """
+  def __init__(self, timings=None):
+    self.timings = timings or NULL_TIMINGS
+    self.previous = None
+
+  def __enter__(self):
+    self.previous = current()
+    _local.timings = self.timings
+    return self.timings
+
+  def __exit__(self, *args):
+    _local.timings = self.previous
@@ -0,0 +1,178 @@
+import signal
+import time
+
+from smrunner import errors
+from smrunner.instrument import clock
+
+
+if hasattr(time, 'process_time'):
+  cpu_clock = time.process_time
+else:
+  cpu_clock = time.clock
+
+
+class deadline(object):
+  """
+  Context manager enforcing wall clock and cpu time limits on the code it wraps.
+
+  Limits are enforced with interval timers (SIGALRM and SIGPROF) raising errors.TimeoutError, so they only
+  work in the main thread of a process and can't interrupt a blocking call that doesn't return to python.
+  RunnerPool adds a parent side watchdog for those cases. Limits can't be enforced in other threads, so they are
+  rejected there with errors.InvalidParamsError rather than ignored.
+
+  param: wall(float) - wall clock limit, in seconds.
+  param: cpu(float) - cpu time (user and system) limit, in seconds.
+  param: name(str) - function name reported in the error.
+  """
+  def __init__(self, wall=None, cpu=None, name=None):
+    self.wall = wall
+    self.cpu = cpu
+    self.name = name
+    self._handlers = {}
+
+  def _on_wall(self, signum, frame):
+    raise errors.TimeoutError(self.name, self.wall, 'wall')
+
+  def _on_cpu(self, signum, frame):
+    raise errors.TimeoutError(self.name, self.cpu, 'cpu')
+
+  def _arm(self, signum, timer, seconds, handler):
+    try:
+      self._handlers[signum] = (timer, signal.signal(signum, handler))
+    except ValueError:
+      self.__exit__()
+      raise errors.InvalidParamsError(self.name, {'timeout': self.wall, 'cpu_limit': self.cpu})
+    signal.setitimer(timer, seconds)
+
+  def __enter__(self):
+    if self.wall:
+      self._arm(signal.SIGALRM, signal.ITIMER_REAL, self.wall, self._on_wall)
+    if self.cpu:
+      self._arm(signal.SIGPROF, signal.ITIMER_PROF, self.cpu, self._on_cpu)
+    return self
+
+  def __exit__(self, *args):
+    for (signum, (timer, handler)) in self._handlers.items():
+      signal.setitimer(timer, 0)
+      signal.signal(signum, handler)
+    self._handlers = {}
+
+
+def set_memory_limit(limit):
+  """
+  Limits the address space of the whole process (RLIMIT_AS), allocations beyond it raise MemoryError.
+
+  param: limit(int) - limit, in bytes.
+
+  Returns:
+    True if the limit was set, False if it is not supported by the platform.
+  """
+  try:
+    import resource
+  except ImportError:
+    return False
+  (soft, hard) = resource.getrlimit(resource.RLIMIT_AS)
+  if hard != resource.RLIM_INFINITY:
+    limit = min(limit, hard)
+  resource.setrlimit(resource.RLIMIT_AS, (limit, hard))
+  return True
+
+
+class memory(object):
+  """
+  Context manager limiting how much the address space may grow while the code it wraps runs.
+
+  The limit is enforced by lowering RLIMIT_AS, an allocation beyond it raises MemoryError which is reported as
+  errors.MemoryLimitError. The limit applies to the whole process, so it can only be set in the main thread (not
+  in threaded servers, RunnerPool has a per worker limit) and only on platforms with the resource module and
+  "/proc" (linux). Elsewhere it is rejected with errors.InvalidParamsError rather than ignored.
+
+  param: limit(int) - address space growth limit, in bytes.
+  param: name(str) - function name reported in the error.
+  """
+  def __init__(self, limit=None, name=None):
+    self.limit = limit
+    self.name = name
+    self._previous = None
+
+  def __enter__(self):
+    if not self.limit:
+      return self
+    import threading
+    from smrunner.memory import address_space
+    size = address_space()
+    if size is None or not isinstance(threading.current_thread(), threading._MainThread):
+      raise errors.InvalidParamsError(self.name, {'memory_limit': self.limit})
+    import resource
+    self._previous = resource.getrlimit(resource.RLIMIT_AS)
+    limit = size + self.limit
+    if self._previous[0] != resource.RLIM_INFINITY:
+      limit = min(limit, self._previous[0])
+    set_memory_limit(limit)
+    return self
+
+  def __exit__(self, exc_type, exc_value, tb):
+    if self._previous is None:
+      return
+    import resource
+    resource.setrlimit(resource.RLIMIT_AS, self._previous)
+    self._previous = None
+    if exc_type is not None and issubclass(exc_type, MemoryError):
+      raise errors.MemoryLimitError(self.name, self.limit)
+
+
+def iterate(items, wall=None, cpu=None, memory_limit=None, name=None):
+  """
+  Iterates a generator or iterator response within wall clock, cpu time and memory limits, the call that returned
+  it is over before its items are produced so its limits don't cover them.
+
+  The limits are enforced around each step and bound the time spent and the address space growth while producing
+  the items, the time the consumer spends between items is not counted.
+
+  param: items(iterator) - function response.
+  param: wall(float) - wall clock limit, in seconds.
+  param: cpu(float) - cpu time limit, in seconds.
+  param: memory_limit(int) - address space growth limit, in bytes.
+  param: name(str) - function name reported in the errors.
+
+  Returns:
+    A generator.
+  """
+  items = iter(items)
+  (wall_used, cpu_used, base) = (0.0, 0.0, None)
+  if memory_limit:
+    from smrunner.memory import address_space
+    base = address_space()
+  try:
+    while True:
+      (wall_left, cpu_left, memory_left) = (wall, cpu, memory_limit)
+      if wall:
+        wall_left = wall - wall_used
+        if wall_left <= 0:
+          raise errors.TimeoutError(name, wall, 'wall')
+      if cpu:
+        cpu_left = cpu - cpu_used
+        if cpu_left <= 0:
+          raise errors.TimeoutError(name, cpu, 'cpu')
+      if memory_limit and base is not None:
+        memory_left = memory_limit - max((address_space() or base) - base, 0)
+        if memory_left <= 0:
+          raise errors.MemoryLimitError(name, memory_limit)
+      (start, cpu_start) = (clock(), cpu_clock())
+      try:
+        with deadline(wall_left, cpu_left, name), memory(memory_left, name):
+          item = next(items)
+      except StopIteration:
+        return
+      except errors.TimeoutError as e:
+        raise errors.TimeoutError(name, wall if e.kind == 'wall' else cpu, e.kind)
+      except errors.MemoryLimitError as e:
+        raise errors.MemoryLimitError(name, memory_limit)
+      finally:
+        wall_used += clock() - start
+        cpu_used += cpu_clock() - cpu_start
+      yield item
+  finally:
+    close = getattr(items, 'close', None)
+    if close is not None:
+      close()
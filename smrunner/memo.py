@@ -0,0 +1,113 @@
+import json
+
+from smrunner import cache, instrument
+
+
+DEFAULT_MAX_ENTRIES = 4096
+DEFAULT_MAX_BYTES = 32 * 1024 * 1024
+DEFAULT_TTL = 300
+
+MISSING = object()
+
+
+def key(digest, params):
+  """
+  Computes the memoization key of a call, params are canonicalized as sorted compact json.
+
+  param: digest(str) - code digest.
+  param: params(list or dict) - decoded function params.
+
+  Returns:
+    A string with the key or None if the params can't be encoded as json.
+  """
+  try:
+    return '%s:%s' % (digest, json.dumps(params, sort_keys=True, separators=(',', ':')))
+  except (TypeError, ValueError) as e:
+    return None
+
+
+class ResultCache(object):
+  """
+  Results of pure (deterministic and side effect free) functions, keyed by code digest and params.
+
+  Entries are evicted by LRU, expire after "ttl" seconds and are bounded by the size of their json encoded
+  results. Only json serializable results are cached, cached values are shared so they must not be mutated.
+  """
+  def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+    self._entries = cache.LRUCache(maxsize=max_entries, maxbytes=max_bytes, ttl=ttl)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def call(self, digest, params, run):
+    """
+    Retrieves a cached result or runs the call and caches its result.
+
+    The "memo" metadata of the active instrumentation context is set to "hit", "miss" or "skip" (params or
+    result can't be cached).
+
+    param: digest(str) - code digest.
+    param: params(list or dict) - decoded function params.
+    param: run(callable) - callable without arguments running the function.
+
+    Returns:
+      The function response.
+    """
+    timings = instrument.current()
+    (k, result) = self.lookup(digest, params)
+    if result is not MISSING:
+      timings.annotate('memo', 'hit')
+      return result
+    result = run()
+    if k is not None and self.store(k, result) is True:
+      timings.annotate('memo', 'miss')
+    else:
+      timings.annotate('memo', 'skip')
+    return result
+
+  def lookup(self, digest, params):
+    """
+    Retrieves a cached result.
+
+    param: digest(str) - code digest.
+    param: params(list or dict) - decoded function params.
+
+    Returns:
+      A tuple with the call key (None if the params can't be cached) and the result or MISSING.
+    """
+    k = key(digest, params)
+    if k is None:
+      return (None, MISSING)
+    return (k, self._entries.get(k, MISSING))
+
+  def store(self, k, result):
+    """
+    Caches a result, unless it can't be encoded as json.
+
+    param: k(str) - call key returned by "lookup".
+    param: result(any) - function response.
+
+    Returns:
+      True if the result was cached, False otherwise.
+    """
+    try:
+      size = len(json.dumps(result))
+    except (TypeError, ValueError) as e:
+      return False
+    self._entries.put(k, result, size=size)
+    return True
+
+  def clear(self):
+    self._entries.clear()
+
+  def stats(self):
+    """
+    Retrieves the result cache counters.
+
+    Returns:
+      A dict with the LRUCache stats.
+    """
+    return self._entries.stats()
+
+
+default_results = ResultCache()
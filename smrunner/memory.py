@@ -0,0 +1,255 @@
+import os
+
+from six.moves import _thread
+
+from smrunner import cache, instrument
+
+
+DEFAULT_MAX_ENTRIES = 1024
+
+_local = _thread._local()
+_tracing_lock = _thread.allocate_lock()
+_tracing = 0
+_owned = False
+
+
+def _statm(field):
+  try:
+    with open('/proc/self/statm') as f:
+      return int(f.read().split()[field]) * os.sysconf('SC_PAGE_SIZE')
+  except (IOError, OSError, ValueError, IndexError):
+    return None
+
+
+def rss():
+  """
+  Retrieves the resident set size of the process, only available on linux.
+
+  Returns:
+    The size in bytes or None.
+  """
+  return _statm(1)
+
+
+def address_space():
+  """
+  Retrieves the virtual address space size of the process, the value limited by RLIMIT_AS, only available on linux.
+
+  Returns:
+    The size in bytes or None.
+  """
+  return _statm(0)
+
+
+def _start_tracing():
+  global _tracing, _owned
+  try:
+    import tracemalloc
+  except ImportError:
+    return (None, None)
+  with _tracing_lock:
+    if _tracing == 0:
+      _owned = not tracemalloc.is_tracing()
+      if _owned is True:
+        tracemalloc.start()
+    if _owned is False and hasattr(tracemalloc, 'reset_peak'):
+      tracemalloc.reset_peak()
+    _tracing += 1
+    return (tracemalloc, tracemalloc.get_traced_memory())
+
+
+def _stop_tracing(tracemalloc, baseline):
+  global _tracing
+  with _tracing_lock:
+    (current, peak) = tracemalloc.get_traced_memory()
+    _tracing -= 1
+    if _tracing == 0 and _owned is True:
+      tracemalloc.stop()
+  (base_current, base_peak) = baseline
+  # Without "reset_peak" (python < 3.9) the peak may predate the call, it is only the call peak when it grew.
+  if peak > base_peak or base_peak == base_current:
+    return peak - base_current
+  return None
+
+
+class _NullSession(object):
+  """
+  No-op accounting session context manager.
+  """
+  __slots__ = ()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    pass
+
+
+NULL_SESSION = _NullSession()
+
+
+class _Session(object):
+  """
+  Context manager that measures the tracemalloc peak and the RSS delta of a single call, they are attached to the
+  active instrumentation context as "memory" metadata and aggregated by the accounting object. The peak is relative
+  to the memory traced when the call starts, it is None when it can't be told apart from an earlier peak.
+  """
+  __slots__ = ('accounting', 'code', 'tracemalloc', 'baseline', 'rss')
+
+  def __init__(self, accounting, code):
+    self.accounting = accounting
+    self.code = code
+    self.tracemalloc = None
+    self.baseline = None
+    self.rss = None
+
+  def __enter__(self):
+    self.rss = rss()
+    (self.tracemalloc, self.baseline) = _start_tracing()
+    return self
+
+  def __exit__(self, *args):
+    peak = None
+    if self.tracemalloc is not None:
+      peak = _stop_tracing(self.tracemalloc, self.baseline)
+    rss_delta = None
+    current = rss()
+    if self.rss is not None and current is not None:
+      rss_delta = current - self.rss
+    instrument.current().annotate('memory', {'peak': peak, 'rss_delta': rss_delta})
+    self.accounting.add(self.code.digest(), self.code.name, peak, rss_delta)
+
+
+class Accounting(object):
+  """
+  Per call memory accounting, the measures are aggregated by code digest.
+
+  Tracing allocations with tracemalloc slows the calls down, so it is meant to be enabled on demand. Calls measured
+  concurrently in many threads share the tracemalloc peak, so their peaks are an upper bound.
+
+  param: max_entries(int) - number of functions kept in the aggregated stats.
+  """
+  def __init__(self, max_entries=DEFAULT_MAX_ENTRIES):
+    self._entries = cache.LRUCache(maxsize=max_entries)
+    self._lock = _thread.allocate_lock()
+
+  def session(self, code):
+    """
+    Creates the accounting context manager of a call.
+
+    param: code(FastCode or Code) - code of the called function.
+
+    Returns:
+      A context manager.
+    """
+    return _Session(self, code)
+
+  def add(self, digest, name, peak, rss_delta):
+    """
+    Aggregates the measures of a call.
+
+    param: digest(str) - code digest.
+    param: name(str) - function name.
+    param: peak(int) - tracemalloc peak, in bytes, None when not available.
+    param: rss_delta(int) - RSS delta, in bytes, None when not available.
+    """
+    with self._lock:
+      entry = self._entries.get(digest)
+      if entry is None:
+        entry = {'name': name, 'calls': 0, 'peak_max': 0, 'peak_total': 0, 'rss_delta_max': 0}
+        self._entries.put(digest, entry)
+      entry['calls'] += 1
+      entry['peak_max'] = max(entry['peak_max'], peak or 0)
+      entry['peak_total'] += peak or 0
+      entry['rss_delta_max'] = max(entry['rss_delta_max'], rss_delta or 0)
+
+  def stats(self):
+    """
+    Retrieves the aggregated measures.
+
+    Returns:
+      A dict of code digest to a dict with the function name, number of calls, max and mean peak and max RSS delta.
+    """
+    with self._lock:
+      entries = self._entries.items()
+    stats = {}
+    for (digest, entry) in entries:
+      stats[digest] = {
+        'name': entry['name'],
+        'calls': entry['calls'],
+        'peak_max': entry['peak_max'],
+        'peak_mean': entry['peak_total'] // entry['calls'],
+        'rss_delta_max': entry['rss_delta_max']
+      }
+    return stats
+
+
+class _NullAccounting(object):
+  """
+  Default accounting used when memory accounting is disabled.
+  """
+  def session(self, code):
+    return NULL_SESSION
+
+
+NULL_ACCOUNTING = _NullAccounting()
+
+default_accounting = Accounting()
+
+_default = NULL_ACCOUNTING
+
+
+def configure(enabled):
+  """
+  Enables or disables the accounting of every call of the process, such as every request of a server.
+
+  param: enabled(bool) - flag to enable the accounting.
+  """
+  global _default
+  _default = default_accounting if enabled else NULL_ACCOUNTING
+
+
+def enabled():
+  """
+  Checks if the accounting of every call is enabled.
+
+  Returns:
+    A boolean.
+  """
+  return _default is not NULL_ACCOUNTING
+
+
+def current():
+  """
+  Retrieves the accounting active in the current thread.
+
+  Returns:
+    An Accounting object or the no-op NULL_ACCOUNTING.
+  """
+  return getattr(_local, 'accounting', _default)
+
+
+class activate(object):
+  """
+  Context manager that enables the accounting in the current thread, measures go to "default_accounting".
+
+  param: enabled(bool) - flag to enable the accounting, False keeps the process default.
+  """
+  def __init__(self, enabled=False):
+    self.enabled = enabled
+    self.previous = None
+
+  def __enter__(self):
+    self.previous = getattr(_local, 'accounting', None)
+    if self.enabled is True:
+      _local.accounting = default_accounting
+    return current()
+
+  def __exit__(self, *args):
+    if self.previous is None:
+      try:
+        del _local.accounting
+      except AttributeError:
+        pass
+    else:
+      _local.accounting = self.previous
@@ -0,0 +1,383 @@
+import bisect
+import os
+import sys
+
+from six.moves import _thread
+
+from smrunner import cache, errors, memo, memory
+from smrunner.instrument import clock
+from smrunner.registry import default_registry
+
+
+# Latency buckets upper bounds, in seconds, an implicit "+Inf" bucket follows the last one.
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_INTERVAL = 15.0
+
+INTERNAL_ERROR_CODE = -32603
+OTHER = 'other'
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Entry(object):
+  """
+  Counters of a single function.
+  """
+  __slots__ = ('name', 'calls', 'total', 'errors', 'buckets')
+
+  def __init__(self, name, size):
+    self.name = name
+    self.calls = 0
+    self.total = 0.0
+    self.errors = {}
+    self.buckets = [0] * size
+
+
+def _error_code(error):
+  return error.code if isinstance(error, errors.BaseError) else INTERNAL_ERROR_CODE
+
+
+class _Timer(object):
+  """
+  Context manager that records a call in a metrics registry, errors are counted by their JSONRPC code.
+  """
+  __slots__ = ('registry', 'digest', 'name', 'start', 'deferred')
+
+  def __init__(self, registry, digest, name):
+    self.registry = registry
+    self.digest = digest
+    self.name = name
+    self.start = None
+    self.deferred = False
+
+  def __enter__(self):
+    self.start = clock()
+    return self
+
+  def __exit__(self, exc_type, exc_value, tb):
+    if exc_type is not None:
+      self.registry.observe(self.digest, self.name, clock() - self.start, _error_code(exc_value))
+    elif self.deferred is False:
+      self.registry.observe(self.digest, self.name, clock() - self.start)
+
+  def stream(self, items):
+    """
+    Defers the recording of the call until its generator response is iterated, the latency adds the time spent
+    producing the items to the call one, not the time the consumer spends between items.
+
+    param: items(iterator) - function response.
+
+    Returns:
+      A generator.
+    """
+    self.deferred = True
+    return self._iterate(iter(items), clock() - self.start)
+
+  def _iterate(self, items, seconds):
+    code = None
+    try:
+      while True:
+        start = clock()
+        try:
+          item = next(items)
+        except StopIteration:
+          return
+        except Exception as e:
+          code = _error_code(e)
+          raise
+        finally:
+          seconds += clock() - start
+        yield item
+    finally:
+      self.registry.observe(self.digest, self.name, seconds, code)
+      close = getattr(items, 'close', None)
+      if close is not None:
+        close()
+
+
+class Registry(object):
+  """
+  In-process metrics of function calls keyed by code digest: call counts, error counts by code and latency
+  histograms with fixed buckets.
+
+  Updates don't take any lock, each thread records in its own shard which is merged with the others when the
+  metrics are read, so reads may miss the calls still being recorded. Once "max_entries" functions are tracked
+  by a thread, its new functions are aggregated under the "other" digest.
+
+  param: buckets(tuple) - sorted latency buckets upper bounds, in seconds.
+  param: max_entries(int) - number of functions tracked per thread.
+  """
+  def __init__(self, buckets=DEFAULT_BUCKETS, max_entries=DEFAULT_MAX_ENTRIES):
+    self.buckets = tuple(buckets)
+    self.max_entries = max_entries
+    self._lock = _thread.allocate_lock()
+    self._local = _thread._local()
+    self._shards = []
+
+  def _shard(self):
+    shard = getattr(self._local, 'shard', None)
+    if shard is None:
+      shard = {}
+      with self._lock:
+        self._local.shard = shard
+        self._shards.append(shard)
+    return shard
+
+  def timer(self, digest, name):
+    """
+    Creates a context manager that records the call it wraps.
+
+    param: digest(str) - code digest.
+    param: name(str) - function name.
+
+    Returns:
+      A context manager.
+    """
+    return _Timer(self, digest, name)
+
+  def observe(self, digest, name, seconds, code=None):
+    """
+    Records a call.
+
+    param: digest(str) - code digest.
+    param: name(str) - function name.
+    param: seconds(float) - call latency.
+    param: code(int) - JSONRPC error code of a failed call, None if it succeeded.
+    """
+    shard = self._shard()
+    entry = shard.get(digest)
+    if entry is None:
+      if len(shard) >= self.max_entries:
+        (digest, name) = (OTHER, OTHER)
+        entry = shard.get(digest)
+      if entry is None:
+        entry = _Entry(name, len(self.buckets) + 1)
+        shard[digest] = entry
+    entry.calls += 1
+    entry.total += seconds
+    entry.buckets[bisect.bisect_left(self.buckets, seconds)] += 1
+    if code is not None:
+      entry.errors[code] = entry.errors.get(code, 0) + 1
+
+  def functions(self):
+    """
+    Retrieves the merged counters of every function.
+
+    Returns:
+      A dict of code digest to a dict with the function name, number of calls, errors by code and the latency
+      histogram, as cumulative [upper bound, count] buckets (the last bound is "+Inf") and the latencies sum.
+    """
+    with self._lock:
+      shards = list(self._shards)
+    merged = {}
+    for shard in shards:
+      for (digest, entry) in list(shard.items()):
+        data = merged.get(digest)
+        if data is None:
+          data = {'name': entry.name, 'calls': 0, 'errors': {}, 'sum': 0.0, 'counts': [0] * (len(self.buckets) + 1)}
+          merged[digest] = data
+        data['calls'] += entry.calls
+        data['sum'] += entry.total
+        for (code, count) in list(entry.errors.items()):
+          data['errors'][code] = data['errors'].get(code, 0) + count
+        data['counts'] = [a + b for (a, b) in zip(data['counts'], list(entry.buckets))]
+    functions = {}
+    for (digest, data) in merged.items():
+      cumulative = 0
+      buckets = []
+      for (bound, count) in zip(self.buckets + ('+Inf', ), data['counts']):
+        cumulative += count
+        buckets.append([bound, cumulative])
+      functions[digest] = {
+        'name': data['name'],
+        'calls': data['calls'],
+        'errors': data['errors'],
+        'latency': {
+          'buckets': buckets,
+          'sum': data['sum']
+        }
+      }
+    return functions
+
+  def clear(self):
+    """
+    Removes all counters.
+    """
+    with self._lock:
+      self._local = _thread._local()
+      self._shards = []
+
+
+default_metrics = Registry()
+
+
+def hit_rate(stats):
+  """
+  Computes the hit rate of a cache.
+
+  param: stats(dict) - LRUCache stats.
+
+  Returns:
+    The ratio of hits to lookups or None if the cache was never looked up.
+  """
+  lookups = stats['hits'] + stats['misses']
+  if lookups == 0:
+    return None
+  return float(stats['hits']) / lookups
+
+
+def caches():
+  """
+  Retrieves the counters of the process caches, "build" (built function objects), "results" (memoized results of
+  pure functions) and "registry" (registered functions).
+
+  Returns:
+    A dict of cache name to its LRUCache stats along with its "hit_rate".
+  """
+  data = {
+    'build': cache.build_cache.stats(),
+    'results': memo.default_results.stats(),
+    'registry': default_registry.stats()
+  }
+  for stats in data.values():
+    stats['hit_rate'] = hit_rate(stats)
+  return data
+
+
+def snapshot(registry=None):
+  """
+  Retrieves every metric of the process, served by the "stats" JSONRPC method.
+
+  param: registry(Registry) - metrics registry, "default_metrics" by default.
+
+  Returns:
+    A dict with the "functions" counters, the "caches" counters and the "memory" accounting stats.
+  """
+  return {
+    'functions': (registry or default_metrics).functions(),
+    'caches': caches(),
+    'memory': memory.default_accounting.stats()
+  }
+
+
+def _escape(value):
+  return ('%s' % value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+  return '{%s}' % ','.join(['%s="%s"' % (k, _escape(v)) for (k, v) in sorted(labels.items())])
+
+
+def _number(value):
+  if isinstance(value, float):
+    return repr(value)
+  return '%s' % value
+
+
+def prometheus(registry=None):
+  """
+  Dumps the function and cache metrics in the Prometheus text exposition format.
+
+  param: registry(Registry) - metrics registry, "default_metrics" by default.
+
+  Returns:
+    A string.
+  """
+  functions = (registry or default_metrics).functions()
+  lines = [
+    '# HELP smrunner_calls_total Function calls.',
+    '# TYPE smrunner_calls_total counter'
+  ]
+  for (digest, data) in sorted(functions.items()):
+    lines.append('smrunner_calls_total%s %s' % (_labels(digest=digest, function=data['name']), data['calls']))
+  lines.append('# HELP smrunner_call_errors_total Function call errors by JSONRPC error code.')
+  lines.append('# TYPE smrunner_call_errors_total counter')
+  for (digest, data) in sorted(functions.items()):
+    for (code, count) in sorted(data['errors'].items()):
+      labels = _labels(digest=digest, function=data['name'], code=code)
+      lines.append('smrunner_call_errors_total%s %s' % (labels, count))
+  lines.append('# HELP smrunner_call_duration_seconds Function call latency.')
+  lines.append('# TYPE smrunner_call_duration_seconds histogram')
+  for (digest, data) in sorted(functions.items()):
+    for (bound, count) in data['latency']['buckets']:
+      labels = _labels(digest=digest, function=data['name'], le=_number(bound))
+      lines.append('smrunner_call_duration_seconds_bucket%s %s' % (labels, count))
+    labels = _labels(digest=digest, function=data['name'])
+    lines.append('smrunner_call_duration_seconds_sum%s %s' % (labels, _number(data['latency']['sum'])))
+    lines.append('smrunner_call_duration_seconds_count%s %s' % (labels, data['calls']))
+  cache_stats = sorted(caches().items())
+  for (metric, key, kind, text) in (('hits_total', 'hits', 'counter', 'Cache hits.'),
+                                    ('misses_total', 'misses', 'counter', 'Cache misses.'),
+                                    ('entries', 'size', 'gauge', 'Cache entries.')):
+    lines.append('# HELP smrunner_cache_%s %s' % (metric, text))
+    lines.append('# TYPE smrunner_cache_%s %s' % (metric, kind))
+    for (name, stats) in cache_stats:
+      lines.append('smrunner_cache_%s%s %s' % (metric, _labels(cache=name), stats[key]))
+  return '%s\n' % '\n'.join(lines)
+
+
+def write_prometheus(path, registry=None):
+  """
+  Writes the Prometheus text dump to a file, atomically so a collector (such as the node exporter textfile
+  collector) never reads a partial file.
+
+  param: path(str) - file path.
+  param: registry(Registry) - metrics registry, "default_metrics" by default.
+  """
+  tmp = '%s.%s.tmp' % (path, os.getpid())
+  with open(tmp, 'w') as f:
+    f.write(prometheus(registry))
+  getattr(os, 'replace', os.rename)(tmp, path)
+
+
+class Dumper(object):
+  """
+  Background thread writing the Prometheus text dump to a file every "interval" seconds, and once more on stop.
+  Write failures are reported on stderr, they don't stop the dumper nor the process.
+
+  param: path(str) - file path.
+  param: interval(float) - seconds between dumps.
+  """
+  def __init__(self, path, interval=DEFAULT_INTERVAL):
+    self.path = path
+    self.interval = interval
+    self._stopped = None
+    self._thread = None
+
+  def _write(self):
+    try:
+      write_prometheus(self.path)
+    except (IOError, OSError) as e:
+      sys.stderr.write('Failed to write metrics to %s: %s\n' % (self.path, e))
+      return False
+    return True
+
+  def _run(self):
+    while not self._stopped.wait(self.interval):
+      self._write()
+
+  def start(self):
+    """
+    Starts the dumper thread.
+
+    Returns:
+      The Dumper object.
+    """
+    import threading
+    self._stopped = threading.Event()
+    self._thread = threading.Thread(target=self._run)
+    self._thread.daemon = True
+    self._thread.start()
+    return self
+
+  def stop(self):
+    """
+    Stops the dumper thread and writes the last dump.
+
+    Returns:
+      False if the last dump could not be written, True otherwise.
+    """
+    self._stopped.set()
+    self._thread.join()
+    return self._write()
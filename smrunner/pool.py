@@ -0,0 +1,323 @@
+import multiprocessing
+import threading
+import traceback
+
+from concurrent.futures import Future
+from six.moves import queue
+
+from smrunner import cache, env, errors, limits, memory, rpc, shm
+from smrunner.fast import FastCode, FastFunction
+
+
+_functions = cache.LRUCache(maxsize=256)
+_shm_threshold = None
+_memory_limit = None
+
+
+def _load(digest, payload):
+  """
+  Retrieves a FastFunction object from the worker local cache, decoding its payload on a cache miss.
+
+  param: digest(str) - code digest.
+  param: payload(bytes) - code binary data.
+
+  Returns:
+    A FastFunction object.
+  """
+  func = _functions.get(digest)
+  if func is None:
+    func = FastFunction.from_code(FastCode.from_bytes(payload))
+    _functions.put(digest, func)
+  return func
+
+
+def _execute(digest, name, payload, args, kwargs, timeout=None, cpu_limit=None):
+  """
+  Runs a single call inside a worker process, within its wall clock and cpu time limits.
+
+  Returns:
+    A tuple with a success flag and the function response or the raised error.
+  """
+  try:
+    func = _load(digest, payload)
+    with limits.deadline(timeout, cpu_limit, name):
+      result = func(*args, **kwargs)
+      if rpc.is_stream(result):
+        result = list(result)
+    return (True, shm.export_large(result, _shm_threshold))
+  except errors.BaseError as e:
+    return (False, e)
+  except MemoryError as e:
+    if _memory_limit is None:
+      raise
+    return (False, errors.MemoryLimitError(name, _memory_limit))
+  except Exception as e:
+    params = {
+      'args': args,
+      'kwargs': kwargs
+    }
+    return (False, errors.RuntimeError(name, params, traceback.format_exc()))
+
+
+def _worker_main(conn, preload=None, base_globals=None, shm_threshold=None, memory_limit=None):
+  """
+  Worker process loop, it receives call chunks from the pipe and sends back their results.
+
+  param: conn(multiprocessing.Connection) - worker end of the pipe.
+  param: preload(list) - module names imported at worker start, bound in the functions globals.
+  param: base_globals(dict) - extra globals of the functions.
+  param: shm_threshold(int) - minimum size of buffer results sent through shared memory.
+  param: memory_limit(int) - address space growth limit of the worker, in bytes.
+  """
+  global _shm_threshold, _memory_limit
+  _shm_threshold = shm_threshold
+  env.configure(preload, base_globals)
+  if memory_limit:
+    size = memory.address_space()
+    if size is not None and limits.set_memory_limit(size + memory_limit) is True:
+      _memory_limit = memory_limit
+  while True:
+    try:
+      chunk = conn.recv()
+    except EOFError:
+      return
+    if chunk is None:
+      return
+    (digest, name, payload, calls, timeout, cpu_limit) = chunk
+    results = [_execute(digest, name, payload, args, kwargs, timeout, cpu_limit) for (args, kwargs) in calls]
+    try:
+      conn.send(results)
+    except Exception as e:
+      conn.send([(False, errors.InternalError())] * len(results))
+
+
+class _Worker(object):
+  """
+  Parent side handle of a worker process.
+  """
+  def __init__(self, context, preload=None, base_globals=None, shm_threshold=None, memory_limit=None):
+    (self.conn, child) = context.Pipe()
+    self.process = context.Process(target=_worker_main, args=(child, preload, base_globals, shm_threshold, memory_limit))
+    self.process.daemon = True
+    self.process.start()
+    child.close()
+    self.tasks = 0
+
+  def stop(self):
+    """
+    Asks the worker process to exit and waits for it.
+    """
+    try:
+      self.conn.send(None)
+    except (IOError, OSError):
+      pass
+    self.process.join()
+    self.conn.close()
+
+  def kill(self):
+    """
+    Terminates the worker process.
+    """
+    self.process.terminate()
+    self.process.join()
+    self.conn.close()
+
+
+class RunnerPool(object):
+  """
+  Pool of pre-warmed worker processes running Function calls, results are returned as futures.
+
+  Each worker keeps its own decoded function cache and is recycled after "max_tasks" calls when it is set.
+  Submitted code may be either a Code or a FastCode object, generator and iterator responses are collected in lists
+  by the workers.
+
+  Calls may have wall clock ("timeout") and cpu time ("cpu_limit") limits, in seconds, failing with
+  errors.TimeoutError. Workers enforce them with interval timers and are recycled after hitting one, a worker
+  that doesn't answer within the wall clock limit plus "grace" seconds is killed and replaced.
+
+  Modules listed in "preload" are imported once per worker and bound in the functions globals, along with the
+  "base_globals" mapping, which must be picklable.
+
+  Results implementing the buffer protocol (bytes, array.array, numpy arrays) of at least "shm_threshold" bytes
+  are sent through a shared memory segment instead of the pipe, their futures resolve to shm.SharedBuffer
+  objects that must be released by the caller (they are removed at exit otherwise).
+
+  Workers address space may grow by at most "memory_limit" bytes after their start (linux only), calls failing
+  to allocate beyond it raise errors.MemoryLimitError and their worker is recycled.
+  """
+  def __init__(self, processes=None, max_tasks=None, context=None, timeout=None, cpu_limit=None, grace=1.0,
+               preload=None, base_globals=None, shm_threshold=None, memory_limit=None):
+    self.processes = processes or multiprocessing.cpu_count()
+    self.max_tasks = max_tasks
+    self.timeout = timeout
+    self.cpu_limit = cpu_limit
+    self.grace = grace
+    self.preload = preload
+    self.base_globals = base_globals
+    self.shm_threshold = shm_threshold
+    self.memory_limit = memory_limit
+    self._context = context or multiprocessing.get_context()
+    self._queue = queue.Queue()
+    self._closed = False
+    self._threads = []
+    for i in range(self.processes):
+      thread = threading.Thread(target=self._manage, args=(self._new_worker(),))
+      thread.daemon = True
+      thread.start()
+      self._threads.append(thread)
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.shutdown()
+
+  def _new_worker(self):
+    return _Worker(self._context, self.preload, self.base_globals, self.shm_threshold, self.memory_limit)
+
+  def _manage(self, worker):
+    """
+    Manager thread loop, it owns a single worker process and feeds it with chunks from the queue.
+
+    param: worker(_Worker) - worker process handle.
+    """
+    while True:
+      item = self._queue.get()
+      if item is None:
+        break
+      (digest, name, payload, calls, timeout, cpu_limit) = item
+      calls = [c for c in calls if c[0].set_running_or_notify_cancel()]
+      if len(calls) == 0:
+        continue
+      try:
+        worker.conn.send((digest, name, payload, [(args, kwargs) for (future, args, kwargs) in calls], timeout, cpu_limit))
+        if timeout and not worker.conn.poll(timeout * len(calls) + self.grace):
+          [future.set_exception(errors.TimeoutError(name, timeout, 'wall')) for (future, args, kwargs) in calls]
+          worker.kill()
+          worker = self._new_worker()
+          continue
+        results = worker.conn.recv()
+      except (EOFError, IOError, OSError):
+        [future.set_exception(errors.InternalError()) for (future, args, kwargs) in calls]
+        worker.kill()
+        worker = self._new_worker()
+        continue
+      recycle = False
+      for ((future, args, kwargs), (ok, value)) in zip(calls, results):
+        if ok is True:
+          if isinstance(value, shm.Descriptor):
+            value = shm.attach(value)
+          future.set_result(value)
+        else:
+          recycle = recycle or isinstance(value, (errors.TimeoutError, errors.MemoryLimitError))
+          future.set_exception(value)
+      worker.tasks += len(calls)
+      if recycle is True or (self.max_tasks is not None and worker.tasks >= self.max_tasks):
+        worker.stop()
+        worker = self._new_worker()
+    worker.stop()
+
+  def _describe(self, code):
+    """
+    Retrieves the fields sent to workers for a given code.
+
+    param: code(Code) - Code object to be used.
+
+    Returns:
+      A tuple with the code digest, name and binary data.
+    """
+    return (code.digest(), code.name, code.as_bytes())
+
+  def _limits(self, timeout, cpu_limit):
+    """
+    Retrieves the call limits, falling back to the pool ones.
+
+    Returns:
+      A tuple with the wall clock and cpu time limits.
+    """
+    if timeout is None:
+      timeout = self.timeout
+    if cpu_limit is None:
+      cpu_limit = self.cpu_limit
+    return (timeout, cpu_limit)
+
+  def submit_many(self, code, params, chunksize=1, timeout=None, cpu_limit=None):
+    """
+    Schedules many calls of the same code, sending them to workers in chunks.
+
+    param: code(Code) - Code object to be used.
+    param: params(iterable) - call params, a list is used as args and a dict as kwargs.
+    param: chunksize(int) - number of calls sent to a worker at once.
+    param: timeout(float) - wall clock limit of each call, in seconds.
+    param: cpu_limit(float) - cpu time limit of each call, in seconds.
+
+    Returns:
+      A list of futures, one per call.
+    """
+    if self._closed is True:
+      raise RuntimeError('cannot submit calls after shutdown')
+    (digest, name, payload) = self._describe(code)
+    (timeout, cpu_limit) = self._limits(timeout, cpu_limit)
+    futures = []
+    calls = []
+    for p in params:
+      future = Future()
+      futures.append(future)
+      if type(p) is list:
+        calls.append((future, tuple(p), {}))
+      else:
+        calls.append((future, (), p))
+      if len(calls) >= chunksize:
+        self._queue.put((digest, name, payload, calls, timeout, cpu_limit))
+        calls = []
+    if len(calls) > 0:
+      self._queue.put((digest, name, payload, calls, timeout, cpu_limit))
+    return futures
+
+  def submit(self, code, args=(), kwargs=None, timeout=None, cpu_limit=None):
+    """
+    Schedules a single function call.
+
+    param: code(Code) - Code object to be used.
+    param: args(tuple) - function args.
+    param: kwargs(dict) - function kwargs.
+    param: timeout(float) - wall clock limit, in seconds.
+    param: cpu_limit(float) - cpu time limit, in seconds.
+
+    Returns:
+      A concurrent.futures.Future with the function response.
+    """
+    if self._closed is True:
+      raise RuntimeError('cannot submit calls after shutdown')
+    future = Future()
+    (digest, name, payload) = self._describe(code)
+    (timeout, cpu_limit) = self._limits(timeout, cpu_limit)
+    self._queue.put((digest, name, payload, [(future, tuple(args), kwargs or {})], timeout, cpu_limit))
+    return future
+
+  def map(self, code, params, chunksize=1):
+    """
+    Runs the code for each params item and yields the responses in order.
+
+    param: code(Code) - Code object to be used.
+    param: params(iterable) - call params, a list is used as args and a dict as kwargs.
+    param: chunksize(int) - number of calls sent to a worker at once.
+
+    Returns:
+      A generator with the function responses, errors are raised when reached.
+    """
+    futures = self.submit_many(code, params, chunksize)
+    return (future.result() for future in futures)
+
+  def shutdown(self, wait=True):
+    """
+    Stops the pool, pending calls are still executed.
+
+    param: wait(bool) - flag to wait for the worker processes to exit.
+    """
+    if self._closed is True:
+      return
+    self._closed = True
+    [self._queue.put(None) for t in self._threads]
+    if wait is True:
+      [t.join() for t in self._threads]
@@ -0,0 +1,225 @@
+import os
+
+from six.moves import _thread
+
+from smrunner import instrument
+
+
+DEFAULT_TOP = 20
+
+_local = _thread._local()
+
+
+class _NullSession(object):
+  """
+  No-op profiling session context manager.
+  """
+  __slots__ = ()
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    pass
+
+  def pause(self):
+    pass
+
+  def resume(self):
+    pass
+
+
+NULL_SESSION = _NullSession()
+
+
+class _Session(object):
+  """
+  Context manager that profiles a single function call with cProfile, its stats are attached to the active
+  instrumentation context as "profile" metadata.
+  """
+  __slots__ = ('profiler', 'name', 'number', 'prof')
+
+  def __init__(self, profiler, name, number):
+    self.profiler = profiler
+    self.name = name
+    self.number = number
+    self.prof = None
+
+  def __enter__(self):
+    import cProfile
+    self.prof = cProfile.Profile()
+    try:
+      self.prof.enable()
+    except ValueError:
+      self.prof = None
+    return self
+
+  def __exit__(self, *args):
+    if self.prof is None:
+      return
+    self.prof.disable()
+    instrument.current().annotate('profile', self.profiler.report(self.prof, self.name, self.number))
+
+  def pause(self):
+    """
+    Stops collecting stats until "resume" is called, such as while a generator response is suspended.
+    """
+    if self.prof is not None:
+      self.prof.disable()
+
+  def resume(self):
+    """
+    Collects stats again after "pause".
+    """
+    if self.prof is not None:
+      self.prof.enable()
+
+
+class Profiler(object):
+  """
+  Samples function calls with cProfile, one in "sample" calls is profiled so it can be left enabled in production.
+
+  The "top" entries by cumulative time are reported in the call metadata and, when "directory" is set, the full
+  stats are dumped there as ".pstats" files, to be loaded with the pstats module or snakeviz.
+
+  param: top(int) - number of entries reported.
+  param: sample(int) - profile one in "sample" calls.
+  param: directory(str) - directory of the dumped stats.
+  """
+  def __init__(self, top=DEFAULT_TOP, sample=1, directory=None):
+    self.top = top
+    self.sample = max(sample or 1, 1)
+    self.directory = directory
+    self.calls = 0
+    self._lock = _thread.allocate_lock()
+
+  def session(self, name):
+    """
+    Creates the profiling context manager of a call, a no-op one when the call is not sampled.
+
+    param: name(str) - function name.
+
+    Returns:
+      A context manager.
+    """
+    with self._lock:
+      self.calls += 1
+      number = self.calls
+    if number % self.sample != 0:
+      return NULL_SESSION
+    return _Session(self, name, number)
+
+  def report(self, prof, name, number):
+    """
+    Builds the report of a profiled call.
+
+    param: prof(cProfile.Profile) - disabled profiler.
+    param: name(str) - function name.
+    param: number(int) - call number, it makes the dumped stats path unique.
+
+    Returns:
+      A dict with the top entries and the dumped stats path, if any.
+    """
+    import pstats
+    stats = pstats.Stats(prof)
+    entries = []
+    for ((filename, line, fn_name), (cc, nc, tt, ct, callers)) in stats.stats.items():
+      entries.append({
+        'function': '%s:%s(%s)' % (filename, line, fn_name),
+        'calls': nc,
+        'primitive_calls': cc,
+        'tottime': tt,
+        'cumtime': ct
+      })
+    entries.sort(key=lambda e: e['cumtime'], reverse=True)
+    report = {
+      'entries': entries[:self.top],
+      'total_time': stats.total_tt
+    }
+    if self.directory is not None:
+      path = os.path.join(self.directory, '%s-%s-%s.pstats' % (name, os.getpid(), number))
+      stats.dump_stats(path)
+      report['file'] = path
+    return report
+
+
+class _NullProfiler(object):
+  """
+  Default profiler used when profiling is disabled.
+  """
+  top = DEFAULT_TOP
+  directory = None
+
+  def session(self, name):
+    return NULL_SESSION
+
+
+NULL_PROFILER = _NullProfiler()
+
+default_profiler = NULL_PROFILER
+
+
+def configure(profiler):
+  """
+  Sets the profiler used by calls without their own one, such as every request of a server.
+
+  param: profiler(Profiler) - profiler to be used, None disables profiling.
+  """
+  global default_profiler
+  default_profiler = profiler or NULL_PROFILER
+
+
+def forced():
+  """
+  Creates a profiler that profiles every call, with the default profiler settings, used by per request profiling.
+
+  Returns:
+    A new Profiler object.
+  """
+  return Profiler(top=default_profiler.top, sample=1, directory=default_profiler.directory)
+
+
+def enabled():
+  """
+  Checks if a default profiler is configured.
+
+  Returns:
+    A boolean.
+  """
+  return default_profiler is not NULL_PROFILER
+
+
+def current():
+  """
+  Retrieves the profiler active in the current thread.
+
+  Returns:
+    A Profiler object or the no-op NULL_PROFILER.
+  """
+  return getattr(_local, 'profiler', default_profiler)
+
+
+class activate(object):
+  """
+  Context manager that makes a profiler the active one in the current thread.
+
+  param: profiler(Profiler) - profiler to be activated, None keeps the default one.
+  """
+  def __init__(self, profiler=None):
+    self.profiler = profiler
+    self.previous = None
+
+  def __enter__(self):
+    self.previous = getattr(_local, 'profiler', None)
+    if self.profiler is not None:
+      _local.profiler = self.profiler
+    return current()
+
+  def __exit__(self, *args):
+    if self.previous is None:
+      try:
+        del _local.profiler
+      except AttributeError:
+        pass
+    else:
+      _local.profiler = self.previous
@@ -0,0 +1,114 @@
+from smrunner import cache, errors
+from smrunner.fast import FastFunction
+
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+class Registry(object):
+  """
+  Registered functions of a long running runner, code is uploaded once and invoked by its content digest afterwards.
+
+  Entries are evicted by LRU, bounded by their number and by the size of their binary payloads. Functions
+  registered as pure have their results memoized when called through "rpc.call".
+  """
+  def __init__(self, max_entries=DEFAULT_MAX_ENTRIES, max_bytes=DEFAULT_MAX_BYTES):
+    self._entries = cache.LRUCache(maxsize=max_entries, maxbytes=max_bytes)
+
+  def __len__(self):
+    return len(self._entries)
+
+  def __contains__(self, fn_id):
+    return fn_id in self._entries
+
+  def register(self, code, validate=True, pure=False):
+    """
+    Registers a code object, registering the same code again only refreshes its entry and pure flag. Code whose
+    binary payload is larger than the registry bytes budget is rejected with errors.InvalidParamsError, it would be
+    evicted right away.
+
+    param: code(FastCode) - code to be registered.
+    param: validate(bool) - flag to validate the code fields, it only happens here and not on each call.
+    param: pure(bool) - flag to mark the function as deterministic and side effect free.
+
+    Returns:
+      A string with the function id, the code content digest.
+    """
+    fn_id = code.digest()
+    entry = self._entries.get(fn_id)
+    if entry is None or entry[1] is not pure:
+      size = len(code.as_bytes())
+      max_bytes = self._entries.maxbytes
+      if max_bytes is not None and size > max_bytes:
+        raise errors.InvalidParamsError(code.name, {'size': size, 'max_bytes': max_bytes})
+      if entry is None and validate is True:
+        code.validate()
+      func = entry[0] if entry is not None else FastFunction.from_code(code)
+      self._entries.put(fn_id, (func, pure), size=size)
+    return fn_id
+
+  def get(self, fn_id):
+    """
+    Retrieves a registered function.
+
+    param: fn_id(str) - function id returned by "register".
+
+    Returns:
+      A FastFunction object.
+    """
+    return self.entry(fn_id)[0]
+
+  def entry(self, fn_id):
+    """
+    Retrieves a registered function along with its pure flag.
+
+    param: fn_id(str) - function id returned by "register".
+
+    Returns:
+      A tuple with the FastFunction object and the pure flag.
+    """
+    entry = self._entries.get(fn_id)
+    if entry is None:
+      raise errors.FunctionNotFoundError(fn_id)
+    return entry
+
+  def call(self, fn_id, params=None):
+    """
+    Calls a registered function.
+
+    param: fn_id(str) - function id returned by "register".
+    param: params(list or dict) - function params, a list is used as args and a dict as kwargs.
+
+    Returns:
+      The function response.
+    """
+    func = self.get(fn_id)
+    if params is None:
+      params = {}
+    if type(params) is list:
+      return func(*params)
+    return func(**params)
+
+  def unregister(self, fn_id):
+    """
+    Removes a registered function.
+
+    param: fn_id(str) - function id returned by "register".
+
+    Returns:
+      True if the function was registered, False otherwise.
+    """
+    return self._entries.invalidate(fn_id)
+
+  def stats(self):
+    """
+    Retrieves the registry cache counters.
+
+    Returns:
+      A dict with the LRUCache stats.
+    """
+    return self._entries.stats()
+
+
+default_registry = Registry()
@@ -1,9 +1,21 @@
-import json
-
 from schematics.models import Model
 from schematics.types import IntType, StringType
 from schematics.types.compound import ModelType
 from smrunner.helpers.schema import BytesType, TupleType, LazyDictType, DynamicType
+from smrunner import serializer
+
+
+def notification_as_json(method, params):
+  """
+  Builds a JSONRPC notification, a request without id, used to stream partial results.
+
+  param: method(str) - notification method.
+  param: params(dict) - notification params.
+
+  Returns:
+    A json string with the notification.
+  """
+  return serializer.notification_as_json(method, params)
 
 
 class Error(Model):
@@ -20,24 +32,27 @@ class Response(Model):
   JSONRPC schematics model to be used in json responses.
   """
   jsonrpc = StringType(required=True, default='2.0')
+  id = DynamicType()
   error = ModelType(Error)
   result = DynamicType()
+  meta = LazyDictType()
 
   @classmethod
-  def as_result(cls, _id=None, data=None):
+  def as_result(cls, _id=None, data=None, meta=None):
     """
     Class method that builds the Response class as a result response.
 
     param: _id(str) - optional rpc id
     param: data(list or dict) - list or dict to be used as response data
+    param: meta(dict) - optional call metadata, such as phase timings
 
     Returns:
       A new instance of Response
     """
-    return cls(raw_data={'result': data})
+    return cls(raw_data={'id': _id, 'result': data, 'meta': meta})
 
   @classmethod
-  def as_error(cls, code, message, data=None, _id=None):
+  def as_error(cls, code, message, data=None, _id=None, meta=None):
     """
     Class method that builds the Response class as an error response.
 
@@ -45,12 +60,13 @@ class Response(Model):
     param: message(str) - error string message
     param: _id(str) - optional rpc id
     param: data(list or dict) - specific error data/information
+    param: meta(dict) - optional call metadata, such as phase timings
 
     Returns:
       A new instance of Response
     """
     err = Error(raw_data={'code': code, 'message': message, 'data': data})
-    return cls(raw_data={'error': err})
+    return cls(raw_data={'id': _id, 'error': err, 'meta': meta})
 
   def as_dict(self):
     """
@@ -60,7 +76,8 @@ class Response(Model):
       A dict with the model properties and its values.
     """
     data = {
-      'jsonrpc': self.jsonrpc
+      'jsonrpc': self.jsonrpc,
+      'id': self.id
     }
     if self.error is not None:
       data['error'] = {
@@ -70,6 +87,8 @@ class Response(Model):
       }
     else:
       data['result'] = self.result
+    if self.meta is not None:
+      data['meta'] = self.meta
     return data
 
   def as_json(self):
@@ -79,5 +98,18 @@ class Response(Model):
     Returns:
       A string with the model json reprensentation.
     """
-    return json.dumps(self.as_dict())
+    if self.error is not None:
+      return serializer.error_as_json(self.error.code, self.error.message, self.error.data, self.id, self.meta)
+    return serializer.result_as_json(self.id, self.result, self.meta)
+
+  @staticmethod
+  def batch_as_json(responses):
+    """
+    Parses a list of Response objects as a JSONRPC batch response.
 
+    param: responses(list) - Response objects to be used.
+
+    Returns:
+      A string with the batch json array.
+    """
+    return '[%s]' % ', '.join([r.as_json() for r in responses])
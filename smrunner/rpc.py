@@ -0,0 +1,450 @@
+import json
+
+import six
+
+from smrunner import errors, instrument, limits, memo, memory, metrics, profiling, serializer
+from smrunner.registry import default_registry
+from smrunner.fast import FastCode, FastFunction
+from smrunner.runnable import is_stream
+from smrunner.helpers import encoders
+
+
+def load_data(data, encode=False, store=None):
+  """
+  Creates a FastCode object from json data or, when base64 encoded, from either json or a binary payload.
+
+  param: data(str) - code data.
+  param: encode(bool) - flag to indicate if the data is base64 encoded.
+  param: store(DiskStore) - optional on-disk store, checked before parsing the data.
+
+  Returns:
+    A new FastCode object.
+  """
+  if store is not None:
+    key = store.key(data, encode is True)
+    code = store.get(key)
+    if code is not None:
+      return code
+  if encode is not True:
+    code = FastCode.from_json(data)
+  else:
+    try:
+      raw = encoders.decode_bytes(data)
+    except (TypeError, ValueError) as e:
+      raise errors.ParseError()
+    code = FastCode.from_payload(raw)
+  if store is not None:
+    store.put(key, code)
+  return code
+
+
+def load_payload(data, store=None):
+  """
+  Creates a FastCode object from raw bytes holding either a binary payload or utf8 json.
+
+  param: data(bytes) - payload to be used.
+  param: store(DiskStore) - optional on-disk store, checked before parsing the payload.
+
+  Returns:
+    A new FastCode object.
+  """
+  if store is None:
+    return FastCode.from_payload(data)
+  key = store.key(data)
+  code = store.get(key)
+  if code is None:
+    code = FastCode.from_payload(data)
+    store.put(key, code)
+  return code
+
+
+def load_file(path, store=None):
+  """
+  Creates a FastCode object from a json or binary file.
+
+  param: path(str) - file path.
+  param: store(DiskStore) - optional on-disk store, checked before parsing the file content.
+
+  Returns:
+    A new FastCode object.
+  """
+  if store is None:
+    return FastCode.from_file(path)
+  try:
+    with open(path, 'rb') as f:
+      data = f.read()
+  except IOError as e:
+    raise errors.FunctionNotFoundError(path)
+  return load_payload(data, store)
+
+
+def read_input(path, encode=False):
+  """
+  Reads a params or data input file, "-" reads stdin. Large base64 encoded files are memory mapped and decoded in chunks.
+
+  param: path(str) - file path or "-".
+  param: encode(bool) - flag to indicate if the content is base64 encoded.
+
+  Returns:
+    A string (python 2) or bytes (python 3) with the content.
+  """
+  from smrunner.helpers import inputs
+  try:
+    return inputs.read(path, encode is True)
+  except (TypeError, ValueError) as e:
+    raise errors.ParseError()
+
+
+def load_function(**kwargs):
+  """
+  Loads a function from json data, file or the registry, it takes the same params as "call".
+
+  Returns:
+    A tuple with the FastFunction object and a flag to memoize its results.
+  """
+  file = kwargs.get('file')
+  data = kwargs.get('data')
+  data_file = kwargs.get('data_file')
+  fn_id = kwargs.get('id')
+  encode = kwargs.get('encode')
+  cache_dir = kwargs.get('cache_dir')
+  pure = kwargs.get('pure') is True
+  fn_name = None
+  func = None
+  code_store = None
+  if cache_dir is not None:
+    from smrunner import store
+    code_store = store.DiskStore(cache_dir or None)
+  if fn_id is not None:
+    (func, registered_pure) = default_registry.entry(fn_id)
+    pure = pure or registered_pure
+  if data is not None:
+    code = load_data(data, encode, code_store)
+    func = FastFunction.from_code(code)
+  if file is not None:
+    code = load_file(file, code_store)
+    func = FastFunction.from_code(code)
+  if data_file is not None:
+    try:
+      raw = read_input(data_file, encode)
+    except (IOError, OSError) as e:
+      raise errors.FunctionNotFoundError(data_file)
+    func = FastFunction.from_code(load_payload(raw, code_store))
+  if func is None:
+    raise errors.FunctionNotFoundError(fn_name)
+  return (func, pure)
+
+
+def call(**kwargs):
+  """
+  Loads a function from json data, file or the registry and calls it with the given params.
+
+  It only relies on the lightweight FastCode/FastFunction classes, so one shot runs never import schematics.
+
+  param: params(str, list or dict) - function params, a json string (array or dict) or an already decoded value.
+  param: file(str) - function file path.
+  param: data(str) - code object json data, or a binary payload when base64 encoded.
+  param: params_file(str) - file with the json params, "-" reads stdin (not allowed in JSONRPC requests).
+  param: data_file(str) - file with the code object json data or binary payload, "-" reads stdin (not allowed in
+    JSONRPC requests).
+  param: id(str) - registered function id, returned by "register".
+  param: encode(bool) - flag to indicate if params and data (including the files content) are base64 encoded.
+  param: cache_dir(str) - on-disk store directory for decoded code objects, an empty string uses the default one.
+  param: timeout(float) - wall clock limit of the function call, in seconds.
+  param: cpu_limit(float) - cpu time limit of the function call, in seconds.
+  param: memory_limit(int) - address space growth limit of the function call, in bytes (see limits.memory).
+  param: pure(bool) - flag to memoize the function results, functions registered as pure are always memoized.
+  param: shm_threshold(int) - buffer results (bytes, arrays) of at least this size, in bytes, are copied to a
+    shared memory segment and returned as its descriptor, the caller must attach and release it (see smrunner.shm),
+    segments not attached within shm.EXPORT_TTL seconds are removed.
+
+  The "load", "params", "build" and "execute" phases are recorded in the active instrumentation context, along
+  with the "memo" result cache outcome of pure functions. A memoized result skips building and running the function.
+  Every call is recorded in the metrics registry, generator responses once they are fully iterated.
+
+  Returns:
+    The function response.
+  """
+  params = kwargs.get('params')
+  params_file = kwargs.get('params_file')
+  encode = kwargs.get('encode')
+  timeout = kwargs.get('timeout')
+  cpu_limit = kwargs.get('cpu_limit')
+  memory_limit = kwargs.get('memory_limit')
+  shm_threshold = kwargs.get('shm_threshold')
+  timings = instrument.current()
+  with timings.phase('load'):
+    (func, pure) = load_function(**kwargs)
+  with timings.phase('params'):
+    if params_file is not None:
+      try:
+        raw = read_input(params_file, encode)
+      except (IOError, OSError) as e:
+        raise errors.InvalidParamsError(func.code.name, params_file)
+      try:
+        params = raw.decode('utf8')
+      except UnicodeDecodeError as e:
+        raise errors.ParseError()
+      # json.loads decodes bytes to a string too, dropping them first keeps a single copy of the payload alive.
+      del raw
+      encode = False
+    if isinstance(params, six.string_types) and encode is True:
+      params = encoders.decode(params)
+    if params is None:
+      params = '{}'
+    if isinstance(params, six.string_types):
+      params = json.loads(params)
+  with metrics.default_metrics.timer(func.code.digest(), func.code.name) as timer:
+    if pure is True:
+      result = memo.default_results.call(func.code.digest(), params, lambda: run(func, params, timeout, cpu_limit, memory_limit))
+    else:
+      result = run(func, params, timeout, cpu_limit, memory_limit)
+    if is_stream(result):
+      result = timer.stream(result)
+  if shm_threshold is not None:
+    from smrunner import shm
+    result = shm.export_large(result, shm_threshold)
+  return result
+
+
+def run(func, params, timeout=None, cpu_limit=None, memory_limit=None):
+  """
+  Calls a function within its wall clock, cpu time and memory limits, a list of params is used as args and a dict as kwargs.
+  Generator responses are iterated within the same limits (see limits.iterate).
+
+  Returns:
+    The function response.
+  """
+  with limits.deadline(timeout, cpu_limit, func.code.name), limits.memory(memory_limit, func.code.name):
+    if type(params) is list:
+      result = func(*params)
+    else:
+      result = func(**params)
+  if is_stream(result) and (timeout or cpu_limit or memory_limit):
+    return limits.iterate(result, timeout, cpu_limit, memory_limit, func.code.name)
+  return result
+
+
+def register(**kwargs):
+  """
+  Registers a function from json data or file in the default registry, to be called by id afterwards.
+
+  param: data(str) - code object json data, or a binary payload when base64 encoded.
+  param: file(str) - function file path.
+  param: encode(bool) - flag to indicate if data is base64 encoded.
+  param: validate(bool) - flag to validate the code fields, true by default.
+  param: pure(bool) - flag to memoize the function results.
+
+  Returns:
+    A string with the function id.
+  """
+  data = kwargs.get('data')
+  file = kwargs.get('file')
+  if data is not None:
+    code = load_data(data, kwargs.get('encode'))
+  elif file is not None:
+    code = load_file(file)
+  else:
+    raise errors.FunctionNotFoundError(None)
+  return default_registry.register(code, validate=kwargs.get('validate', True) is not False, pure=kwargs.get('pure') is True)
+
+
+def stats(**kwargs):
+  """
+  Retrieves the runner metrics: per function call counts, error counts and latency histograms, caches counters
+  and memory accounting stats.
+
+  param: format(str) - "prometheus" returns the metrics in the Prometheus text format instead of a dict.
+
+  Returns:
+    A dict (see metrics.snapshot) or a string.
+  """
+  if kwargs.get('format') == 'prometheus':
+    return metrics.prometheus()
+  return metrics.snapshot()
+
+
+METHODS = {
+  'call': call,
+  'register': register,
+  'stats': stats
+}
+
+
+def meta(timings):
+  """
+  Retrieves the response "meta" member of an instrumentation context.
+
+  param: timings(Timings) - instrumentation context, it may be None.
+
+  Returns:
+    A dict or None.
+  """
+  if timings is None:
+    return None
+  return timings.as_dict()
+
+
+def handle(request, stream=False):
+  """
+  Handles a single JSONRPC request object.
+
+  Supported methods are "call", "register" and "stats", their params are the same ones accepted by the functions of this module.
+  When the "timings" param is true the phase timings are returned in the response "meta" member. When the "profile"
+  param is true, or a default profiler is configured, the call cProfile stats are returned as "meta.profile" too.
+
+  param: request(dict) - decoded JSONRPC request.
+  param: stream(bool) - flag to keep generator responses lazy, to be sent with "write", otherwise they are collected in a list.
+
+  Returns:
+    A Response instance or None if the request is a notification (it has no id member).
+  """
+  from smrunner import response
+  _id = None
+  notification = False
+  timings = None
+  try:
+    if type(request) is not dict or request.get('jsonrpc') != '2.0' or 'method' not in request:
+      raise errors.InvalidRequestError()
+    _id = request.get('id')
+    notification = 'id' not in request
+    method = request['method']
+    if method not in METHODS:
+      raise errors.FunctionNotFoundError(method)
+    params = request.get('params', {})
+    if type(params) is not dict:
+      raise errors.InvalidParamsError(method, params)
+    stdin = dict([(k, v) for (k, v) in params.items() if k in ('params_file', 'data_file') and v == '-'])
+    if stdin:
+      raise errors.InvalidParamsError(method, stdin)
+    profiler = None
+    if params.get('profile') is True:
+      profiler = profiling.forced()
+    accounting = params.get('memory') is True
+    if params.get('timings') is True or profiler is not None or profiling.enabled() or accounting or memory.enabled():
+      timings = instrument.Timings()
+    with instrument.activate(timings), profiling.activate(profiler), memory.activate(accounting):
+      result = METHODS[method](**params)
+      if is_stream(result) and (stream is False or notification is True):
+        result = list(result)
+  except errors.BaseError as e:
+    res = response.Response.as_error(code=e.code, message=e.message, data=e.data, _id=_id, meta=meta(timings))
+  except Exception as e:
+    e = errors.InternalError()
+    res = response.Response.as_error(code=e.code, message=e.message, data=e.data, _id=_id, meta=meta(timings))
+  else:
+    res = response.Response.as_result(_id=_id, data=result, meta=meta(timings))
+  if notification is True:
+    return None
+  return res
+
+
+def handle_batch(requests):
+  """
+  Handles a JSONRPC batch, a list of request objects.
+
+  param: requests(list) - decoded JSONRPC requests.
+
+  Returns:
+    A list of Response instances, a single error Response for an empty batch or None if all requests are notifications.
+  """
+  from smrunner import response
+  if len(requests) == 0:
+    e = errors.InvalidRequestError()
+    return response.Response.as_error(code=e.code, message=e.message, data=e.data)
+  responses = [res for res in [handle(r) for r in requests] if res is not None]
+  if len(responses) == 0:
+    return None
+  return responses
+
+
+def handle_line(line, stream=True):
+  """
+  Parses and handles a JSONRPC request line, which may be a single request or a batch.
+
+  Generator responses of single requests are kept lazy unless "stream" is false, batch ones are collected in lists.
+
+  param: line(str) - json encoded request.
+  param: stream(bool) - flag to keep generator responses of single requests lazy.
+
+  Returns:
+    A Response instance, a list of Response instances or None.
+  """
+  from smrunner import response
+  try:
+    request = json.loads(line)
+  except ValueError as e:
+    e = errors.ParseError()
+    return response.Response.as_error(code=e.code, message=e.message, data=e.data)
+  if type(request) is list:
+    return handle_batch(request)
+  return handle(request, stream=stream)
+
+
+def dumps(res):
+  """
+  Parses a handler result as a json string.
+
+  param: res(Response or list) - a Response instance or a list of them.
+
+  Returns:
+    A json string with a response object or a batch array.
+  """
+  from smrunner import response
+  if type(res) is list:
+    return response.Response.batch_as_json(res)
+  return res.as_json()
+
+
+def safe_dumps(res):
+  """
+  Parses a handler result as a json string, responses whose result is not json serializable are replaced by an
+  internal error response with the same id.
+
+  param: res(Response or list) - a Response instance or a list of them.
+
+  Returns:
+    A json string with a response object or a batch array.
+  """
+  try:
+    return dumps(res)
+  except (TypeError, ValueError) as e:
+    if type(res) is list:
+      return '[%s]' % ', '.join([safe_dumps(r) for r in res])
+    e = errors.InternalError()
+    return serializer.error_as_json(e.code, e.message, e.data, res.id, res.meta)
+
+
+def write(out, res):
+  """
+  Writes a handler result as a json line, streamed responses are written item by item before the terminal response.
+
+  param: out(file) - file object to write to.
+  param: res(Response or list) - a Response instance or a list of them.
+  """
+  if type(res) is not list and res.error is None and is_stream(res.result):
+    serializer.write_stream(out, res.id, res.result, res.meta)
+    return
+  out.write('%s\n' % safe_dumps(res))
+  out.flush()
+
+
+def serve(stdin, stdout):
+  """
+  Reads newline delimited JSONRPC requests from stdin and writes one response per line to stdout.
+
+  Batches are answered with a single array line and notifications are not answered at all.
+  Generator responses are streamed as "stream" notifications followed by the terminal response.
+  It returns when stdin is closed.
+
+  param: stdin(file) - file object to read requests from.
+  param: stdout(file) - file object to write responses to.
+  """
+  for line in iter(stdin.readline, ''):
+    line = line.strip()
+    if not line:
+      continue
+    res = handle_line(line)
+    if res is None:
+      continue
+    write(stdout, res)
@@ -0,0 +1,172 @@
+import types
+
+import six
+
+from smrunner import cache, env, errors, instrument, memory, profiling
+
+
+# Code flag of generator functions (inspect.CO_GENERATOR).
+CO_GENERATOR = 0x20
+
+
+def is_stream(value):
+  """
+  Checks if a function response is a generator or an iterator to be streamed.
+
+  param: value(any) - function response.
+
+  Returns:
+    A boolean.
+  """
+  return isinstance(value, types.GeneratorType) or hasattr(value, '__next__') or hasattr(value, 'next')
+
+
+def _stream(items, timings, profiler=None, accounting=None, code=None):
+  """
+  Iterates a generator response within the instrumentation of its call, which is over once the response is
+  returned: each step runs with the call instrumentation context active and is timed as the "execute" phase.
+
+  When "code" is given the generator body is profiled and measured by a profiling and a memory accounting session,
+  entered on the first step so they are not leaked by responses which are never iterated. The profiler is paused
+  while the generator is suspended, the memory session spans the whole iteration.
+
+  param: items(iterator) - function response.
+  param: timings(Timings) - call instrumentation context.
+  param: profiler(Profiler) - call profiler.
+  param: accounting(Accounting) - call memory accounting.
+  param: code(FastCode or Code) - code of the generator function.
+
+  Returns:
+    A generator.
+  """
+  sessions = None
+  try:
+    while True:
+      with instrument.activate(timings), timings.phase('execute'):
+        if sessions is None and code is not None:
+          sessions = (profiler.session(code.name), accounting.session(code))
+          [session.__enter__() for session in sessions]
+        elif sessions is not None:
+          sessions[0].resume()
+        try:
+          item = next(items)
+        except StopIteration:
+          return
+        finally:
+          if sessions is not None:
+            sessions[0].pause()
+      yield item
+  finally:
+    if sessions is not None:
+      with instrument.activate(timings):
+        [session.__exit__(None, None, None) for session in reversed(sessions)]
+
+
+class RunnableMixin(object):
+  """
+  Builds and runs the function object of a "code" attribute, shared by fn.Function and fast.FastFunction.
+
+  The code object must provide "as_code", "digest", "name" and "defaults".
+  """
+  __slots__ = ()
+
+  def __call__(self, *args, **kwargs):
+    """
+    Callable python interface, executes the object "run" method.
+    """
+    return self.run(*args, **kwargs)
+
+  def get_default_env(self):
+    """
+    Define default globals, a copy of the default environment template with python builtins and preloaded modules.
+
+    Returns:
+      A dict with the function globals.
+    """
+    return env.default_env.new_globals()
+
+  def build_fn(self, **kwargs):
+    """
+    Builds the function object (types.FunctionType) based on the instance code property.
+
+    Returns:
+      A new types.FunctionType object.
+    """
+    _globals = env.default_env.new_globals(kwargs.get('globals'))
+    name = kwargs.get('name', 'fn')
+    if six.PY2 is True:
+      name = name.encode('utf8')
+    argdefs = kwargs.get('argdefs', tuple())
+    closure = kwargs.get('closure', tuple())
+    return types.FunctionType(self.code.as_code(), _globals, name, argdefs, closure)
+
+  def get_fn(self):
+    """
+    Retrieves the function object from the build cache, building it on a cache miss. Functions are cached along with
+    the environment generation they were bound to, they are rebound once when the environment changes.
+
+    Returns:
+      A types.FunctionType object.
+    """
+    key = self.code.digest()
+    generation = env.default_env.generation
+    entry = cache.build_cache.get(key)
+    if entry is None:
+      kw = {
+        'name': self.code.name
+      }
+      if self.code.defaults is not None:
+        kw['argdefs'] = self.code.defaults
+      fn = self.build_fn(**kw)
+      cache.build_cache.put(key, (fn, generation))
+      return fn
+    (fn, bound) = entry
+    if bound != generation:
+      env.default_env.bind(fn)
+      cache.build_cache.put(key, (fn, generation))
+    return fn
+
+  def run(self, *args, **kwargs):
+    """
+    Runs the function object and returns the response.
+
+    Also, it passes and args and kwargs to the function call. The calls of a function share its environment globals
+    (see env.Environment), each call is profiled when sampled by the active profiler and its memory use is measured
+    when accounting is active. Generator responses are instrumented while they are iterated (see _stream).
+
+    Returns:
+      The function response.
+    """
+    timings = instrument.current()
+    with timings.phase('build'):
+      fn = self.get_fn()
+    (profiler, accounting) = (profiling.current(), memory.current())
+    generator = (fn.__code__.co_flags & CO_GENERATOR) != 0
+    try:
+      if generator is True:
+        with timings.phase('execute'):
+          result = fn(*args, **kwargs)
+      else:
+        with timings.phase('execute'), profiler.session(self.code.name), accounting.session(self.code):
+          result = fn(*args, **kwargs)
+    except TypeError as e:
+      params = {
+        'args': args,
+        'kwargs': kwargs
+      }
+      raise errors.RuntimeError(self.code.name, params, str(e))
+    if is_stream(result):
+      return _stream(iter(result), timings, profiler, accounting, self.code if generator is True else None)
+    return result
+
+  def arun(self, *args, **kwargs):
+    """
+    Runs the function object in an asyncio event loop, coroutine responses are awaited.
+
+    Also, it passes and args and kwargs to the function call.
+
+    Returns:
+      A coroutine with the function response.
+    """
+    from smrunner import aio
+    return aio.arun(self, *args, **kwargs)
@@ -0,0 +1,175 @@
+import json
+
+from smrunner import errors
+from smrunner.instrument import clock
+
+
+_encoder = json.JSONEncoder()
+_encode = _encoder.encode
+
+# Fixed envelope fragments, the output matches json.dumps of Response.as_dict (same keys order and separators).
+ENVELOPE_START = '{"jsonrpc": "2.0", "id": '
+RESULT_MEMBER = ', "result": '
+ERROR_MEMBER = ', "error": {"code": '
+ERROR_MESSAGE_MEMBER = ', "message": '
+ERROR_DATA_MEMBER = ', "data": '
+META_MEMBER = ', "meta": '
+NOTIFICATION_START = '{"jsonrpc": "2.0", "method": '
+PARAMS_MEMBER = ', "params": '
+END = '}'
+
+
+def with_serialize(meta, seconds):
+  """
+  Adds the time spent encoding a result to the "serialize" phase of a response meta member, the meta member is
+  encoded after the result so its own encoding is not included.
+
+  param: meta(dict) - call metadata, it is left unchanged when it has no "timings".
+  param: seconds(float) - elapsed time.
+
+  Returns:
+    A dict or None.
+  """
+  if meta is None or type(meta.get('timings')) is not dict:
+    return meta
+  timings = dict(meta['timings'])
+  timings['serialize'] = timings.get('serialize', 0) + seconds
+  data = dict(meta)
+  data['timings'] = timings
+  return data
+
+
+def result_chunks(_id, result, meta=None, serialize=0):
+  """
+  Builds a JSONRPC result response as json chunks, the result encoding time is added to the meta "serialize" phase.
+
+  The result is encoded in one shot by the C encoder, incremental encoding (JSONEncoder.iterencode) only has a pure
+  python implementation several times slower. Functions with large results should return generators to be streamed.
+
+  param: _id(str or int) - rpc id.
+  param: result(any) - json serializable result.
+  param: meta(dict) - optional call metadata.
+  param: serialize(float) - time already spent encoding the response, such as its streamed items.
+
+  Returns:
+    A generator of strings.
+  """
+  yield ENVELOPE_START
+  yield _encode(_id)
+  yield RESULT_MEMBER
+  start = clock()
+  data = _encode(result)
+  serialize += clock() - start
+  yield data
+  if meta is not None:
+    yield META_MEMBER
+    yield _encode(with_serialize(meta, serialize))
+  yield END
+
+
+def error_chunks(code, message, data=None, _id=None, meta=None):
+  """
+  Builds a JSONRPC error response as json chunks.
+
+  param: code(int) - error code.
+  param: message(str) - error message.
+  param: data(dict) - error data.
+  param: _id(str or int) - rpc id.
+  param: meta(dict) - optional call metadata.
+
+  Returns:
+    A generator of strings.
+  """
+  yield ENVELOPE_START
+  yield _encode(_id)
+  yield ERROR_MEMBER
+  yield _encode(code)
+  yield ERROR_MESSAGE_MEMBER
+  yield _encode(message)
+  yield ERROR_DATA_MEMBER
+  yield _encode(data)
+  yield END
+  if meta is not None:
+    yield META_MEMBER
+    yield _encode(meta)
+  yield END
+
+
+def result_as_json(_id, result, meta=None):
+  """
+  Builds a JSONRPC result response as a json string.
+
+  Returns:
+    A json string.
+  """
+  return ''.join(result_chunks(_id, result, meta))
+
+
+def error_as_json(code, message, data=None, _id=None, meta=None):
+  """
+  Builds a JSONRPC error response as a json string.
+
+  Returns:
+    A json string.
+  """
+  return ''.join(error_chunks(code, message, data, _id, meta))
+
+
+def notification_as_json(method, params):
+  """
+  Builds a JSONRPC notification, a request without id, used to stream partial results.
+
+  param: method(str) - notification method.
+  param: params(dict) - notification params.
+
+  Returns:
+    A json string with the notification.
+  """
+  return ''.join([NOTIFICATION_START, _encode(method), PARAMS_MEMBER, _encode(params), END])
+
+
+def write(out, chunks, flush=True):
+  """
+  Writes json chunks as a single line, "out" should be buffered since chunks may be small.
+
+  param: out(file) - file object to write to.
+  param: chunks(iterable) - json chunks.
+  param: flush(bool) - flag to flush "out" after the line.
+  """
+  for chunk in chunks:
+    out.write(chunk)
+  out.write('\n')
+  if flush is True:
+    out.flush()
+
+
+def write_stream(out, _id, items, meta=None):
+  """
+  Writes each item of a generator or iterator as a "stream" notification line, flushing after each one,
+  followed by the terminal response with the number of items or the error raised by the generator. The items
+  encoding time is added to the meta "serialize" phase.
+
+  param: out(file) - file object to write to.
+  param: _id(str or int) - rpc id.
+  param: items(iterable) - streamed result.
+  param: meta(dict) - optional call metadata.
+  """
+  count = 0
+  serialize = 0
+  try:
+    for item in items:
+      start = clock()
+      line = notification_as_json('stream', {'id': _id, 'data': item})
+      serialize += clock() - start
+      out.write(line)
+      out.write('\n')
+      out.flush()
+      count += 1
+  except errors.BaseError as e:
+    write(out, error_chunks(e.code, e.message, e.data, _id, meta))
+    return
+  except Exception as e:
+    e = errors.InternalError()
+    write(out, error_chunks(e.code, e.message, e.data, _id, meta))
+    return
+  write(out, result_chunks(_id, {'items': count}, meta, serialize))
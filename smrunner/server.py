@@ -0,0 +1,336 @@
+import abc
+import asyncio
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+
+import six
+
+from smrunner import errors, metrics, rpc, serializer
+
+
+HTTP_REASONS = {
+  200: 'OK',
+  204: 'No Content',
+  400: 'Bad Request',
+  405: 'Method Not Allowed',
+  411: 'Length Required',
+  413: 'Payload Too Large'
+}
+
+DEFAULT_MAX_BODY = 64 * 1024 * 1024
+DEFAULT_PIPELINE = 64
+
+JSON_CONTENT_TYPE = 'application/json'
+METRICS_PATH = '/metrics'
+
+FRAME_HEADER = struct.Struct('!I')
+
+
+def parse_address(address, default_host='0.0.0.0'):
+  """
+  Parses a "host:port" address, the host may be omitted (":8080").
+
+  param: address(str) - address to be parsed.
+  param: default_host(str) - host used when it is omitted.
+
+  Returns:
+    A tuple with the host and the port.
+  """
+  (host, sep, port) = address.rpartition(':')
+  return (host or default_host, int(port))
+
+
+def process(body):
+  """
+  Handles a JSONRPC payload, generator responses are collected since they can't be streamed in a single response.
+  Responses whose result can't be encoded are answered with an internal error.
+
+  param: body(bytes) - request body.
+
+  Returns:
+    A tuple with the HTTP status (204 for notifications) and the response body.
+  """
+  try:
+    line = body.decode('utf8')
+  except UnicodeDecodeError as e:
+    line = ''
+  res = rpc.handle_line(line, stream=False)
+  if res is None:
+    return (204, b'')
+  return (200, rpc.safe_dumps(res).encode('utf8'))
+
+
+def http_response(status, body, keep_alive, content_type=JSON_CONTENT_TYPE):
+  """
+  Builds a raw HTTP/1.1 response.
+
+  param: status(int) - HTTP status code.
+  param: body(bytes) - response body.
+  param: keep_alive(bool) - flag to keep the connection open.
+  param: content_type(str) - body content type.
+
+  Returns:
+    A bytes object with the status line, headers and body.
+  """
+  lines = [
+    'HTTP/1.1 %s %s' % (status, HTTP_REASONS[status]),
+    'Content-Type: %s' % content_type,
+    'Content-Length: %s' % len(body),
+    'Connection: %s' % ('keep-alive' if keep_alive else 'close')
+  ]
+  return ('%s\r\n\r\n' % '\r\n'.join(lines)).encode('latin1') + body
+
+
+@six.add_metaclass(abc.ABCMeta)
+class BaseServer(object):
+  """
+  Base asyncio JSONRPC server, subclasses implement the wire format with "read_request" and "format_response".
+
+  Calls are dispatched to an executor so slow functions don't block the event loop, each request is dispatched
+  as soon as it is read and pipelined responses are written in request order. Executor threads can't enforce
+  call limits, so calls with "timeout", "cpu_limit" or "memory_limit" fail with an invalid params error.
+  """
+  def __init__(self, executor=None, max_body=DEFAULT_MAX_BODY, pipeline=DEFAULT_PIPELINE):
+    self.executor = executor or ThreadPoolExecutor()
+    self.max_body = max_body
+    self.pipeline = pipeline
+
+  @abc.abstractmethod
+  async def read_request(self, reader):
+    """
+    Reads a single request.
+
+    Returns:
+      None when the connection is closed, otherwise a tuple with the error status (or None), the body and the keep-alive flag.
+    """
+
+  def dispatch(self, body):
+    """
+    Handles a request body returned by "read_request", it runs in the executor.
+
+    Returns:
+      A tuple with the status, the response body and its content type.
+    """
+    (status, data) = process(body)
+    return (status, data, JSON_CONTENT_TYPE)
+
+  @abc.abstractmethod
+  def format_response(self, status, body, content_type, keep_alive):
+    """
+    Builds the raw response of a request.
+
+    Returns:
+      A bytes object or None if nothing is written back.
+    """
+
+  async def write_responses(self, queue, writer):
+    """
+    Writes the responses of a connection in request order, a request whose dispatch failed is answered with an
+    internal error (without id, it is unknown at this point) and the connection is kept.
+
+    param: queue(asyncio.Queue) - queue of (future, keep-alive flag) items, None ends the connection.
+    param: writer(asyncio.StreamWriter) - connection writer.
+    """
+    try:
+      while True:
+        item = await queue.get()
+        if item is None:
+          break
+        (future, keep_alive) = item
+        try:
+          (status, body, content_type) = await future
+        except asyncio.CancelledError:
+          raise
+        except Exception as e:
+          e = errors.InternalError()
+          body = serializer.error_as_json(e.code, e.message, e.data).encode('utf8')
+          (status, content_type) = (200, JSON_CONTENT_TYPE)
+        data = self.format_response(status, body, content_type, keep_alive)
+        if data is not None:
+          writer.write(data)
+          await writer.drain()
+        if keep_alive is False:
+          break
+    except (ConnectionError, asyncio.CancelledError) as e:
+      pass
+    finally:
+      writer.close()
+
+  async def handle_connection(self, reader, writer):
+    """
+    Reads the requests of a connection, each one is dispatched as soon as it is read.
+    """
+    loop = asyncio.get_event_loop()
+    queue = asyncio.Queue(self.pipeline)
+    responses = loop.create_task(self.write_responses(queue, writer))
+    try:
+      while True:
+        request = await self.read_request(reader)
+        if request is None:
+          break
+        (status, body, keep_alive) = request
+        if status is None:
+          future = loop.run_in_executor(self.executor, self.dispatch, body)
+        else:
+          future = loop.create_future()
+          future.set_result((status, b'', JSON_CONTENT_TYPE))
+        await queue.put((future, keep_alive))
+        if keep_alive is False:
+          break
+    except (asyncio.IncompleteReadError, ConnectionError, ValueError) as e:
+      pass
+    await queue.put(None)
+    await responses
+
+
+class HTTPServer(BaseServer):
+  """
+  Standard library only HTTP/1.1 JSONRPC server, with keep-alive connections and request pipelining.
+
+  Requests are POSTs with a JSONRPC payload (single request or batch) as body, a GET of "/metrics" returns the
+  runner metrics in the Prometheus text format.
+  """
+  async def start(self, host, port):
+    """
+    Starts listening.
+
+    param: host(str) - address to bind.
+    param: port(int) - port to bind, 0 picks a free one.
+
+    Returns:
+      An asyncio.AbstractServer.
+    """
+    return await asyncio.start_server(self.handle_connection, host, port)
+
+  async def read_request(self, reader):
+    """
+    Reads a single HTTP request.
+
+    Returns:
+      None when the connection is closed, otherwise a tuple with the error status (or None), the body and the keep-alive flag.
+    """
+    line = await reader.readline()
+    if not line:
+      return None
+    try:
+      (method, target, version) = line.decode('latin1').split()
+    except ValueError as e:
+      return (400, None, False)
+    headers = {}
+    while True:
+      line = await reader.readline()
+      if line in (b'\r\n', b'\n', b''):
+        break
+      (name, sep, value) = line.decode('latin1').partition(':')
+      headers[name.strip().lower()] = value.strip()
+    connection = headers.get('connection', '').lower()
+    if version == 'HTTP/1.0':
+      keep_alive = connection == 'keep-alive'
+    else:
+      keep_alive = connection != 'close'
+    if method == 'GET' and target == METRICS_PATH:
+      return (None, None, keep_alive)
+    if method != 'POST':
+      return (405, None, keep_alive)
+    if 'content-length' not in headers:
+      return (411, None, False)
+    try:
+      length = int(headers['content-length'])
+    except ValueError as e:
+      return (400, None, False)
+    if length > self.max_body:
+      return (413, None, False)
+    body = await reader.readexactly(length)
+    return (None, body, keep_alive)
+
+  def dispatch(self, body):
+    if body is None:
+      return (200, metrics.prometheus().encode('utf8'), metrics.PROMETHEUS_CONTENT_TYPE)
+    return super(HTTPServer, self).dispatch(body)
+
+  def format_response(self, status, body, content_type, keep_alive):
+    return http_response(status, body, keep_alive, content_type)
+
+
+class SocketServer(BaseServer):
+  """
+  Unix domain socket JSONRPC server for callers on the same host.
+
+  Requests and responses are frames of a 4 bytes big endian length followed by a JSONRPC payload, notifications
+  are not answered. A frame larger than "max_body" is answered with an invalid request error, then the connection
+  is closed. Connections are kept open until the client closes them, so requests can be pipelined.
+  """
+  async def start(self, path):
+    """
+    Starts listening, a stale socket file is removed first.
+
+    param: path(str) - socket file path.
+
+    Returns:
+      An asyncio.AbstractServer.
+    """
+    if os.path.exists(path):
+      os.unlink(path)
+    return await asyncio.start_unix_server(self.handle_connection, path)
+
+  async def read_request(self, reader):
+    try:
+      header = await reader.readexactly(FRAME_HEADER.size)
+    except asyncio.IncompleteReadError as e:
+      if e.partial:
+        raise
+      return None
+    (length, ) = FRAME_HEADER.unpack(header)
+    if length > self.max_body:
+      return (413, None, False)
+    body = await reader.readexactly(length)
+    return (None, body, True)
+
+  def format_response(self, status, body, content_type, keep_alive):
+    if status == 413:
+      e = errors.InvalidRequestError()
+      body = serializer.error_as_json(e.code, e.message, {'max_body': self.max_body}).encode('utf8')
+    elif status != 200:
+      return None
+    return FRAME_HEADER.pack(len(body)) + body
+
+
+def run_forever(start):
+  """
+  Runs a server until interrupted.
+
+  param: start(coroutine) - server "start" coroutine.
+  """
+  loop = asyncio.get_event_loop()
+  listener = loop.run_until_complete(start)
+  try:
+    loop.run_forever()
+  except KeyboardInterrupt as e:
+    pass
+  finally:
+    listener.close()
+    loop.run_until_complete(listener.wait_closed())
+
+
+def serve_http(address):
+  """
+  Runs the HTTP server until interrupted.
+
+  param: address(str) - "host:port" address to listen on.
+  """
+  (host, port) = parse_address(address)
+  run_forever(HTTPServer().start(host, port))
+
+
+def serve_socket(path):
+  """
+  Runs the unix domain socket server until interrupted.
+
+  param: path(str) - socket file path.
+  """
+  try:
+    run_forever(SocketServer().start(path))
+  finally:
+    if os.path.exists(path):
+      os.unlink(path)
@@ -0,0 +1,220 @@
+import atexit
+import mmap
+import os
+import tempfile
+
+from smrunner.cache import clock
+
+
+PREFIX = 'smrunner-'
+EXPORT_TTL = 300
+
+_attached = {}
+_exported = {}
+
+
+def default_dir():
+  """
+  Retrieves the directory of shared segments, "/dev/shm" (memory backed) when available or the temporary directory.
+
+  Returns:
+    A string with the directory path.
+  """
+  if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK):
+    return '/dev/shm'
+  return tempfile.gettempdir()
+
+
+def is_buffer(value):
+  """
+  Checks if a value implements the buffer protocol (bytes, bytearray, array.array, numpy arrays, etc).
+
+  Returns:
+    A boolean.
+  """
+  try:
+    memoryview(value)
+  except TypeError as e:
+    return False
+  return True
+
+
+class Descriptor(dict):
+  """
+  Small json serializable description of a shared segment, sent instead of the buffer content.
+
+  Keys are "name" (segment file path), "size" (in bytes), "format" and "shape" (memoryview layout) and "dtype"
+  (numpy dtype string, None for other buffers).
+  """
+
+
+def _sweep():
+  now = clock()
+  for (name, expires) in list(_exported.items()):
+    if expires <= now:
+      _exported.pop(name, None)
+      _remove(name)
+
+
+def _remove(name):
+  try:
+    os.unlink(name)
+  except OSError:
+    pass
+
+
+def export(value, directory=None, ttl=EXPORT_TTL):
+  """
+  Copies a buffer into a new shared segment, a memory mapped file the caller maps without copying.
+
+  The segment is owned by whoever attaches it, it must be released with "SharedBuffer.release" or "unlink". So
+  that segments of consumers that never do it don't leak, the exporting process removes its segments "ttl"
+  seconds after exporting them, or when it exits, mappings of attached segments stay valid.
+
+  param: value(buffer) - object implementing the buffer protocol.
+  param: directory(str) - segments directory, "default_dir()" by default.
+  param: ttl(float) - seconds the segment is kept for its consumer to attach it.
+
+  Returns:
+    A Descriptor object.
+  """
+  _sweep()
+  view = memoryview(value)
+  dtype = None
+  if type(value).__module__ == 'numpy' and hasattr(value, 'dtype'):
+    dtype = value.dtype.str
+  (fd, path) = tempfile.mkstemp(prefix=PREFIX, dir=directory or default_dir())
+  try:
+    size = view.nbytes
+    os.ftruncate(fd, size)
+    if size > 0:
+      mm = mmap.mmap(fd, size)
+      try:
+        if view.c_contiguous:
+          mm[:] = view.cast('B')
+        else:
+          mm[:] = view.tobytes()
+      finally:
+        mm.close()
+  except BaseException:
+    os.close(fd)
+    os.unlink(path)
+    raise
+  os.close(fd)
+  _exported[path] = clock() + ttl
+  return Descriptor(name=path, size=size, format=view.format, shape=list(view.shape), dtype=dtype)
+
+
+def export_large(value, threshold, directory=None, ttl=EXPORT_TTL):
+  """
+  Exports a buffer value when it is at least "threshold" bytes long, other values are returned unchanged.
+
+  param: value(any) - function response.
+  param: threshold(int) - minimum size, in bytes.
+  param: directory(str) - segments directory, "default_dir()" by default.
+  param: ttl(float) - seconds the segment is kept for its consumer to attach it.
+
+  Returns:
+    A Descriptor object or the value.
+  """
+  if threshold is None or isinstance(value, Descriptor) or not is_buffer(value):
+    return value
+  if memoryview(value).nbytes < max(threshold, 1):
+    return value
+  return export(value, directory, ttl)
+
+
+def unlink(descriptor):
+  """
+  Removes a shared segment without attaching it.
+
+  param: descriptor(dict) - segment descriptor.
+  """
+  _exported.pop(descriptor['name'], None)
+  _remove(descriptor['name'])
+
+
+class SharedBuffer(object):
+  """
+  Attached shared segment, its content is available as a memoryview ("view") or a numpy array ("array").
+
+  The segment is removed by "release" (or on context manager exit), segments still attached when the process
+  exits are removed then. Views and arrays of a released segment must not be used anymore.
+  """
+  def __init__(self, descriptor):
+    self.descriptor = descriptor
+    self.name = descriptor['name']
+    self._mm = None
+    self.view = memoryview(b'')
+    if descriptor['size'] > 0:
+      with open(self.name, 'r+b') as f:
+        self._mm = mmap.mmap(f.fileno(), descriptor['size'])
+      self.view = memoryview(self._mm)
+    _attached[self.name] = self
+
+  def __enter__(self):
+    return self
+
+  def __exit__(self, *args):
+    self.release()
+
+  def __len__(self):
+    return self.descriptor['size']
+
+  def cast(self):
+    """
+    Retrieves the content with the original memoryview format and shape.
+
+    Returns:
+      A memoryview object, a flat bytes view when the format can't be cast.
+    """
+    try:
+      return self.view.cast(self.descriptor['format'], self.descriptor['shape'])
+    except (TypeError, ValueError) as e:
+      return self.view
+
+  def array(self):
+    """
+    Retrieves the content as a numpy array sharing the segment memory, numpy must be installed.
+
+    Returns:
+      A numpy.ndarray object.
+    """
+    import numpy
+    dtype = self.descriptor.get('dtype') or self.descriptor['format']
+    return numpy.frombuffer(self.view, dtype=numpy.dtype(dtype)).reshape(self.descriptor['shape'])
+
+  def release(self):
+    """
+    Unmaps and removes the segment. The file is always removed, the mapping stays alive while views of it exist.
+    """
+    _attached.pop(self.name, None)
+    unlink(self.descriptor)
+    try:
+      self.view.release()
+      if self._mm is not None:
+        self._mm.close()
+    except BufferError:
+      pass
+    self._mm = None
+
+
+def attach(descriptor):
+  """
+  Maps a shared segment.
+
+  param: descriptor(dict) - segment descriptor returned by "export".
+
+  Returns:
+    A SharedBuffer object.
+  """
+  return SharedBuffer(descriptor)
+
+
+@atexit.register
+def _release_all():
+  for buf in list(_attached.values()):
+    buf.release()
+  for name in list(_exported):
+    _exported.pop(name, None)
+    _remove(name)
@@ -0,0 +1,164 @@
+import hashlib
+import marshal
+import mmap
+import os
+import sys
+import tempfile
+
+from smrunner.fast import FastCode
+
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+if hasattr(sys, 'implementation'):
+  CACHE_TAG = sys.implementation.cache_tag
+else:
+  CACHE_TAG = 'python-%s%s' % sys.version_info[:2]
+
+
+def default_path():
+  """
+  Retrieves the default store directory, "$XDG_CACHE_HOME/smrunner" or "~/.cache/smrunner".
+
+  Returns:
+    A string with the directory path.
+  """
+  base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+  return os.path.join(base, 'smrunner')
+
+
+class DiskStore(object):
+  """
+  Content addressed on-disk store of compiled code objects, shared by processes and kept across restarts.
+
+  Entries are marshal data keyed by the digest of the source payload, so a hit skips json parsing entirely.
+  Writes are atomic (temporary file and rename) and the directory is kept under "max_bytes" by evicting
+  the least recently used entries, using the file modification time as access time.
+  """
+  def __init__(self, path=None, max_bytes=DEFAULT_MAX_BYTES):
+    self.path = path or default_path()
+    self.max_bytes = max_bytes
+    if not os.path.isdir(self.path):
+      try:
+        os.makedirs(self.path)
+      except OSError as e:
+        if not os.path.isdir(self.path):
+          raise
+
+  def key(self, source, *tags):
+    """
+    Computes the store key of a source payload, marshal data is interpreter specific so it is part of the key.
+
+    param: source(str or bytes) - json or binary payload.
+    param: tags(str) - extra values that change how the payload is decoded.
+
+    Returns:
+      A hex string with the key.
+    """
+    if not isinstance(source, bytes):
+      source = source.encode('utf8')
+    h = hashlib.sha1(CACHE_TAG.encode('utf8'))
+    [h.update(('%s\0' % t).encode('utf8')) for t in tags]
+    h.update(source)
+    return h.hexdigest()
+
+  def _entry_path(self, key):
+    return os.path.join(self.path, key)
+
+  def get(self, key):
+    """
+    Loads an entry, the file is memory mapped and the code object unmarshalled from it.
+
+    param: key(str) - entry key.
+
+    Returns:
+      A FastCode object or None if the key is not stored.
+    """
+    path = self._entry_path(key)
+    try:
+      with open(path, 'rb') as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+          (code, defaults) = marshal.loads(mm)
+        finally:
+          mm.close()
+      os.utime(path, None)
+    except (IOError, OSError):
+      return None
+    except (EOFError, ValueError, TypeError):
+      self.invalidate(key)
+      return None
+    return FastCode.from_code_object(code, defaults)
+
+  def put(self, key, code):
+    """
+    Stores a code object, entries with values that can't be marshalled are skipped.
+
+    param: key(str) - entry key.
+    param: code(FastCode) - code to be stored.
+
+    Returns:
+      True if the entry was written, False otherwise.
+    """
+    try:
+      data = marshal.dumps((code.as_code(), code.defaults))
+    except ValueError as e:
+      return False
+    (fd, tmp) = tempfile.mkstemp(dir=self.path, prefix='.tmp-')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        f.write(data)
+      os.rename(tmp, self._entry_path(key))
+    except (IOError, OSError) as e:
+      try:
+        os.unlink(tmp)
+      except OSError:
+        pass
+      return False
+    self.evict()
+    return True
+
+  def invalidate(self, key):
+    """
+    Removes a single entry.
+
+    param: key(str) - entry key.
+    """
+    try:
+      os.unlink(self._entry_path(key))
+    except OSError:
+      pass
+
+  def entries(self):
+    """
+    Lists the stored entries.
+
+    Returns:
+      A list of tuples with the entry modification time, size and path, oldest first.
+    """
+    entries = []
+    for name in os.listdir(self.path):
+      if name.startswith('.'):
+        continue
+      path = os.path.join(self.path, name)
+      try:
+        st = os.stat(path)
+      except OSError:
+        continue
+      entries.append((st.st_mtime, st.st_size, path))
+    return sorted(entries)
+
+  def evict(self):
+    """
+    Removes the least recently used entries until the store size is under "max_bytes".
+    """
+    entries = self.entries()
+    total = sum([e[1] for e in entries])
+    for (mtime, size, path) in entries:
+      if total <= self.max_bytes:
+        break
+      try:
+        os.unlink(path)
+      except OSError:
+        pass
+      total -= size
@@ -1,3 +1,4 @@
+import io
 import os
 import imp
 import json
@@ -86,3 +87,137 @@ def test_cli_json(func, capsys):
   (out, err) = capsys.readouterr()
   data = json.loads(out)
   assert data['result'] == 'Hello World'
+
+
+def test_cli_serve(func1, capsys, monkeypatch):
+  code = fn.Code.from_function(func1)
+  request = {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'call',
+    'params': {'data': code.as_json(only_code=False), 'params': ['Bob']}
+  }
+  monkeypatch.setattr('sys.stdin', io.StringIO(u'%s\n' % json.dumps(request)))
+  pyrunner.run(['--serve'])
+  (out, err) = capsys.readouterr()
+  assert json.loads(out)['result'] == 'Hello Bob'
+
+
+def test_cli_from_b64_binary_data(func1, capsys):
+  code = fn.Code.from_function(func1)
+  params = base64.b64encode(json.dumps(['Bob']).encode('utf8')).decode('utf8')
+  data = base64.b64encode(code.as_bytes()).decode('utf8')
+  pyrunner.run(['--params', params, '--data', data, '--encode'])
+  (out, err) = capsys.readouterr()
+  assert err == ''
+  assert out == 'Hello Bob\n'
+
+
+def test_cli_from_binary_file(func1, capsys, tmpdir):
+  path = tmpdir.join('func.bin')
+  path.write_binary(fn.Code.from_function(func1).as_bytes())
+  pyrunner.run(['--file', str(path), '--params', '["Bob"]'])
+  (out, err) = capsys.readouterr()
+  assert out == 'Hello Bob\n'
+
+
+def test_cli_timings(func, capsys):
+  code = fn.Code.from_function(func)
+  pyrunner.run(['--data', code.as_json(), '--json', '--timings'])
+  (out, err) = capsys.readouterr()
+  data = json.loads(out)
+  assert data['result'] == 'Hello World'
+  assert 'execute' in data['meta']['timings']
+  assert 'serialize' in data['meta']['timings']
+
+
+def test_cli_stream(capsys):
+  def _fn():
+    for i in range(3):
+      yield i
+  data = base64.b64encode(fn.Code.from_function(_fn).as_bytes()).decode('utf8')
+  pyrunner.run(['--data', data, '--encode'])
+  (out, err) = capsys.readouterr()
+  assert out == '0\n1\n2\n'
+  pyrunner.run(['--data', data, '--encode', '--json'])
+  (out, err) = capsys.readouterr()
+  lines = [json.loads(l) for l in out.splitlines()]
+  assert [l['params']['data'] for l in lines[:-1]] == [0, 1, 2]
+  assert lines[-1]['result'] == {'items': 3}
+
+
+def test_cli_from_data_file(func1, capsys, tmpdir):
+  code = fn.Code.from_function(func1)
+  data = tmpdir.join('data')
+  data.write_binary(base64.b64encode(code.as_bytes()))
+  params = tmpdir.join('params')
+  params.write_binary(base64.b64encode(b'["World"]'))
+  pyrunner.run(['--data-file', str(data), '--params-file', str(params), '--encode'])
+  (out, err) = capsys.readouterr()
+  assert out == 'Hello World\n'
+
+
+def test_cli_from_params_stdin(func1, capsys, monkeypatch):
+  code = fn.Code.from_function(func1)
+  monkeypatch.setattr('sys.stdin', io.TextIOWrapper(io.BytesIO(b'{"obj": "stdin"}')))
+  pyrunner.run(['--data', code.as_json(only_code=False), '--params-file', '-'])
+  (out, err) = capsys.readouterr()
+  assert out == 'Hello stdin\n'
+
+
+def test_cli_map_file(func1, capsys, tmpdir):
+  code = fn.Code.from_function(func1)
+  path = tmpdir.join('inputs.jsonl')
+  path.write('["Bob"]\n{"obj": "Ted"}\n')
+  pyrunner.run(['--data', code.as_json(only_code=False), '--map-file', str(path)])
+  (out, err) = capsys.readouterr()
+  assert [json.loads(l)['result'] for l in out.splitlines()] == ['Hello Bob', 'Hello Ted']
+
+
+def test_cli_profile(func1, capsys, monkeypatch):
+  from smrunner import profiling
+  monkeypatch.setattr(profiling, 'default_profiler', profiling.NULL_PROFILER)
+  code = fn.Code.from_function(func1)
+  pyrunner.run(['--data', code.as_json(only_code=False), '--params', '["Bob"]', '--json', '--profile', '--profile-top', '2'])
+  (out, err) = capsys.readouterr()
+  data = json.loads(out)
+  assert data['result'] == 'Hello Bob'
+  assert len(data['meta']['profile']['entries']) == 2
+
+
+def test_cli_memory(func1, capsys, monkeypatch):
+  from smrunner import memory
+  monkeypatch.setattr(memory, '_default', memory.NULL_ACCOUNTING)
+  code = fn.Code.from_function(func1)
+  pyrunner.run(['--data', code.as_json(only_code=False), '--params', '["Bob"]', '--json', '--memory', '--memory-limit', str(256 * 1024 * 1024)])
+  (out, err) = capsys.readouterr()
+  data = json.loads(out)
+  assert data['result'] == 'Hello Bob'
+  assert 'peak' in data['meta']['memory']
+
+
+def test_cli_serve_metrics_file(func1, capsys, monkeypatch, tmpdir):
+  code = fn.Code.from_function(func1)
+  request = {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'call',
+    'params': {'data': code.as_json(only_code=False), 'params': ['Bob']}
+  }
+  path = str(tmpdir.join('metrics.prom'))
+  monkeypatch.setattr('sys.stdin', io.StringIO(u'%s\n' % json.dumps(request)))
+  pyrunner.run(['--serve', '--metrics-file', path])
+  (out, err) = capsys.readouterr()
+  assert json.loads(out)['result'] == 'Hello Bob'
+  with open(path) as f:
+    assert 'smrunner_calls_total{digest="%s"' % code.digest() in f.read()
+
+
+def test_cli_json_not_serializable(capsys):
+  def func():
+    return set([1])
+  data = base64.b64encode(fn.Code.from_function(func).as_bytes()).decode('utf8')
+  pyrunner.run(['--data', data, '--encode', '--json'])
+  (out, err) = capsys.readouterr()
+  assert out == ''
+  assert json.loads(err)['error']['code'] == -32603
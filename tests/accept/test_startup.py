@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from smrunner import fn
+
+# Modules the one shot "--data" path must never import, see "Startup budget" in the README.
+FORBIDDEN_MODULES = (
+  'schematics',
+  'inspect',
+  'asyncio',
+  'multiprocessing',
+  'concurrent',
+  'threading',
+  'smrunner.fn',
+  'smrunner.response'
+)
+
+
+@pytest.fixture
+def func():
+  def _fn(obj):
+    return 'Hello %s' % obj
+  return _fn
+
+
+def imported_modules(*args):
+  env = dict(os.environ, PYTHONPATH=os.path.abspath('.'))
+  cmd = [sys.executable, '-X', 'importtime', os.path.abspath('./bin/pyrunner')] + list(args)
+  proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+  (out, err) = proc.communicate()
+  modules = [l.split('|')[-1].strip() for l in err.decode('utf8').splitlines() if l.startswith('import time:')]
+  return (out.decode('utf8'), modules)
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires -X importtime')
+def test_data_import_budget(func):
+  data = fn.Code.from_function(func).as_json(only_code=False)
+  (out, modules) = imported_modules('--data', data, '--params', '["Bob"]')
+  assert out == 'Hello Bob\n'
+  for name in FORBIDDEN_MODULES:
+    assert name not in modules
+
+
+@pytest.mark.skipif(sys.version_info < (3, 7), reason='requires -X importtime')
+def test_json_import_budget(func):
+  data = fn.Code.from_function(func).as_json(only_code=False)
+  (out, modules) = imported_modules('--data', data, '--params', '["Bob"]', '--json')
+  assert '"result": "Hello Bob"' in out
+  for name in FORBIDDEN_MODULES:
+    assert name not in modules
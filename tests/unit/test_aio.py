@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from smrunner import errors
+from smrunner.aio import AsyncRunner
+from smrunner.fn import Code, Function
+
+
+@pytest.fixture
+def fn_async():
+  async def fn(o):
+    return 'Hello %s!' % o
+  return fn
+
+
+@pytest.fixture
+def fn_async_gen():
+  async def fn(n):
+    for i in range(n):
+      yield i
+  return fn
+
+
+@pytest.fixture
+def fn_sync():
+  def fn(o):
+    return 'Hi %s!' % o
+  return fn
+
+
+def test_arun_coroutine(fn_async):
+  func = Function.from_code(Code.from_function(fn_async))
+  assert asyncio.run(func.arun('bob')) == 'Hello bob!'
+
+
+def test_arun_async_generator(fn_async_gen):
+  func = Function.from_code(Code.from_function(fn_async_gen))
+  assert asyncio.run(func.arun(3)) == [0, 1, 2]
+
+
+def test_arun_sync(fn_sync):
+  func = Function.from_code(Code.from_function(fn_sync))
+  assert asyncio.run(func.arun('ted')) == 'Hi ted!'
+
+
+def test_arun_runtime_error(fn_async):
+  func = Function.from_code(Code.from_function(fn_async))
+  with pytest.raises(errors.RuntimeError):
+    asyncio.run(func.arun())
+
+
+def test_runner_run_many(fn_async, fn_sync):
+  runner = AsyncRunner(limit=2)
+  func = Function.from_code(Code.from_function(fn_async))
+  params = [[str(i)] for i in range(10)] + [{'o': 'bob'}]
+  results = asyncio.run(runner.run_many(func, params))
+  assert results[0] == 'Hello 0!'
+  assert results[-1] == 'Hello bob!'
+  func = Function.from_code(Code.from_function(fn_sync))
+  assert asyncio.run(AsyncRunner().run_many(func, [['a']])) == ['Hi a!']
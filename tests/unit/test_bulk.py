@@ -0,0 +1,90 @@
+import io
+import json
+
+import pytest
+
+from smrunner import bulk
+from smrunner.fast import FastCode, FastFunction
+
+
+@pytest.fixture
+def func():
+  def fn(o, greeting='Hello'):
+    if o == 'boom':
+      raise ValueError(o)
+    return '%s %s!' % (greeting, o)
+  return FastFunction.from_code(FastCode.from_function(fn))
+
+
+@pytest.fixture
+def lines():
+  return ['["bob"]\n', '{"o": "ted", "greeting": "Hi"}\n', '\n', 'not json\n', '["boom"]\n', '3\n', '["alice"]\n']
+
+
+def check(out):
+  responses = [json.loads(l) for l in out.getvalue().splitlines()]
+  assert [r['id'] for r in responses] == [0, 1, 3, 4, 5, 6]
+  assert responses[0]['result'] == 'Hello bob!'
+  assert responses[1]['result'] == 'Hi ted!'
+  assert responses[2]['error']['code'] == -32700
+  assert responses[3]['error']['code'] == -32000
+  assert 'ValueError: boom' in responses[3]['error']['data']['trace']
+  assert responses[4]['error']['code'] == -32602
+  assert responses[5]['result'] == 'Hello alice!'
+
+
+def test_map_lines(func, lines):
+  out = io.StringIO()
+  assert bulk.map_lines(out, func, lines) == (6, 3)
+  check(out)
+
+
+def test_map_lines_workers(func, lines):
+  out = io.StringIO()
+  assert bulk.map_lines(out, func, lines, workers=2, chunksize=1) == (6, 3)
+  check(out)
+
+
+def test_map_lines_workers_many(func):
+  out = io.StringIO()
+  lines = ['["%s"]' % i for i in range(500)]
+  assert bulk.map_lines(out, func, lines, workers=2, chunksize=8) == (500, 0)
+  results = [json.loads(l)['result'] for l in out.getvalue().splitlines()]
+  assert results == ['Hello %s!' % i for i in range(500)]
+
+
+def test_map_lines_not_serializable():
+  def fn(n):
+    if n == 1:
+      return set([n])
+    return n
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  out = io.StringIO()
+  assert bulk.map_lines(out, func, ['[0]', '[1]', '[2]']) == (3, 1)
+  responses = [json.loads(l) for l in out.getvalue().splitlines()]
+  assert responses[0]['result'] == 0
+  assert responses[1]['error']['code'] == -32603
+  assert responses[2]['result'] == 2
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_map_lines_pure(workers):
+  def fn(n):
+    import random
+    return [n, random.random()]
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  out = io.StringIO()
+  bulk.map_lines(out, func, ['[%s]' % (i % 2) for i in range(200)], workers=workers, chunksize=1, pure=True)
+  results = [json.loads(l)['result'] for l in out.getvalue().splitlines()]
+  assert len(set([r[1] for r in results])) < 200
+  assert all([r == results[r[0]] for r in results])
+
+
+def test_map_lines_workers_generator():
+  def fn(n):
+    for i in range(n):
+      yield i
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  out = io.StringIO()
+  assert bulk.map_lines(out, func, ['[2]', '[3]'], workers=2) == (2, 0)
+  assert [json.loads(l)['result'] for l in out.getvalue().splitlines()] == [[0, 1], [0, 1, 2]]
@@ -0,0 +1,85 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from smrunner.cache import LRUCache, digest
+
+
+@pytest.fixture
+def lru():
+  return LRUCache(maxsize=2)
+
+
+def test_cache_miss(lru):
+  assert lru.get('a') is None
+  assert lru.misses == 1
+
+
+def test_cache_hit(lru):
+  lru.put('a', 1)
+  assert lru.get('a') == 1
+  assert lru.hits == 1
+
+
+def test_cache_eviction(lru):
+  lru.put('a', 1)
+  lru.put('b', 2)
+  lru.get('a')
+  lru.put('c', 3)
+  assert 'b' not in lru
+  assert 'a' in lru
+  assert lru.evictions == 1
+
+
+def test_cache_invalidate(lru):
+  lru.put('a', 1)
+  assert lru.invalidate('a') is True
+  assert lru.invalidate('a') is False
+  assert len(lru) == 0
+
+
+def test_cache_stats(lru):
+  lru.put('a', 1)
+  lru.get('a')
+  lru.get('b')
+  stats = lru.stats()
+  assert stats['size'] == 1
+  assert stats['hits'] == 1
+  assert stats['misses'] == 1
+  lru.clear()
+  assert lru.stats()['hits'] == 0
+
+
+def test_cache_maxbytes():
+  lru = LRUCache(maxsize=10, maxbytes=10)
+  lru.put('a', 1, size=4)
+  lru.put('b', 2, size=4)
+  lru.put('c', 3, size=4)
+  assert 'a' not in lru
+  assert lru.bytes == 8
+  lru.invalidate('b')
+  assert lru.bytes == 4
+
+
+def test_cache_ttl():
+  lru = LRUCache(maxsize=10, ttl=0)
+  lru.put('a', 1)
+  assert lru.get('a') is None
+  assert 'a' not in lru
+  assert lru.stats()['expirations'] == 1
+  lru = LRUCache(maxsize=10, ttl=60)
+  lru.put('a', 1)
+  assert lru.get('a') == 1
+
+
+def test_digest_canonical_fallback():
+  script = 'from smrunner.cache import digest; print(digest({"defaults": ({"a", "b", "c"}, {"x": 1, "y": [2]})}))'
+  digests = set()
+  for seed in ('1', '2', '3'):
+    environ = dict(os.environ, PYTHONHASHSEED=seed)
+    digests.add(subprocess.check_output([sys.executable, '-c', script], env=environ).strip().decode('utf8'))
+  assert len(digests) == 1
+  assert digests.pop() == digest({'defaults': ({'c', 'b', 'a'}, {'y': [2], 'x': 1})})
+  assert digest({'defaults': ({'a'}, )}) != digest({'defaults': ({'b'}, )})
@@ -0,0 +1,108 @@
+import asyncio
+import socket
+import threading
+
+import pytest
+
+from smrunner import errors, server
+from smrunner.client import Client
+from smrunner.fn import Code
+
+
+def fn(o):
+  return 'Hello %s!' % o
+
+
+def serve(path, **kwargs):
+  loop = asyncio.new_event_loop()
+  started = threading.Event()
+  def run():
+    asyncio.set_event_loop(loop)
+    listener = loop.run_until_complete(server.SocketServer(**kwargs).start(path))
+    started.set()
+    loop.run_forever()
+    listener.close()
+    loop.run_until_complete(listener.wait_closed())
+  thread = threading.Thread(target=run)
+  thread.start()
+  started.wait()
+  def stop():
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join()
+  return stop
+
+
+@pytest.fixture
+def socket_path(tmpdir):
+  path = str(tmpdir.join('runner.sock'))
+  stop = serve(path)
+  yield path
+  stop()
+
+
+@pytest.fixture
+def data():
+  return Code.from_function(fn).as_json(only_code=False)
+
+
+def test_call(socket_path, data):
+  with Client(socket_path) as client:
+    assert client.call(data=data, params='["bob"]') == 'Hello bob!'
+    assert client.call(data=data, params=['alice']) == 'Hello alice!'
+    assert len(client._idle) == 1
+
+
+def test_call_many(socket_path, data):
+  with Client(socket_path) as client:
+    calls = [{'data': data, 'params': [str(i)]} for i in range(10)]
+    assert client.call_many(calls) == ['Hello %s!' % i for i in range(10)]
+
+
+def test_register_and_call(socket_path, data):
+  with Client(socket_path) as client:
+    fn_id = client.register(data=data)
+    assert client.call(id=fn_id, params={'o': 'bob'}) == 'Hello bob!'
+
+
+def test_call_error(socket_path, data):
+  with Client(socket_path) as client:
+    with pytest.raises(errors.RuntimeError) as e:
+      client.call(data=data, params='[]')
+    assert e.value.code == -32000
+    assert e.value.fn_name == 'fn'
+
+
+def test_reconnect(socket_path, data):
+  with Client(socket_path) as client:
+    assert client.call(data=data, params=['bob']) == 'Hello bob!'
+    client._idle[0].sock.shutdown(socket.SHUT_RDWR)
+    assert client.call(data=data, params=['bob']) == 'Hello bob!'
+
+
+def test_call_many_window(socket_path, data):
+  with Client(socket_path, pipeline=4) as client:
+    calls = [{'data': data, 'params': [str(i)]} for i in range(200)]
+    assert client.call_many(calls) == ['Hello %s!' % i for i in range(200)]
+
+
+def test_idle_connection_closed(socket_path, data):
+  with Client(socket_path) as client:
+    assert client.call(data=data, params=['bob']) == 'Hello bob!'
+    conn = client._idle[0]
+    conn.sock.shutdown(socket.SHUT_RD)
+    assert conn.usable() is False
+    assert client.call(data=data, params=['bob']) == 'Hello bob!'
+    assert client._idle[0] is not conn
+
+
+def test_frame_too_large(tmpdir, data):
+  path = str(tmpdir.join('small.sock'))
+  stop = serve(path, max_body=64)
+  try:
+    with Client(path) as client:
+      with pytest.raises(errors.InvalidRequestError) as e:
+        client.call(data=data, params=['bob'])
+      assert e.value.code == -32600
+      assert e.value.data == {'max_body': 64}
+  finally:
+    stop()
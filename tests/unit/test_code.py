@@ -4,6 +4,7 @@ import pytest
 import six
 
 from smrunner.fn import Code
+from smrunner.errors import ParseError
 
 
 @pytest.fixture
@@ -58,3 +59,29 @@ def test_fn_with_global(fn_global):
   co = code.as_code()
   function = types.FunctionType(co, {'a': 1}, co.co_name, None)
   assert function() == 1
+
+
+@pytest.fixture
+def fn_nested():
+  def fn(n, scale=2.5):
+    inner = lambda x: x * scale
+    return [inner(i) for i in range(n)], b'\xff\x00', None, (1, 'a'), 2 ** 70
+  return fn
+
+
+def test_code_as_bytes(fn_nested):
+  code = Code.from_function(fn_nested)
+  data = code.as_bytes()
+  assert data.startswith(b'SMC')
+  new_code = Code.from_bytes(data)
+  assert new_code.as_dict(only_code=False) == code.as_dict(only_code=False)
+  function = types.FunctionType(new_code.as_code(), {'range': range}, 'fn', new_code.defaults)
+  assert function(2) == fn_nested(2)
+
+
+def test_code_from_bytes_error(fn):
+  data = Code.from_function(fn).as_bytes()
+  with pytest.raises(ParseError):
+    Code.from_bytes(data[:-3])
+  with pytest.raises(ParseError):
+    Code.from_bytes(b'XYZ' + data[3:])
@@ -0,0 +1,74 @@
+import pytest
+
+from smrunner import env
+from smrunner.fast import FastCode, FastFunction
+
+
+@pytest.fixture
+def fn_globals():
+  def fn():
+    return (os.path.sep, GREETING)
+  return fn
+
+
+@pytest.fixture
+def fn_counter():
+  def fn():
+    global counter
+    counter = globals().get('counter', 0) + 1
+    return counter
+  return fn
+
+
+def test_preload():
+  environment = env.Environment(modules=['os.path'], base={'GREETING': 'Hello'})
+  _globals = environment.new_globals()
+  assert _globals['os'].path.sep
+  assert _globals['GREETING'] == 'Hello'
+  assert environment.modules == ['os.path']
+
+
+def test_builtins_not_overridden():
+  environment = env.Environment(base={'__builtins__': {}})
+  assert environment.new_globals({'__builtins__': {}})['__builtins__'] is env.builtins
+
+
+def test_new_globals_copy():
+  environment = env.Environment(base={'GREETING': 'Hello'})
+  _globals = environment.new_globals()
+  _globals['GREETING'] = 'Hi'
+  assert environment.new_globals()['GREETING'] == 'Hello'
+
+
+def test_bind(fn_globals):
+  environment = env.Environment(modules=['os'], base={'GREETING': 'Hello'})
+  func = FastFunction.from_code(FastCode.from_function(fn_globals))
+  fn = func.get_fn()
+  assert environment.bind(fn) is fn
+  assert fn()[1] == 'Hello'
+
+
+def test_run_with_default_env(fn_globals, monkeypatch):
+  monkeypatch.setattr(env, 'default_env', env.Environment(modules=['os'], base={'GREETING': 'Hi'}))
+  func = FastFunction.from_code(FastCode.from_function(fn_globals))
+  assert func()[1] == 'Hi'
+
+
+def test_run_shared_globals(fn_counter):
+  func = FastFunction.from_code(FastCode.from_function(fn_counter))
+  assert func() == 1
+  assert func() == 2
+  assert FastFunction.from_code(FastCode.from_function(fn_counter))() == 3
+
+
+def test_rebind_on_new_generation(fn_globals, monkeypatch):
+  environment = env.Environment(modules=['os'], base={'GREETING': 'Hello'})
+  monkeypatch.setattr(env, 'default_env', environment)
+  func = FastFunction.from_code(FastCode.from_function(fn_globals))
+  fn = func.get_fn()
+  assert func()[1] == 'Hello'
+  generation = environment.generation
+  environment.update({'GREETING': 'Hi'})
+  assert environment.generation != generation
+  assert func()[1] == 'Hi'
+  assert func.get_fn() is fn
@@ -51,6 +51,13 @@ def test_parse_error():
   assert err.value.data is None
 
 
+def test_invalid_request_error():
+  with pytest.raises(errors.InvalidRequestError) as err:
+    raise errors.InvalidRequestError()
+  assert err.value.code == -32600
+  assert err.value.data is None
+
+
 def test_function_not_found_error():
   with pytest.raises(errors.FunctionNotFoundError) as err:
     raise errors.FunctionNotFoundError('fn')
@@ -81,3 +88,33 @@ def test_runtime_error():
   assert err.value.data['params'] == ['hello world']
   assert err.value.data['trace'] == 'invalid var'
 
+
+
+def test_timeout_error():
+  with pytest.raises(errors.TimeoutError) as err:
+    raise errors.TimeoutError('fn', 1.5, 'wall')
+  assert err.value.code == -32001
+  assert err.value.data['function'] == 'fn'
+  assert err.value.data['limit'] == 1.5
+  assert err.value.data['kind'] == 'wall'
+
+
+def test_memory_limit_error():
+  with pytest.raises(errors.MemoryLimitError) as err:
+    raise errors.MemoryLimitError('fn', 1024)
+  assert err.value.code == -32002
+  assert err.value.data == {'function': 'fn', 'limit': 1024}
+
+
+def test_from_response():
+  err = errors.from_response(-32001, 'Timeout error.', {'function': 'fn', 'limit': 1.5, 'kind': 'cpu'})
+  assert type(err) is errors.TimeoutError
+  assert (err.fn_name, err.limit, err.kind) == ('fn', 1.5, 'cpu')
+  assert err.as_python() == errors.TimeoutError('fn', 1.5, 'cpu').as_python()
+  err = errors.from_response(-32002, 'Memory limit error.', {'function': 'fn', 'limit': 1024})
+  assert type(err) is errors.MemoryLimitError
+  assert err.limit == 1024
+  assert type(errors.from_response(-32603, 'Internal error.')) is errors.InternalError
+  err = errors.from_response(1, 'Random error', {'a': 1})
+  assert type(err) is errors.BaseError
+  assert err.data == {'a': 1}
@@ -0,0 +1,67 @@
+import pytest
+
+from smrunner import errors
+from smrunner.fast import FastCode, FastFunction
+from smrunner.fn import Code
+
+
+@pytest.fixture
+def fn():
+  def fn(o, greeting='Hello'):
+    return '%s %s!' % (greeting, o)
+  return fn
+
+
+def test_fast_code_from_function(fn):
+  code = FastCode.from_function(fn)
+  co = fn.__code__
+  for prop in [p for p in dir(co) if p.startswith('co_') and hasattr(code, p.replace('co_', ''))]:
+    assert getattr(code, prop.replace('co_', '')) == getattr(co, prop)
+  assert code.defaults == ('Hello',)
+
+
+def test_fast_code_matches_code(fn):
+  code = Code.from_function(fn)
+  fast_code = FastCode.from_json(code.as_json(only_code=False))
+  assert fast_code.digest() == code.digest()
+  assert FastCode.from_bytes(code.as_bytes()).digest() == code.digest()
+  assert Code.from_json(fast_code.as_json(only_code=False)).digest() == code.digest()
+
+
+def test_fast_code_digest_reset(fn):
+  code = FastCode.from_function(fn)
+  digest = code.digest()
+  code.name = 'other'
+  assert code.digest() != digest
+
+
+def test_fast_code_slots(fn):
+  code = FastCode.from_function(fn)
+  assert not hasattr(code, '__dict__')
+  with pytest.raises(AttributeError):
+    code.other = 1
+
+
+def test_fast_code_validate(fn):
+  data = FastCode.from_function(fn).as_dict(only_code=False)
+  data['varnames'] = 1
+  code = FastCode.from_dict(data)
+  with pytest.raises(errors.ParseError):
+    code.validate()
+  with pytest.raises(errors.ParseError):
+    FastCode.from_dict(data, validate=True)
+
+
+def test_fast_code_parse_errors():
+  with pytest.raises(errors.ParseError):
+    FastCode.from_json('{')
+  with pytest.raises(errors.ParseError):
+    FastCode.from_json('{"argcount": 0}')
+
+
+def test_fast_function_run(fn):
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  assert func('bob') == 'Hello bob!'
+  assert func('ted', greeting='Hi') == 'Hi ted!'
+  with pytest.raises(errors.RuntimeError):
+    func()
@@ -2,7 +2,7 @@ import types
 
 import pytest
 
-from smrunner.fn import Code, Function
+from smrunner.fn import Code, Function, build_cache
 
 
 @pytest.fixture
@@ -131,3 +131,27 @@ def test_dyanmic_function(fn_dynamic):
   func = Function.from_code(Code.from_function(fn_dynamic))
   func.validate()
   assert func('Leo', age=32) == 'Name "Leo" and age "32"'
+
+
+def test_build_cache(fn_arg):
+  build_cache.clear()
+  func = Function.from_code(Code.from_function(fn_arg))
+  assert func('a') == 'Hello a!'
+  assert func('b') == 'Hello b!'
+  assert build_cache.stats()['misses'] == 1
+  assert build_cache.stats()['hits'] == 1
+  assert build_cache.invalidate(func.code.digest()) is True
+
+
+def test_code_digest(fn, fn_arg):
+  assert Code.from_function(fn).digest() == Code.from_function(fn).digest()
+  assert Code.from_function(fn).digest() != Code.from_function(fn_arg).digest()
+
+
+def test_code_digest_cached(fn):
+  code = Code.from_function(fn)
+  value = code.digest()
+  assert code._digest == value
+  code.name = 'other'
+  assert code._digest is None
+  assert code.digest() != value
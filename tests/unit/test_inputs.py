@@ -0,0 +1,38 @@
+import base64
+
+import pytest
+
+from smrunner.helpers import encoders, inputs
+
+
+@pytest.fixture
+def payload():
+  return b''.join([('item %s\n' % i).encode('utf8') for i in range(10000)])
+
+
+def test_read(tmpdir, payload):
+  path = tmpdir.join('input')
+  path.write_binary(payload)
+  assert inputs.read(str(path)) == payload
+
+
+def test_read_mmap(tmpdir, payload, monkeypatch):
+  monkeypatch.setattr(inputs, 'MMAP_THRESHOLD', 0)
+  monkeypatch.setattr(inputs, 'CHUNK_SIZE', 1000)
+  assert [len(c) for c in inputs._chunks(b'x' * 2500)] == [1000, 1000, 500]
+  path = tmpdir.join('input')
+  path.write_binary(base64.encodebytes(payload))
+  assert inputs.read(str(path), encode=True) == payload
+  path.write_binary(payload)
+  assert inputs.read(str(path)) == payload
+
+
+def test_decode_chunks(payload):
+  data = base64.b64encode(payload)
+  chunks = [data[i:i + 7] for i in range(0, len(data), 7)]
+  assert b''.join(encoders.decode_chunks(chunks)) == payload
+
+
+def test_decode_chunks_invalid():
+  with pytest.raises(ValueError):
+    b''.join(encoders.decode_chunks([b'abcde']))
@@ -0,0 +1,41 @@
+import pytest
+
+from smrunner import instrument
+from smrunner.fast import FastCode, FastFunction
+
+
+@pytest.fixture
+def fn():
+  def fn(o):
+    return 'Hello %s!' % o
+  return fn
+
+
+def test_null_timings():
+  timings = instrument.current()
+  assert timings is instrument.NULL_TIMINGS
+  with timings.phase('execute'):
+    pass
+  assert timings.as_dict() is None
+
+
+def test_timings_phase():
+  timings = instrument.Timings()
+  with timings.phase('a'):
+    pass
+  with timings.phase('a'):
+    pass
+  timings.annotate('key', 1)
+  data = timings.as_dict()
+  assert data['timings']['a'] >= 0
+  assert data['key'] == 1
+
+
+def test_activate(fn):
+  timings = instrument.Timings()
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  with instrument.activate(timings):
+    assert instrument.current() is timings
+    assert func('bob') == 'Hello bob!'
+  assert instrument.current() is instrument.NULL_TIMINGS
+  assert set(timings.phases) == set(['build', 'execute'])
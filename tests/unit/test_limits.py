@@ -0,0 +1,95 @@
+import sys
+import time
+
+import pytest
+
+from smrunner import errors, limits
+
+
+def test_wall_deadline():
+  with pytest.raises(errors.TimeoutError) as err:
+    with limits.deadline(wall=0.05, name='fn'):
+      time.sleep(1)
+  assert err.value.data == {'function': 'fn', 'limit': 0.05, 'kind': 'wall'}
+
+
+def test_cpu_deadline():
+  with pytest.raises(errors.TimeoutError) as err:
+    with limits.deadline(cpu=0.05):
+      while True:
+        pass
+  assert err.value.data['kind'] == 'cpu'
+
+
+def test_deadline_disarmed():
+  with limits.deadline(wall=0.05):
+    pass
+  time.sleep(0.1)
+
+
+def test_iterate_deadline():
+  def gen():
+    while True:
+      time.sleep(0.02)
+      yield 1
+  with pytest.raises(errors.TimeoutError) as err:
+    list(limits.iterate(gen(), wall=0.1, name='fn'))
+  assert err.value.data == {'function': 'fn', 'limit': 0.1, 'kind': 'wall'}
+
+
+def test_iterate_consumer_not_counted():
+  items = []
+  for item in limits.iterate(iter(range(3)), wall=0.05, name='fn'):
+    time.sleep(0.05)
+    items.append(item)
+  assert items == [0, 1, 2]
+
+
+def test_deadline_outside_main_thread():
+  import threading
+  result = []
+  def run():
+    try:
+      with limits.deadline(wall=0.01, name='fn'):
+        time.sleep(0.05)
+    except errors.InvalidParamsError as e:
+      result.append(e.data)
+  thread = threading.Thread(target=run)
+  thread.start()
+  thread.join()
+  assert result == [{'function': 'fn', 'params': {'timeout': 0.01, 'cpu_limit': None}}]
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='requires linux')
+def test_memory_limit():
+  with pytest.raises(errors.MemoryLimitError) as err:
+    with limits.memory(64 * 1024 * 1024, 'fn'):
+      bytearray(512 * 1024 * 1024)
+  assert err.value.data == {'function': 'fn', 'limit': 64 * 1024 * 1024}
+  assert len(bytearray(128 * 1024 * 1024)) == 128 * 1024 * 1024
+
+
+def test_memory_no_limit():
+  with limits.memory(None):
+    assert len(bytearray(1024)) == 1024
+
+
+def test_memory_outside_main_thread():
+  import threading
+  result = []
+  def run():
+    try:
+      with limits.memory(1024, 'fn'):
+        pass
+    except errors.InvalidParamsError as e:
+      result.append(e.data)
+  thread = threading.Thread(target=run)
+  thread.start()
+  thread.join()
+  assert result == [{'function': 'fn', 'params': {'memory_limit': 1024}}]
+
+
+def test_memory_error_without_limit():
+  with pytest.raises(MemoryError):
+    with limits.memory(None, 'fn'):
+      raise MemoryError()
@@ -0,0 +1,58 @@
+import pytest
+
+from smrunner import instrument, memo
+
+
+@pytest.fixture
+def results():
+  return memo.ResultCache(max_entries=10)
+
+
+def test_key_canonical():
+  assert memo.key('d', {'b': 1, 'a': [1, 2]}) == memo.key('d', {'a': [1, 2], 'b': 1})
+  assert memo.key('d', [1]) != memo.key('e', [1])
+  assert memo.key('d', [object()]) is None
+
+
+def test_call_hit(results):
+  calls = []
+  def run():
+    calls.append(1)
+    return {'value': 1}
+  timings = instrument.Timings()
+  with instrument.activate(timings):
+    assert results.call('d', [1], run) == {'value': 1}
+    assert timings.meta['memo'] == 'miss'
+    assert results.call('d', [1], run) == {'value': 1}
+    assert timings.meta['memo'] == 'hit'
+  assert len(calls) == 1
+  assert results.stats()['hits'] == 1
+
+
+def test_call_none_result(results):
+  calls = []
+  def run():
+    calls.append(1)
+  results.call('d', [], run)
+  results.call('d', [], run)
+  assert len(calls) == 1
+
+
+def test_call_skip(results):
+  value = object()
+  timings = instrument.Timings()
+  with instrument.activate(timings):
+    assert results.call('d', [1], lambda: value) is value
+    assert timings.meta['memo'] == 'skip'
+  assert len(results) == 0
+
+
+def test_call_ttl():
+  results = memo.ResultCache(ttl=0)
+  calls = []
+  def run():
+    calls.append(1)
+    return 1
+  results.call('d', [], run)
+  results.call('d', [], run)
+  assert len(calls) == 2
@@ -0,0 +1,115 @@
+import base64
+
+import pytest
+
+from smrunner import instrument, memory, rpc
+from smrunner.fast import FastCode, FastFunction
+from smrunner.fn import Code
+
+
+@pytest.fixture
+def fn():
+  def fn(n):
+    return len([i for i in range(n)])
+  return fn
+
+
+def run_accounted(func, enabled, *args):
+  timings = instrument.Timings()
+  with instrument.activate(timings), memory.activate(enabled):
+    result = func(*args)
+  return (result, timings.as_dict())
+
+
+def test_session(fn):
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  (result, meta) = run_accounted(func, True, 100000)
+  assert result == 100000
+  assert set(meta['memory']) == set(['peak', 'rss_delta'])
+  assert meta['memory']['peak'] > 100000
+
+
+def test_session_generator():
+  def fn(n):
+    yield len([i for i in range(n)])
+  code = FastCode.from_function(fn)
+  (result, meta) = run_accounted(FastFunction.from_code(code), True, 100000)
+  assert 'memory' not in meta
+  timings = instrument.Timings()
+  with instrument.activate(timings):
+    assert list(result) == [100000]
+  assert timings.as_dict() == {'timings': {}}
+  assert memory.default_accounting.stats()[code.digest()]['calls'] == 1
+  assert memory.default_accounting.stats()[code.digest()]['peak_max'] > 100000
+
+
+def test_disabled(fn, monkeypatch):
+  monkeypatch.setattr(memory, '_default', memory.NULL_ACCOUNTING)
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  assert 'memory' not in run_accounted(func, False, 10)[1]
+  assert memory.current() is memory.NULL_ACCOUNTING
+
+
+def test_stats(fn):
+  accounting = memory.Accounting()
+  accounting.add('digest', 'fn', 100, 10)
+  accounting.add('digest', 'fn', 300, None)
+  assert accounting.stats() == {
+    'digest': {'name': 'fn', 'calls': 2, 'peak_max': 300, 'peak_mean': 200, 'rss_delta_max': 10}
+  }
+
+
+def test_stats_per_digest(fn):
+  code = FastCode.from_function(fn)
+  func = FastFunction.from_code(code)
+  calls = memory.default_accounting.stats().get(code.digest(), {}).get('calls', 0)
+  run_accounted(func, True, 10)
+  run_accounted(func, True, 10)
+  assert memory.default_accounting.stats()[code.digest()]['calls'] == calls + 2
+
+
+def test_configure(monkeypatch):
+  monkeypatch.setattr(memory, '_default', memory.NULL_ACCOUNTING)
+  assert memory.enabled() is False
+  memory.configure(True)
+  assert memory.enabled() is True
+  assert memory.current() is memory.default_accounting
+
+
+def test_handle_memory(fn):
+  request = {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'call',
+    'params': {
+      'data': base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8'),
+      'encode': True,
+      'params': [10],
+      'memory': True
+    }
+  }
+  data = rpc.handle(request).as_dict()
+  assert data['result'] == 10
+  assert 'peak' in data['meta']['memory']
+
+
+def test_session_tracing_already_started(fn):
+  import tracemalloc
+  tracemalloc.start()
+  try:
+    data = bytearray(16 * 1024 * 1024)
+    del data
+    func = FastFunction.from_code(FastCode.from_function(fn))
+    (result, meta) = run_accounted(func, True, 10)
+    assert tracemalloc.is_tracing() is True
+  finally:
+    tracemalloc.stop()
+  peak = meta['memory']['peak']
+  assert peak is None or peak < 1024 * 1024
+
+
+def test_session_rss_unavailable(fn, monkeypatch):
+  values = iter([1024, None])
+  monkeypatch.setattr(memory, 'rss', lambda: next(values))
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  assert run_accounted(func, True, 10)[1]['memory']['rss_delta'] is None
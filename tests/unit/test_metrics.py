@@ -0,0 +1,146 @@
+import base64
+import threading
+
+import pytest
+
+from smrunner import errors, metrics, rpc
+from smrunner.fn import Code
+
+
+@pytest.fixture
+def registry():
+  return metrics.Registry(buckets=(0.1, 1.0))
+
+
+def test_observe(registry):
+  registry.observe('d', 'fn', 0.05)
+  registry.observe('d', 'fn', 0.5, -32000)
+  registry.observe('d', 'fn', 5)
+  data = registry.functions()['d']
+  assert data['name'] == 'fn'
+  assert data['calls'] == 3
+  assert data['errors'] == {-32000: 1}
+  assert data['latency']['buckets'] == [[0.1, 1], [1.0, 2], ['+Inf', 3]]
+  assert data['latency']['sum'] == pytest.approx(5.55)
+
+
+def test_bucket_upper_bound(registry):
+  registry.observe('d', 'fn', 0.1)
+  assert registry.functions()['d']['latency']['buckets'][0] == [0.1, 1]
+
+
+def test_threads_merged(registry):
+  def run():
+    for i in range(100):
+      registry.observe('d', 'fn', 0.01)
+  threads = [threading.Thread(target=run) for i in range(4)]
+  [t.start() for t in threads]
+  [t.join() for t in threads]
+  registry.observe('d', 'fn', 0.01)
+  assert registry.functions()['d']['calls'] == 401
+
+
+def test_max_entries():
+  registry = metrics.Registry(max_entries=1)
+  registry.observe('d1', 'fn1', 0.01)
+  registry.observe('d2', 'fn2', 0.01)
+  registry.observe('d3', 'fn3', 0.01)
+  functions = registry.functions()
+  assert functions['d1']['calls'] == 1
+  assert functions[metrics.OTHER]['calls'] == 2
+
+
+def test_timer(registry):
+  with registry.timer('d', 'fn'):
+    pass
+  with pytest.raises(errors.TimeoutError):
+    with registry.timer('d', 'fn'):
+      raise errors.TimeoutError('fn', 1, 'wall')
+  with pytest.raises(ValueError):
+    with registry.timer('d', 'fn'):
+      raise ValueError()
+  data = registry.functions()['d']
+  assert data['calls'] == 3
+  assert data['errors'] == {-32001: 1, metrics.INTERNAL_ERROR_CODE: 1}
+
+
+def test_timer_stream(registry):
+  def gen():
+    yield 1
+    raise errors.TimeoutError('fn', 1, 'wall')
+  with registry.timer('d', 'fn') as timer:
+    items = timer.stream(iter([1, 2]))
+  assert registry.functions() == {}
+  assert list(items) == [1, 2]
+  with registry.timer('d', 'fn') as timer:
+    items = timer.stream(gen())
+  with pytest.raises(errors.TimeoutError):
+    list(items)
+  data = registry.functions()['d']
+  assert data['calls'] == 2
+  assert data['errors'] == {-32001: 1}
+
+
+def test_clear(registry):
+  registry.observe('d', 'fn', 0.01)
+  registry.clear()
+  assert registry.functions() == {}
+
+
+def test_hit_rate():
+  assert metrics.hit_rate({'hits': 3, 'misses': 1}) == 0.75
+  assert metrics.hit_rate({'hits': 0, 'misses': 0}) is None
+
+
+def test_prometheus(registry):
+  registry.observe('d', 'f"n', 0.05, -32000)
+  text = metrics.prometheus(registry)
+  assert '# TYPE smrunner_call_duration_seconds histogram' in text
+  assert 'smrunner_calls_total{digest="d",function="f\\"n"} 1' in text
+  assert 'smrunner_call_errors_total{code="-32000",digest="d",function="f\\"n"} 1' in text
+  assert 'smrunner_call_duration_seconds_bucket{digest="d",function="f\\"n",le="+Inf"} 1' in text
+  assert 'smrunner_cache_hits_total{cache="build"}' in text
+  assert text.endswith('\n')
+
+
+def test_write_prometheus(registry, tmpdir):
+  path = str(tmpdir.join('metrics.prom'))
+  registry.observe('d', 'fn', 0.05)
+  metrics.write_prometheus(path, registry)
+  with open(path) as f:
+    assert f.read() == metrics.prometheus(registry)
+  assert tmpdir.listdir() == [tmpdir.join('metrics.prom')]
+
+
+def test_dumper_write_failures(tmpdir, capsys):
+  import time
+  path = str(tmpdir.join('missing', 'metrics.prom'))
+  dumper = metrics.Dumper(path, interval=0.01).start()
+  time.sleep(0.05)
+  assert dumper._thread.is_alive() is True
+  assert dumper.stop() is False
+  (out, err) = capsys.readouterr()
+  assert 'Failed to write metrics to %s' % path in err
+  path = str(tmpdir.join('metrics.prom'))
+  assert metrics.Dumper(path, interval=60).start().stop() is True
+  assert tmpdir.join('metrics.prom').check() is True
+
+
+def test_rpc_stats():
+  def fn(n):
+    if n < 0:
+      raise ValueError(n)
+    return n
+  code = Code.from_function(fn)
+  data = base64.b64encode(code.as_bytes()).decode('utf8')
+  rpc.call(data=data, encode=True, params=[1])
+  with pytest.raises(ValueError):
+    rpc.call(data=data, encode=True, params=[-1])
+  request = {'jsonrpc': '2.0', 'id': 1, 'method': 'stats'}
+  result = rpc.handle(request).as_dict()['result']
+  entry = result['functions'][code.digest()]
+  assert entry['calls'] >= 2
+  assert entry['errors'][metrics.INTERNAL_ERROR_CODE] >= 1
+  assert 'hit_rate' in result['caches']['build']
+  request['params'] = {'format': 'prometheus'}
+  assert 'smrunner_calls_total' in rpc.handle(request).as_dict()['result']
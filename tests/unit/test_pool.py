@@ -0,0 +1,118 @@
+import pickle
+import sys
+
+import pytest
+
+from smrunner import errors
+from smrunner.fn import Code
+from smrunner.pool import RunnerPool
+
+
+@pytest.fixture
+def fn():
+  def fn(o, greeting='Hello'):
+    return '%s %s!' % (greeting, o)
+  return fn
+
+
+@pytest.fixture
+def fn_raise():
+  def fn():
+    return {}['missing']
+  return fn
+
+
+@pytest.fixture
+def pool():
+  pool = RunnerPool(processes=2, max_tasks=3)
+  yield pool
+  pool.shutdown()
+
+
+def test_submit(pool, fn):
+  future = pool.submit(Code.from_function(fn), ('bob',), {'greeting': 'Hi'})
+  assert future.result(timeout=10) == 'Hi bob!'
+
+
+def test_map(pool, fn):
+  params = [[str(i)] for i in range(10)] + [{'o': 'ted'}]
+  results = list(pool.map(Code.from_function(fn), params, chunksize=4))
+  assert results[0] == 'Hello 0!'
+  assert results[-1] == 'Hello ted!'
+  assert len(results) == 11
+
+
+def test_submit_runtime_error(pool, fn, fn_raise):
+  with pytest.raises(errors.RuntimeError) as err:
+    pool.submit(Code.from_function(fn)).result(timeout=10)
+  assert err.value.code == -32000
+  with pytest.raises(errors.RuntimeError) as err:
+    pool.submit(Code.from_function(fn_raise)).result(timeout=10)
+  assert 'KeyError' in err.value.data['trace']
+
+
+def test_submit_after_shutdown(fn):
+  pool = RunnerPool(processes=1)
+  pool.shutdown()
+  with pytest.raises(RuntimeError):
+    pool.submit(Code.from_function(fn), ('bob',))
+
+
+def test_error_pickle():
+  err = pickle.loads(pickle.dumps(errors.FunctionNotFoundError('fn')))
+  assert err.code == -32601
+  assert err.data['function'] == 'fn'
+
+
+@pytest.fixture
+def fn_loop():
+  def fn(seconds):
+    import time
+    end = time.time() + seconds
+    while time.time() < end:
+      pass
+    return seconds
+  return fn
+
+
+def test_submit_timeout(pool, fn_loop):
+  with pytest.raises(errors.TimeoutError) as err:
+    pool.submit(Code.from_function(fn_loop), (5,), timeout=0.1).result(timeout=10)
+  assert err.value.data['kind'] == 'wall'
+  with pytest.raises(errors.TimeoutError) as err:
+    pool.submit(Code.from_function(fn_loop), (5,), cpu_limit=0.1).result(timeout=10)
+  assert err.value.data['kind'] == 'cpu'
+  assert pool.submit(Code.from_function(fn_loop), (0,), timeout=1).result(timeout=10) == 0
+
+
+def test_submit_timeout_watchdog():
+  def fn():
+    while True:
+      try:
+        while True:
+          pass
+      except Exception:
+        pass
+  def fn_ok():
+    return 'ok'
+  with RunnerPool(processes=1, grace=0.2) as pool:
+    with pytest.raises(errors.TimeoutError):
+      pool.submit(Code.from_function(fn), timeout=0.1).result(timeout=10)
+    assert pool.submit(Code.from_function(fn_ok)).result(timeout=10) == 'ok'
+
+
+def test_preload():
+  def fn():
+    return (json.dumps([1]), GREETING)
+  with RunnerPool(processes=1, preload=['json'], base_globals={'GREETING': 'Hello'}) as pool:
+    assert pool.submit(Code.from_function(fn)).result(timeout=10) == ('[1]', 'Hello')
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason='requires linux')
+def test_memory_limit():
+  def fn(size):
+    return len(bytearray(size))
+  with RunnerPool(processes=1, memory_limit=64 * 1024 * 1024) as pool:
+    with pytest.raises(errors.MemoryLimitError):
+      pool.submit(Code.from_function(fn), (512 * 1024 * 1024, )).result(timeout=10)
+    assert pool.submit(Code.from_function(fn), (1024, )).result(timeout=10) == 1024
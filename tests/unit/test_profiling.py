@@ -0,0 +1,105 @@
+import base64
+import os
+
+import pytest
+
+from smrunner import instrument, profiling, rpc
+from smrunner.fast import FastCode, FastFunction
+from smrunner.fn import Code
+
+
+@pytest.fixture
+def fn():
+  def fn(n):
+    return sum([i * i for i in range(n)])
+  return fn
+
+
+def run_profiled(func, profiler, *args):
+  timings = instrument.Timings()
+  with instrument.activate(timings), profiling.activate(profiler):
+    result = func(*args)
+  return (result, timings.as_dict())
+
+
+def test_profile_call(fn):
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  (result, meta) = run_profiled(func, profiling.Profiler(top=3), 100)
+  assert result == 328350
+  entries = meta['profile']['entries']
+  assert len(entries) <= 3
+  assert set(entries[0]) == set(['function', 'calls', 'primitive_calls', 'tottime', 'cumtime'])
+  assert any(['(fn)' in e['function'] for e in entries])
+
+
+def test_profile_generator():
+  def fn(n):
+    for i in range(n):
+      yield sum([j * j for j in range(i)])
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  timings = instrument.Timings()
+  with instrument.activate(timings), profiling.activate(profiling.Profiler(top=50)):
+    result = func(100)
+  assert 'profile' not in timings.meta
+  assert len(list(result)) == 100
+  assert any(['(fn)' in e['function'] for e in timings.meta['profile']['entries']])
+
+
+def test_profile_sample(fn):
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  profiler = profiling.Profiler(sample=2)
+  assert 'profile' not in run_profiled(func, profiler, 10)[1]
+  assert 'profile' in run_profiled(func, profiler, 10)[1]
+  assert 'profile' not in run_profiled(func, profiler, 10)[1]
+
+
+def test_profile_dump(fn, tmpdir):
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  (result, meta) = run_profiled(func, profiling.Profiler(directory=str(tmpdir)), 10)
+  assert meta['profile']['file'].endswith('.pstats')
+  assert os.path.exists(meta['profile']['file'])
+
+
+def test_profile_dump_unique(fn, tmpdir):
+  profiler = profiling.Profiler(directory=str(tmpdir))
+  sessions = [profiler.session('fn'), profiler.session('fn')]
+  files = []
+  for session in sessions:
+    timings = instrument.Timings()
+    with instrument.activate(timings):
+      with session:
+        fn(10)
+    files.append(timings.meta['profile']['file'])
+  assert files[0] != files[1]
+  assert all([os.path.exists(f) for f in files])
+
+
+def test_profile_disabled(fn):
+  func = FastFunction.from_code(FastCode.from_function(fn))
+  assert 'profile' not in run_profiled(func, None, 10)[1]
+
+
+def test_handle_profile(fn):
+  request = {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'call',
+    'params': {
+      'data': base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8'),
+      'encode': True,
+      'params': [10],
+      'profile': True
+    }
+  }
+  data = rpc.handle(request).as_dict()
+  assert data['result'] == 285
+  assert len(data['meta']['profile']['entries']) > 0
+  assert profiling.current() is profiling.NULL_PROFILER
+
+
+def test_configure(monkeypatch):
+  monkeypatch.setattr(profiling, 'default_profiler', profiling.NULL_PROFILER)
+  assert profiling.enabled() is False
+  profiling.configure(profiling.Profiler(top=5))
+  assert profiling.enabled() is True
+  assert profiling.forced().top == 5
@@ -0,0 +1,69 @@
+import pytest
+
+from smrunner import errors
+from smrunner.fast import FastCode
+from smrunner.registry import Registry
+
+
+@pytest.fixture
+def fn():
+  def fn(o, greeting='Hello'):
+    return '%s %s!' % (greeting, o)
+  return fn
+
+
+@pytest.fixture
+def registry():
+  return Registry()
+
+
+def test_register_and_call(registry, fn):
+  code = FastCode.from_function(fn)
+  fn_id = registry.register(code)
+  assert fn_id == code.digest()
+  assert registry.register(FastCode.from_function(fn)) == fn_id
+  assert len(registry) == 1
+  assert registry.call(fn_id, ['bob']) == 'Hello bob!'
+  assert registry.call(fn_id, {'o': 'ted', 'greeting': 'Hi'}) == 'Hi ted!'
+
+
+def test_call_unknown_id(registry):
+  with pytest.raises(errors.FunctionNotFoundError) as err:
+    registry.call('missing', [])
+  assert err.value.data['function'] == 'missing'
+
+
+def test_register_invalid_code(registry, fn):
+  data = FastCode.from_function(fn).as_dict(only_code=False)
+  data['names'] = 1
+  with pytest.raises(errors.ParseError):
+    registry.register(FastCode.from_dict(data))
+
+
+def test_registry_memory_budget(fn):
+  code = FastCode.from_function(fn)
+  registry = Registry(max_bytes=len(code.as_bytes()))
+  fn_id = registry.register(code)
+  def other():
+    return 1
+  registry.register(FastCode.from_function(other))
+  assert fn_id not in registry
+  assert registry.stats()['evictions'] == 1
+
+
+def test_register_too_large(fn):
+  code = FastCode.from_function(fn)
+  size = len(code.as_bytes())
+  registry = Registry(max_bytes=size - 1)
+  with pytest.raises(errors.InvalidParamsError) as err:
+    registry.register(code)
+  assert err.value.data == {'function': 'fn', 'params': {'size': size, 'max_bytes': size - 1}}
+  assert len(registry) == 0
+
+
+def test_register_pure(registry, fn):
+  fn_id = registry.register(FastCode.from_function(fn))
+  assert registry.entry(fn_id)[1] is False
+  assert registry.register(FastCode.from_function(fn), pure=True) == fn_id
+  assert registry.entry(fn_id)[1] is True
+  assert len(registry) == 1
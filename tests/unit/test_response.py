@@ -1,3 +1,5 @@
+import json
+
 from smrunner.response import Response
 
 
@@ -11,3 +13,14 @@ def test_error_response():
   res = Response.as_error(-32404, 'not found', data={'file': 'not found'}, _id='12345')
   assert res.as_dict()['error']['code'] == -32404
   assert type(res.as_json()) is str
+
+
+def test_response_id():
+  assert Response.as_result(_id='12345', data='hello').as_dict()['id'] == '12345'
+  assert Response.as_error(-32404, 'not found', _id=7).as_dict()['id'] == 7
+
+
+def test_batch_response():
+  responses = [Response.as_result(_id=1, data='a'), Response.as_result(_id=2, data='b')]
+  data = json.loads(Response.batch_as_json(responses))
+  assert [r['id'] for r in data] == [1, 2]
@@ -0,0 +1,258 @@
+import base64
+import io
+import json
+
+import pytest
+
+from smrunner import errors, instrument, rpc
+from smrunner.fn import Code
+
+
+@pytest.fixture
+def fn():
+  def fn(o):
+    return 'Hello %s!' % o
+  return fn
+
+
+@pytest.fixture
+def request_data(fn):
+  return {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'call',
+    'params': {
+      'data': Code.from_function(fn).as_json(only_code=False),
+      'params': ['bob']
+    }
+  }
+
+
+def test_call_with_decoded_params(fn):
+  data = Code.from_function(fn).as_json(only_code=False)
+  assert rpc.call(data=data, params={'o': 'ted'}) == 'Hello ted!'
+
+
+def test_handle_result(request_data):
+  res = rpc.handle(request_data)
+  assert res.as_dict()['result'] == 'Hello bob!'
+
+
+def test_handle_invalid_request():
+  res = rpc.handle({'method': 'call'})
+  assert res.as_dict()['error']['code'] == -32600
+
+
+def test_handle_unknown_method(request_data):
+  request_data['method'] = 'nope'
+  res = rpc.handle(request_data)
+  assert res.as_dict()['error']['code'] == -32601
+
+
+def test_handle_runtime_error(request_data):
+  request_data['params']['params'] = []
+  res = rpc.handle(request_data)
+  assert res.as_dict()['error']['code'] == -32000
+
+
+def test_handle_parse_error():
+  res = rpc.handle_line('{not json')
+  assert res.as_dict()['error']['code'] == -32700
+
+
+def test_serve(request_data):
+  stdin = io.StringIO(u'%s\n\n%s\n' % (json.dumps(request_data), json.dumps(request_data)))
+  stdout = io.StringIO()
+  rpc.serve(stdin, stdout)
+  lines = stdout.getvalue().splitlines()
+  assert len(lines) == 2
+  assert json.loads(lines[0])['result'] == 'Hello bob!'
+
+
+def test_serve_not_serializable(request_data):
+  def fn():
+    return set([1, 2])
+  data = base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8')
+  set_request = {'jsonrpc': '2.0', 'id': 7, 'method': 'call', 'params': {'data': data, 'encode': True}}
+  stdin = io.StringIO(u'%s\n%s\n' % (json.dumps(set_request), json.dumps(request_data)))
+  stdout = io.StringIO()
+  rpc.serve(stdin, stdout)
+  lines = stdout.getvalue().splitlines()
+  assert len(lines) == 2
+  assert json.loads(lines[0])['id'] == 7
+  assert json.loads(lines[0])['error']['code'] == -32603
+  assert json.loads(lines[1])['result'] == 'Hello bob!'
+
+
+def traced_peak(run):
+  import tracemalloc
+  tracemalloc.start()
+  try:
+    run()
+    return tracemalloc.get_traced_memory()[1]
+  finally:
+    tracemalloc.stop()
+
+
+def test_call_params_file_peak_memory(tmpdir):
+  def fn(o):
+    return len(o)
+  fn_id = rpc.register(data=base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8'), encode=True)
+  size = 8 * 1024 * 1024
+  path = tmpdir.join('params')
+  path.write(json.dumps(['x' * size]))
+  def decode_kept():
+    raw = path.read_binary()
+    json.loads(raw.decode('utf8'))
+  def call():
+    assert rpc.call(id=fn_id, params_file=str(path)) == size
+  assert traced_peak(decode_kept) > 2.5 * size
+  assert traced_peak(call) < 2.5 * size
+
+
+def test_handle_echoes_id(request_data):
+  request_data['id'] = 'abc'
+  assert rpc.handle(request_data).as_dict()['id'] == 'abc'
+
+
+def test_handle_notification(request_data):
+  del request_data['id']
+  assert rpc.handle(request_data) is None
+
+
+def test_handle_batch(request_data):
+  second = dict(request_data, id=2)
+  notification = dict(request_data)
+  del notification['id']
+  res = rpc.handle_line(json.dumps([request_data, notification, second]))
+  assert [r.as_dict()['id'] for r in res] == [1, 2]
+  assert json.loads(rpc.dumps(res))[1]['result'] == 'Hello bob!'
+
+
+def test_handle_empty_batch():
+  res = rpc.handle_line('[]')
+  assert res.as_dict()['error']['code'] == -32600
+
+
+def test_handle_timings(request_data):
+  request_data['params']['timings'] = True
+  data = rpc.handle(request_data).as_dict()
+  assert data['result'] == 'Hello bob!'
+  assert set(data['meta']['timings']) == set(['load', 'params', 'build', 'execute'])
+  data = json.loads(rpc.dumps(rpc.handle(request_data)))
+  assert set(data['meta']['timings']) == set(['load', 'params', 'build', 'execute', 'serialize'])
+  del request_data['params']['timings']
+  assert 'meta' not in rpc.handle(request_data).as_dict()
+
+
+@pytest.fixture
+def gen_request_data():
+  def fn(n):
+    for i in range(n):
+      yield {'item': i}
+  return {
+    'jsonrpc': '2.0',
+    'id': 5,
+    'method': 'call',
+    'params': {
+      'data': base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8'),
+      'encode': True,
+      'params': [3]
+    }
+  }
+
+
+def test_serve_stream(gen_request_data):
+  stdin = io.StringIO(u'%s\n' % json.dumps(gen_request_data))
+  stdout = io.StringIO()
+  rpc.serve(stdin, stdout)
+  lines = [json.loads(l) for l in stdout.getvalue().splitlines()]
+  assert len(lines) == 4
+  assert lines[0]['method'] == 'stream'
+  assert lines[0]['params'] == {'id': 5, 'data': {'item': 0}}
+  assert lines[-1]['id'] == 5
+  assert lines[-1]['result'] == {'items': 3}
+
+
+def test_call_generator_timeout():
+  def fn(n):
+    import time
+    for i in range(n):
+      time.sleep(0.02)
+      yield i
+  data = base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8')
+  result = rpc.call(data=data, encode=True, params=[100], timeout=0.1)
+  with pytest.raises(errors.TimeoutError) as err:
+    list(result)
+  assert err.value.data == {'function': 'fn', 'limit': 0.1, 'kind': 'wall'}
+  assert list(rpc.call(data=data, encode=True, params=[3], timeout=1)) == [0, 1, 2]
+
+
+def test_call_generator_instrumented():
+  def fn(n):
+    for i in range(n):
+      yield i
+  data = base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8')
+  timings = instrument.Timings()
+  with instrument.activate(timings):
+    result = rpc.call(data=data, encode=True, params=[3])
+  execute = timings.phases['execute']
+  assert list(result) == [0, 1, 2]
+  assert timings.phases['execute'] > execute
+
+
+def test_stream_error(gen_request_data):
+  gen_request_data['params']['params'] = ['x']
+  stdout = io.StringIO()
+  rpc.write(stdout, rpc.handle(gen_request_data, stream=True))
+  assert json.loads(stdout.getvalue())['error']['code'] == -32603
+
+
+def test_batch_stream_collected(gen_request_data):
+  res = rpc.handle_batch([gen_request_data])
+  assert res[0].as_dict()['result'] == [{'item': 0}, {'item': 1}, {'item': 2}]
+
+
+def test_handle_register_and_call(request_data):
+  register = {
+    'jsonrpc': '2.0',
+    'id': 1,
+    'method': 'register',
+    'params': {'data': request_data['params']['data']}
+  }
+  fn_id = rpc.handle(register).as_dict()['result']
+  request = {'jsonrpc': '2.0', 'id': 2, 'method': 'call', 'params': {'id': fn_id, 'params': ['ted']}}
+  assert rpc.handle(request).as_dict()['result'] == 'Hello ted!'
+  request['params']['id'] = 'missing'
+  assert rpc.handle(request).as_dict()['error']['code'] == -32601
+
+
+def test_handle_pure(request_data):
+  request_data['params']['pure'] = True
+  request_data['params']['timings'] = True
+  request_data['params']['params'] = ['pure']
+  data = rpc.handle(request_data).as_dict()
+  assert data['result'] == 'Hello pure!'
+  assert data['meta']['memo'] == 'miss'
+  data = rpc.handle(request_data).as_dict()
+  assert data['result'] == 'Hello pure!'
+  assert data['meta']['memo'] == 'hit'
+  assert 'execute' not in data['meta']['timings']
+
+
+def test_call_shm_threshold():
+  def fn(n):
+    return b'x' * n
+  data = base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8')
+  descriptor = rpc.call(data=data, encode=True, params=[100], shm_threshold=64)
+  assert json.loads(json.dumps(descriptor))['size'] == 100
+  from smrunner import shm
+  with shm.attach(descriptor) as buf:
+    assert bytes(buf.view) == b'x' * 100
+
+
+def test_handle_stdin_rejected(request_data):
+  request_data['params']['params_file'] = '-'
+  error = rpc.handle(request_data).as_dict()['error']
+  assert error['code'] == -32602
+  assert error['data']['params'] == {'params_file': '-'}
@@ -0,0 +1,55 @@
+import io
+import json
+
+import pytest
+
+from smrunner import errors, serializer
+from smrunner.response import Response
+
+
+@pytest.mark.parametrize('result', ['hello', None, [1, 2.5, 'a'], {'a': {'b': [True, None]}}, list(range(2000))])
+def test_result_as_json(result):
+  expected = json.dumps(Response.as_result(_id=1, data=result, meta={'memory': {}}).as_dict())
+  assert serializer.result_as_json(1, result, {'memory': {}}) == expected
+
+
+def test_result_as_json_serialize_phase():
+  meta = {'timings': {'execute': 1.0}}
+  data = json.loads(serializer.result_as_json(1, list(range(2000)), meta))
+  assert data['meta']['timings']['execute'] == 1.0
+  assert data['meta']['timings']['serialize'] >= 0
+  assert meta == {'timings': {'execute': 1.0}}
+
+
+def test_error_as_json():
+  e = errors.FunctionNotFoundError('fn')
+  expected = json.dumps(Response.as_error(code=e.code, message=e.message, data=e.data, _id='x').as_dict())
+  assert serializer.error_as_json(e.code, e.message, e.data, 'x') == expected
+
+
+def test_large_result_not_slower_than_dumps():
+  import timeit
+  result = [{'a': i, 'b': [str(i), float(i)]} for i in range(20000)]
+  response = {'jsonrpc': '2.0', 'id': 1, 'result': result}
+  encoded = min(timeit.repeat(lambda: serializer.result_as_json(1, result), number=3, repeat=5))
+  dumped = min(timeit.repeat(lambda: json.dumps(response), number=3, repeat=5))
+  assert encoded < dumped * 1.5
+
+
+def test_write_stream():
+  def gen():
+    yield 1
+    raise errors.RuntimeError('fn')
+  out = io.StringIO()
+  serializer.write_stream(out, 3, gen())
+  lines = [json.loads(l) for l in out.getvalue().splitlines()]
+  assert lines[0] == {'jsonrpc': '2.0', 'method': 'stream', 'params': {'id': 3, 'data': 1}}
+  assert lines[1]['error']['code'] == -32000
+
+
+def test_write_stream_serialize_phase():
+  out = io.StringIO()
+  serializer.write_stream(out, 3, iter([1, 2]), {'timings': {}})
+  lines = [json.loads(l) for l in out.getvalue().splitlines()]
+  assert lines[2]['result'] == {'items': 2}
+  assert lines[2]['meta']['timings']['serialize'] >= 0
@@ -0,0 +1,129 @@
+import asyncio
+import base64
+import json
+
+import pytest
+
+from smrunner import server
+from smrunner.fn import Code
+
+
+def fn(o):
+  return 'Hello %s!' % o
+
+
+def http_request(body, headers=None):
+  lines = ['POST / HTTP/1.1', 'Host: localhost', 'Content-Length: %s' % len(body)] + (headers or [])
+  return ('%s\r\n\r\n' % '\r\n'.join(lines)).encode('latin1') + body
+
+
+async def read_response(reader):
+  status = await reader.readline()
+  headers = {}
+  while True:
+    line = await reader.readline()
+    if line == b'\r\n':
+      break
+    (name, sep, value) = line.decode('latin1').partition(':')
+    headers[name.strip().lower()] = value.strip()
+  body = await reader.readexactly(int(headers['content-length']))
+  return (int(status.split()[1]), headers, body)
+
+
+def exchange(*requests, http=None):
+  async def run():
+    listener = await (http or server.HTTPServer()).start('127.0.0.1', 0)
+    port = listener.sockets[0].getsockname()[1]
+    (reader, writer) = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(b''.join(requests))
+    responses = [await read_response(reader) for r in requests]
+    writer.close()
+    listener.close()
+    await listener.wait_closed()
+    return responses
+  return asyncio.run(run())
+
+
+def call_body(_id, params):
+  data = Code.from_function(fn).as_json(only_code=False)
+  request = {'jsonrpc': '2.0', 'id': _id, 'method': 'call', 'params': {'data': data, 'params': params}}
+  return json.dumps(request).encode('utf8')
+
+
+def test_parse_address():
+  assert server.parse_address(':8080') == ('0.0.0.0', 8080)
+  assert server.parse_address('127.0.0.1:80') == ('127.0.0.1', 80)
+
+
+def test_pipelined_requests():
+  responses = exchange(http_request(call_body(1, '["bob"]')), http_request(call_body(2, '["alice"]')))
+  assert [r[0] for r in responses] == [200, 200]
+  assert responses[0][1]['connection'] == 'keep-alive'
+  assert json.loads(responses[0][2].decode('utf8'))['result'] == 'Hello bob!'
+  assert json.loads(responses[1][2].decode('utf8'))['result'] == 'Hello alice!'
+
+
+def test_connection_close():
+  (response, ) = exchange(http_request(call_body(1, '["bob"]'), ['Connection: close']))
+  assert response[0] == 200
+  assert response[1]['connection'] == 'close'
+
+
+def test_notification():
+  body = json.dumps({'jsonrpc': '2.0', 'method': 'call', 'params': {}}).encode('utf8')
+  (response, ) = exchange(http_request(body))
+  assert response[0] == 204
+  assert response[2] == b''
+
+
+def test_result_not_serializable():
+  def fn():
+    return set([1])
+  data = base64.b64encode(Code.from_function(fn).as_bytes()).decode('utf8')
+  request = {'jsonrpc': '2.0', 'id': 3, 'method': 'call', 'params': {'data': data, 'encode': True}}
+  (status, body) = server.process(json.dumps(request).encode('utf8'))
+  assert status == 200
+  assert json.loads(body.decode('utf8'))['id'] == 3
+  assert json.loads(body.decode('utf8'))['error']['code'] == -32603
+
+
+def test_dispatch_failure_keeps_connection():
+  class FailingServer(server.HTTPServer):
+    calls = 0
+
+    def dispatch(self, body):
+      FailingServer.calls += 1
+      if FailingServer.calls == 1:
+        raise RuntimeError('boom')
+      return super(FailingServer, self).dispatch(body)
+  responses = exchange(http_request(call_body(1, '["bob"]')), http_request(call_body(2, '["alice"]')), http=FailingServer())
+  assert [r[0] for r in responses] == [200, 200]
+  assert json.loads(responses[0][2].decode('utf8'))['error']['code'] == -32603
+  assert json.loads(responses[1][2].decode('utf8'))['result'] == 'Hello alice!'
+
+
+def test_method_not_allowed():
+  (response, ) = exchange(b'GET / HTTP/1.1\r\nHost: localhost\r\n\r\n')
+  assert response[0] == 405
+
+
+def test_metrics():
+  exchange(http_request(call_body(1, '["bob"]')))
+  (response, ) = exchange(b'GET /metrics HTTP/1.1\r\nHost: localhost\r\n\r\n')
+  assert response[0] == 200
+  assert response[1]['content-type'].startswith('text/plain')
+  assert b'smrunner_calls_total{' in response[2]
+
+
+def test_limits_rejected():
+  data = Code.from_function(fn).as_json(only_code=False)
+  request = {'jsonrpc': '2.0', 'id': 1, 'method': 'call', 'params': {'data': data, 'params': ['bob'], 'timeout': 0.2}}
+  (response, ) = exchange(http_request(json.dumps(request).encode('utf8')))
+  error = json.loads(response[2].decode('utf8'))['error']
+  assert error['code'] == -32602
+  assert error['data']['params'] == {'timeout': 0.2, 'cpu_limit': None}
+
+
+def test_base_server_abstract():
+  with pytest.raises(TypeError):
+    server.BaseServer()
@@ -0,0 +1,76 @@
+import array
+import os
+
+import pytest
+
+from smrunner import shm
+from smrunner.fn import Code
+from smrunner.pool import RunnerPool
+
+
+def test_export_attach_bytes(tmpdir):
+  descriptor = shm.export(b'hello world', str(tmpdir))
+  assert descriptor['size'] == 11
+  assert os.path.exists(descriptor['name'])
+  with shm.attach(descriptor) as buf:
+    assert bytes(buf.view) == b'hello world'
+  assert not os.path.exists(descriptor['name'])
+
+
+def test_export_attach_array(tmpdir):
+  values = array.array('d', [1.5, 2.5, 3.5])
+  with shm.attach(shm.export(values, str(tmpdir))) as buf:
+    assert buf.cast().tolist() == [1.5, 2.5, 3.5]
+    assert len(buf) == 24
+
+
+def test_export_multidimensional(tmpdir):
+  view = memoryview(bytearray(range(6))).cast('B', [2, 3])
+  descriptor = shm.export(view, str(tmpdir))
+  assert descriptor['shape'] == [2, 3]
+  with shm.attach(descriptor) as buf:
+    assert buf.cast().tolist() == [[0, 1, 2], [3, 4, 5]]
+
+
+def test_export_numpy(tmpdir):
+  numpy = pytest.importorskip('numpy')
+  values = numpy.arange(12, dtype='float32').reshape(3, 4)
+  descriptor = shm.export(values.T, str(tmpdir))
+  with shm.attach(descriptor) as buf:
+    assert (buf.array() == values.T).all()
+
+
+def test_export_large(tmpdir):
+  assert shm.export_large(b'abc', 10) == b'abc'
+  assert shm.export_large('text', 1) == 'text'
+  descriptor = shm.export_large(b'x' * 10, 10, str(tmpdir))
+  assert isinstance(descriptor, shm.Descriptor)
+  shm.unlink(descriptor)
+  assert not os.path.exists(descriptor['name'])
+
+
+def test_release_at_exit(tmpdir):
+  buf = shm.attach(shm.export(b'data', str(tmpdir)))
+  shm._release_all()
+  assert not os.path.exists(buf.name)
+
+
+def test_pool_shm_threshold():
+  def fn(n):
+    return bytes(bytearray(range(256))) * n
+  with RunnerPool(processes=1, shm_threshold=1024) as pool:
+    small = pool.submit(Code.from_function(fn), (1, )).result(timeout=10)
+    assert small == bytes(bytearray(range(256)))
+    with pool.submit(Code.from_function(fn), (100, )).result(timeout=10) as buf:
+      assert len(buf) == 25600
+      assert bytes(buf.view[:256]) == small
+
+
+def test_exported_swept(tmpdir):
+  descriptor = shm.export(b'data', str(tmpdir), ttl=0)
+  assert os.path.exists(descriptor['name'])
+  kept = shm.export(b'data', str(tmpdir))
+  assert not os.path.exists(descriptor['name'])
+  assert os.path.exists(kept['name'])
+  shm._release_all()
+  assert not os.path.exists(kept['name'])
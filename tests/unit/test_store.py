@@ -0,0 +1,68 @@
+import os
+
+import pytest
+
+from smrunner import rpc
+from smrunner.fast import FastCode, FastFunction
+from smrunner.store import DiskStore
+
+
+@pytest.fixture
+def fn():
+  def fn(o, greeting='Hello'):
+    return '%s %s!' % (greeting, o)
+  return fn
+
+
+@pytest.fixture
+def disk_store(tmpdir):
+  return DiskStore(str(tmpdir.join('store')))
+
+
+def test_store_roundtrip(disk_store, fn):
+  code = FastCode.from_function(fn)
+  key = disk_store.key(code.as_json(only_code=False))
+  assert disk_store.get(key) is None
+  assert disk_store.put(key, code) is True
+  stored = disk_store.get(key)
+  assert stored.digest() == code.digest()
+  assert FastFunction.from_code(stored)('bob') == 'Hello bob!'
+
+
+def test_store_key_tags(disk_store):
+  assert disk_store.key('data') == disk_store.key(b'data')
+  assert disk_store.key('data') != disk_store.key('data', True)
+
+
+def test_store_corrupt_entry(disk_store):
+  key = disk_store.key('data')
+  with open(os.path.join(disk_store.path, key), 'wb') as f:
+    f.write(b'garbage')
+  assert disk_store.get(key) is None
+  assert not os.path.exists(os.path.join(disk_store.path, key))
+
+
+def test_store_eviction(disk_store, fn):
+  code = FastCode.from_function(fn)
+  keys = [disk_store.key(str(i)) for i in range(3)]
+  for (i, key) in enumerate(keys):
+    disk_store.put(key, code)
+    os.utime(os.path.join(disk_store.path, key), (i, i))
+  size = disk_store.entries()[0][1]
+  disk_store.max_bytes = size * 2
+  disk_store.get(keys[0])
+  disk_store.evict()
+  assert disk_store.get(keys[1]) is None
+  assert disk_store.get(keys[0]) is not None
+  assert disk_store.get(keys[2]) is not None
+
+
+def test_call_with_store(tmpdir, fn, monkeypatch):
+  path = str(tmpdir.join('store'))
+  data = FastCode.from_function(fn).as_json(only_code=False)
+  assert rpc.call(data=data, params=['bob'], cache_dir=path) == 'Hello bob!'
+  assert len(os.listdir(path)) == 1
+  def from_json(*args, **kwargs):
+    raise AssertionError('json should not be parsed')
+  monkeypatch.setattr(FastCode, 'from_json', from_json)
+  assert rpc.call(data=data, params=['ted'], cache_dir=path) == 'Hello ted!'